@@ -0,0 +1,163 @@
+"""FastAPI dependencies for DietLogApp.
+
+This module exposes the shared services held by the `ServiceRegistry` to route handlers
+through FastAPI's dependency injection system.
+"""
+
+from typing import Annotated
+
+from fastapi import Depends, Request
+
+from app.config import Settings
+from app.interfaces.diet_log import DietLogStore
+from app.interfaces.image import AsyncImageService
+from app.interfaces.llm import LLMService
+from app.providers.registry import ServiceRegistry
+from app.services.jobs import JobRunner
+from app.services.pipeline import DietPipeline
+from app.services.scheduler import LLMScheduler
+
+
+def get_registry(request: Request) -> ServiceRegistry:
+    """Return the service registry attached to the running application.
+
+    Parameters
+    ----------
+    request : Request
+        The incoming request.
+
+    Returns
+    -------
+    ServiceRegistry
+        The registry created in the application lifespan.
+
+    """
+    return request.app.state.registry
+
+
+def get_settings(registry: Annotated[ServiceRegistry, Depends(get_registry)]) -> Settings:
+    """Return the application settings.
+
+    Parameters
+    ----------
+    registry : ServiceRegistry
+        The application service registry.
+
+    Returns
+    -------
+    Settings
+        The settings the registry was built from.
+
+    """
+    return registry.settings
+
+
+def get_llm(registry: Annotated[ServiceRegistry, Depends(get_registry)]) -> LLMService:
+    """Return the shared LLM service.
+
+    Parameters
+    ----------
+    registry : ServiceRegistry
+        The application service registry.
+
+    Returns
+    -------
+    LLMService
+        The process-wide LLM service.
+
+    """
+    return registry.llm
+
+
+def get_img(registry: Annotated[ServiceRegistry, Depends(get_registry)]) -> AsyncImageService:
+    """Return the shared image service.
+
+    Parameters
+    ----------
+    registry : ServiceRegistry
+        The application service registry.
+
+    Returns
+    -------
+    AsyncImageService
+        The process-wide image service.
+
+    """
+    return registry.img
+
+
+def get_pipeline(registry: Annotated[ServiceRegistry, Depends(get_registry)]) -> DietPipeline:
+    """Return the shared diet analysis pipeline.
+
+    Parameters
+    ----------
+    registry : ServiceRegistry
+        The application service registry.
+
+    Returns
+    -------
+    DietPipeline
+        The process-wide pipeline.
+
+    """
+    return registry.pipeline
+
+
+def get_scheduler(registry: Annotated[ServiceRegistry, Depends(get_registry)]) -> LLMScheduler | None:
+    """Return the scheduler admitting LLM calls.
+
+    Parameters
+    ----------
+    registry : ServiceRegistry
+        The application service registry.
+
+    Returns
+    -------
+    LLMScheduler | None
+        The process-wide scheduler, or None if the registry has not been started.
+
+    """
+    return registry.scheduler
+
+
+def get_jobs(registry: Annotated[ServiceRegistry, Depends(get_registry)]) -> JobRunner:
+    """Return the runner of background analysis jobs.
+
+    Parameters
+    ----------
+    registry : ServiceRegistry
+        The application service registry.
+
+    Returns
+    -------
+    JobRunner
+        The process-wide job runner.
+
+    """
+    return registry.jobs
+
+
+def get_diet_log(registry: Annotated[ServiceRegistry, Depends(get_registry)]) -> DietLogStore:
+    """Return the persistent diet log.
+
+    Parameters
+    ----------
+    registry : ServiceRegistry
+        The application service registry.
+
+    Returns
+    -------
+    DietLogStore
+        The process-wide diet log store.
+
+    """
+    return registry.diet_log
+
+
+SettingsDep = Annotated[Settings, Depends(get_settings)]
+LLMDep = Annotated[LLMService, Depends(get_llm)]
+ImageDep = Annotated[AsyncImageService, Depends(get_img)]
+PipelineDep = Annotated[DietPipeline, Depends(get_pipeline)]
+SchedulerDep = Annotated[LLMScheduler | None, Depends(get_scheduler)]
+JobsDep = Annotated[JobRunner, Depends(get_jobs)]
+DietLogDep = Annotated[DietLogStore, Depends(get_diet_log)]
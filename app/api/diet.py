@@ -4,22 +4,45 @@ This module provides endpoints for processing diet-related data, such as analyzi
 images of food and generating nutritional feedback using AI models.
 """
 
-from typing import TYPE_CHECKING, Annotated
+import asyncio
+import hashlib
+import json
+import math
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from functools import partial
+from typing import TYPE_CHECKING, Annotated, Any, Literal, cast
 
-from fastapi import APIRouter, Body, HTTPException
+from fastapi import APIRouter, Body, Header, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from app.exceptions.image import ImageTooLargeError
-from app.providers.image import ImageProvider
-from app.providers.llm import LLMProvider
+from app.api.dependencies import DietLogDep, JobsDep, PipelineDep, SchedulerDep, SettingsDep
+from app.config import Settings
+from app.exceptions.deadline import DeadlineExceededError
+from app.exceptions.image import ImageFetchError, ImageTooLargeError, InvalidUploadError, UnsupportedImageError
+from app.exceptions.llm import LLMRateLimitError, LLMTruncatedError, LLMUnavailableError
+from app.integration.feedback_parser import FeedbackParser
+from app.interfaces.diet_log import DietLogStore, LogEntry
+from app.interfaces.events import ServerSentEvent
+from app.interfaces.image import MAX_IMAGE_SIZE
+from app.interfaces.jobs import Job, JobStatus
+from app.services.deadline import Deadline
+from app.services.metrics import ServerTiming
+from app.services.pipeline import DietPipeline, PipelineMode
+from app.services.routing import LatencyTier
+from app.services.scheduler import LLMScheduler
+from app.services.sse import EventStream
+from app.services.upload import read_upload
 
 if TYPE_CHECKING:
-    from app.interfaces.image import ImageService
-    from app.interfaces.llm import LLMService
+    from app.services.budget import Reservation
 
 diet_router = APIRouter(prefix="/diet")
 
+type OutputFormat = Literal["text", "sections"]
+"""The ways feedback is sent: raw "delta" events, or events parsed into sections."""
+
 
 class ImageRequest(BaseModel):
     """Represents an image request with a URL.
@@ -29,6 +52,17 @@ class ImageRequest(BaseModel):
     url : str
         The URL of the image to be processed. Must be a publicly accessible URL pointing to
         an image file in JPEG or PNG format. The image should be clear and focused on the food item.
+    mode : PipelineMode | None
+        The pipeline mode: "two_phase" describes the image before streaming the feedback,
+        "fused" streams both from a single LLM call for a faster first byte. Defaults to
+        the `DIETLOG_PIPELINE_MODE` setting.
+    output : OutputFormat
+        The output format: "text" streams the raw text in "delta" events, "sections" parses
+        it into "section_start", "section_delta", "section_end" and "score" events, and
+        ends with the parsed sections in the "done" event. Defaults to "text".
+    tier : LatencyTier | None
+        The latency tier of the LLM calls: "fast" uses the smaller model for every stage,
+        "quality" the larger one. Defaults to the `DIETLOG_LLM_*_TIER` settings of each stage.
 
     Examples
     --------
@@ -38,36 +72,267 @@ class ImageRequest(BaseModel):
     """
 
     url: str = Body()
+    mode: PipelineMode | None = Body(default=None)
+    output: OutputFormat = Body(default="text")
+    tier: LatencyTier | None = Body(default=None)
 
 
-@diet_router.post(
-    "/process",
-    responses={
-        200: {
-            "description": "Successful response with streaming nutritional feedback",
-            "content": {"text/event-stream": {"example": "This is a stream of nutritional feedback..."}},
+class BatchImageRequest(BaseModel):
+    """Represents a request to process several images at once.
+
+    Attributes
+    ----------
+    urls : list[str]
+        The URLs of the images to be processed, following the same rules as `ImageRequest.url`.
+        Between 1 and 100 URLs can be sent in a single request.
+    tier : LatencyTier | None
+        The latency tier of the LLM calls, as in `ImageRequest.tier`.
+
+    """
+
+    urls: list[str] = Body(min_length=1, max_length=100)
+    tier: LatencyTier | None = Body(default=None)
+
+
+class MealRequest(BaseModel):
+    """Represents a request to analyse a meal photographed in several shots.
+
+    Attributes
+    ----------
+    urls : list[str]
+        The URLs of the photos of the meal, such as the plate, a drink and a side, following
+        the same rules as `ImageRequest.url`. Between 1 and 10 URLs can be sent.
+    output : OutputFormat
+        The output format, as in `ImageRequest.output`.
+    tier : LatencyTier | None
+        The latency tier of the LLM calls, as in `ImageRequest.tier`.
+
+    """
+
+    urls: list[str] = Body(min_length=1, max_length=10)
+    output: OutputFormat = Body(default="text")
+    tier: LatencyTier | None = Body(default=None)
+
+
+class JobResponse(BaseModel):
+    """Represents the state of an analysis job.
+
+    Attributes
+    ----------
+    id : str
+        The identifier of the job.
+    url : str
+        The URL of the analysed image.
+    mode : str
+        The pipeline mode of the analysis.
+    status : JobStatus
+        The state of the job: "queued", "running", "succeeded" or "failed".
+    created_at : float
+        The UNIX time at which the job was submitted.
+    output : OutputFormat
+        The output format of the result events.
+    tier : LatencyTier | None
+        The latency tier of the LLM calls, or None for the default tiers.
+    stream : str
+        The path streaming the result of the job.
+
+    """
+
+    id: str
+    url: str
+    mode: str
+    status: JobStatus
+    created_at: float
+    output: OutputFormat
+    tier: LatencyTier | None
+    stream: str
+
+    @classmethod
+    def of(cls, job: Job) -> "JobResponse":
+        """Describe a job.
+
+        Parameters
+        ----------
+        job : Job
+            The job.
+
+        Returns
+        -------
+        JobResponse
+            The state of the job.
+
+        """
+        return cls(
+            id=job.id,
+            url=job.url,
+            mode=job.mode,
+            status=job.status,
+            created_at=job.created_at,
+            output=cast("OutputFormat", job.output),
+            tier=cast("LatencyTier | None", job.tier),
+            stream=f"{diet_router.prefix}/jobs/{job.id}/stream",
+        )
+
+
+def _to_http_exception(error: Exception) -> HTTPException:  # noqa: PLR0911 - one response per error type
+    """Translate a pipeline error into the HTTP error reported to clients.
+
+    Parameters
+    ----------
+    error : Exception
+        The error raised while processing an image.
+
+    Returns
+    -------
+    HTTPException
+        A 400 error for image size, format, fetch or upload problems, a 429 or 503 error with a
+        `Retry-After` header when the LLM is rate limited or saturated, a 502 error when its
+        response was truncated, a 504 error when the request deadline is exceeded, a 500
+        error otherwise.
+
+    """
+    match error:
+        case ImageTooLargeError():
+            return HTTPException(
+                status_code=400,
+                detail=f"Image too large. Maximum allowed size: {error.max_size} bytes, actual size: {error.actual_size} bytes",
+            )
+        case UnsupportedImageError():
+            return HTTPException(
+                status_code=400,
+                detail="Unsupported image format. Supported formats: JPEG, PNG, GIF and WebP",
+            )
+        case InvalidUploadError():
+            return HTTPException(status_code=400, detail=f"Invalid upload: {error.reason}")
+        case ImageFetchError():
+            return HTTPException(
+                status_code=400,
+                detail=f"Image could not be fetched. The image host returned status {error.status_code}",
+            )
+        case LLMRateLimitError():
+            return HTTPException(
+                status_code=429,
+                detail=f"Too many requests: {error.reason}",
+                headers={"Retry-After": str(math.ceil(error.retry_after))},
+            )
+        case LLMUnavailableError():
+            return HTTPException(
+                status_code=503,
+                detail=f"Service temporarily unavailable: {error.reason}",
+                headers={"Retry-After": str(math.ceil(error.retry_after))},
+            )
+        case LLMTruncatedError():
+            return HTTPException(status_code=502, detail=f"Incomplete LLM response: {error}")
+        case DeadlineExceededError():
+            return HTTPException(status_code=504, detail=f"Deadline exceeded: {error}")
+        case _:
+            return HTTPException(status_code=500, detail=f"Internal server error occurred: {error!s}")
+
+
+_PROCESS_RESPONSES: dict[int | str, dict[str, Any]] = {
+    200: {
+        "description": "Successful response with streaming nutritional feedback",
+        "content": {
+            "text/event-stream": {
+                "example": (
+                    'id: 1\nevent: status\ndata: {"stage": "describing"}\n\n'
+                    ": heartbeat\n\n"
+                    'id: 2\nevent: status\ndata: {"stage": "streaming"}\n\n'
+                    'id: 3\nevent: delta\ndata: {"text": "This meal..."}\n\n'
+                    "id: 4\nevent: done\ndata: {}\n\n"
+                )
+            }
         },
-        400: {
-            "description": "Bad Request - Image exceeds size limit",
-            "content": {
-                "application/json": {
-                    "example": {
-                        "detail": "Image too large. Maximum allowed size: 4194304 bytes, actual size: 5242880 bytes"
-                    }
+    },
+    400: {
+        "description": (
+            "Bad Request - Image exceeds size limit, has an unsupported format, cannot be fetched or was not uploaded"
+        ),
+        "content": {
+            "application/json": {
+                "example": {
+                    "detail": "Image too large. Maximum allowed size: 4194304 bytes, actual size: 5242880 bytes"
                 }
-            },
+            }
         },
-        500: {
-            "description": "Internal Server Error",
-            "content": {"application/json": {"example": {"detail": "Internal server error occurred"}}},
+    },
+    429: {
+        "description": "Too Many Requests - The LLM rate limits are exhausted, retry after `Retry-After` seconds",
+        "content": {
+            "application/json": {"example": {"detail": "Too many requests: the LLM provider asked to slow down"}}
         },
     },
-)
-async def process(body: Annotated[ImageRequest, Body(...)]) -> StreamingResponse:
+    500: {
+        "description": "Internal Server Error",
+        "content": {"application/json": {"example": {"detail": "Internal server error occurred"}}},
+    },
+    503: {
+        "description": "Service Unavailable - Too many requests are waiting for the LLM, retry after `Retry-After` seconds",
+        "content": {
+            "application/json": {
+                "example": {"detail": "Service temporarily unavailable: too many requests waiting for the LLM"}
+            }
+        },
+    },
+    504: {
+        "description": "Gateway Timeout - The request did not produce feedback within its deadline",
+        "content": {
+            "application/json": {
+                "example": {"detail": "Deadline exceeded: The fetch stage exceeded the 60 s deadline of the request"}
+            }
+        },
+    },
+}
+
+
+@diet_router.post("/process", responses=_PROCESS_RESPONSES)
+async def process(  # noqa: PLR0913, PLR0917 - the dependencies and headers of the route
+    body: Annotated[ImageRequest, Body(...)],
+    request: Request,
+    pipeline: PipelineDep,
+    settings: SettingsDep,
+    scheduler: SchedulerDep,
+    diet_log: DietLogDep,
+    user: Annotated[str | None, Header(alias="X-User-Key", min_length=1, max_length=256)] = None,
+    budget: Annotated[float | None, Header(alias="X-Request-Timeout", gt=0)] = None,
+) -> StreamingResponse:
     """Process an image of food and generate nutritional feedback.
 
     This endpoint fetches an image from a URL, processes it to generate a description,
-    and then streams nutritional feedback based on the description.
+    and then streams nutritional feedback based on the description. Descriptions are cached
+    by image content, so resubmitting the same image skips the description step, and
+    concurrent identical requests share a single download, description and feedback stream.
+    In "fused" mode the description and the feedback are streamed from a single LLM call,
+    so the first bytes arrive without waiting for a complete description.
+
+    The response is a stream of server-sent events: "status" events announce the
+    "describing" and "streaming" stages, "delta" events carry the text, and the stream ends
+    with a "done" event, or an "error" event with the `status_code` and `detail` of the
+    failure. With the "sections" output, the text is instead parsed as it arrives into
+    "section_start", "section_delta" and "section_end" events for each tagged section, a
+    "score" event is sent as soon as the score is complete, and the "done" event carries
+    the parsed `sections` and `score`. Heartbeat comments are sent every `DIETLOG_SSE_HEARTBEAT_INTERVAL` seconds
+    without events, and the LLM stream is cancelled as soon as the client disconnects.
+
+    Each LLM call is routed to a model by the latency tier of its stage, which the `tier`
+    field overrides: "fast" calls use a smaller model and fall back to the larger one when
+    they fail or return nothing.
+
+    LLM calls are admitted by a scheduler enforcing concurrency and rate limits. When it
+    is saturated, requests are rejected right away with a 429 or 503 and a `Retry-After`
+    header, or with an "error" event carrying `retry_after` once streaming has started.
+
+    The `Server-Timing` header reports the stages completed before streaming starts; the
+    later stages are recorded in the histograms served at `/metrics`.
+
+    Loading the image, describing it and waiting for the first token must complete within
+    the deadline of the request: `DIETLOG_REQUEST_TIMEOUT` seconds, or the `X-Request-Timeout`
+    header when it is shorter. Each stage may use a share of the budget left when it
+    starts, and a stage running out of it fails with a 504, or an "error" event once
+    streaming has started.
+
+    When the request carries an `X-User-Key` header, the completed analysis is stored in
+    the diet log of that user, served at `/diet/log`, before the "done" event is sent.
 
     Important:
     ---------
@@ -76,19 +341,636 @@ async def process(body: Annotated[ImageRequest, Body(...)]) -> StreamingResponse
         and use the web interface provided there.
 
     """
-    llm: LLMService = LLMProvider().llm()
-    img: ImageService = ImageProvider().img()
+    return await _stream_feedback(
+        request,
+        pipeline,
+        settings=settings,
+        scheduler=scheduler,
+        output=body.output,
+        tier=body.tier,
+        budget=budget,
+        record=partial(_record, diet_log, user) if user is not None else None,
+        start=lambda timing, digests, deadline: _start(
+            pipeline,
+            mode=body.mode or pipeline.default_mode,
+            tier=body.tier,
+            timing=timing,
+            stage="fetch",
+            load=lambda: pipeline.fetch(body.url),
+            digests=digests,
+            deadline=deadline,
+        ),
+    )
+
+
+@diet_router.post(
+    "/process/upload",
+    responses=_PROCESS_RESPONSES,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/octet-stream": {"schema": {"type": "string", "format": "binary"}},
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {"image": {"type": "string", "format": "binary"}},
+                        "required": ["image"],
+                    }
+                },
+            },
+        }
+    },
+)
+async def process_upload(  # noqa: PLR0913, PLR0917 - the dependencies and query parameters of the route
+    request: Request,
+    pipeline: PipelineDep,
+    settings: SettingsDep,
+    scheduler: SchedulerDep,
+    diet_log: DietLogDep,
+    mode: PipelineMode | None = None,
+    output: OutputFormat = "text",
+    tier: LatencyTier | None = None,
+    user: Annotated[str | None, Header(alias="X-User-Key", min_length=1, max_length=256)] = None,
+    budget: Annotated[float | None, Header(alias="X-Request-Timeout", gt=0)] = None,
+) -> StreamingResponse:
+    """Process an uploaded image of food and generate nutritional feedback.
+
+    This endpoint behaves like `/diet/process`, but the image is sent in the request body
+    instead of being downloaded from a URL, so it crosses the network only once. The body
+    is either the raw image, with an `application/octet-stream` or `image/*` content type,
+    or a `multipart/form-data` form with the image in its `image` field. It is read as a
+    stream and rejected as soon as it exceeds 4 MB. The pipeline mode, the output format and
+    the latency tier are selected with the `mode`, `output` and `tier` query parameters,
+    and the analysis is stored in the diet log of the user of the `X-User-Key` header.
+
+    """
+    return await _stream_feedback(
+        request,
+        pipeline,
+        settings=settings,
+        scheduler=scheduler,
+        output=output,
+        tier=tier,
+        budget=budget,
+        record=partial(_record, diet_log, user) if user is not None else None,
+        start=lambda timing, digests, deadline: _start(
+            pipeline,
+            mode=mode or pipeline.default_mode,
+            tier=tier,
+            timing=timing,
+            stage="upload",
+            load=lambda: read_upload(
+                request.headers.get("Content-Type", ""), request.headers.get("Content-Length"), request.stream()
+            ),
+            digests=digests,
+            deadline=deadline,
+        ),
+    )
+
+
+async def _start(  # noqa: PLR0913 - the options of the calling route
+    pipeline: DietPipeline,
+    *,
+    mode: PipelineMode,
+    tier: LatencyTier | None,
+    timing: ServerTiming,
+    stage: str,
+    load: Callable[[], Awaitable[memoryview]],
+    deadline: Deadline,
+    digests: list[str] | None = None,
+) -> AsyncIterator[str] | asyncio.Task[str]:
+    """Load an image within the in-flight bytes budget and start analysing it.
+
+    The maximum image size is reserved before loading, shrunk to the real size once the
+    image is loaded, and released as soon as the raw image is no longer needed: once it is
+    prepared in "fused" mode, once it is described in "two_phase" mode.
+
+    Parameters
+    ----------
+    pipeline : DietPipeline
+        The diet analysis pipeline.
+    mode : PipelineMode
+        The pipeline mode.
+    tier : LatencyTier | None
+        The latency tier of the LLM calls, or None for the default tiers.
+    timing : ServerTiming
+        The durations reported in the `Server-Timing` header.
+    stage : str
+        The name of the loading stage in the `Server-Timing` header.
+    load : Callable[[], Awaitable[memoryview]]
+        The function returning the raw image content.
+    deadline : Deadline
+        The deadline of the request, bounding the loading and preparation of the image.
+    digests : list[str] | None
+        The list receiving the SHA-256 digest of the image once it is loaded, or None when
+        the digest is not needed.
+
+    Returns
+    -------
+    AsyncIterator[str] | asyncio.Task[str]
+        The fused stream in "fused" mode, or the task describing the image in "two_phase" mode.
+
+    """
+    reservation: Reservation | None = None
+    try:
+        async with deadline.stage(stage):
+            with timing.measure("budget"):
+                reservation = await pipeline.budget.acquire(MAX_IMAGE_SIZE)
+            with timing.measure(stage):
+                bt = await load()
+        reservation.shrink(len(bt))
+        if digests is not None:
+            digests.append(hashlib.sha256(bt).hexdigest())
+        if mode == "fused":
+            with timing.measure("prepare"):
+                async with deadline.stage("prepare"):
+                    fused = await pipeline.fused(bt, tier)
+            reservation.release()
+            return fused
+    except BaseException:
+        if reservation is not None:
+            reservation.release()
+        raise
+
+    # Describing in a task releases the raw image as soon as the description is done,
+    # even if the response body is never iterated.
+    description = asyncio.ensure_future(pipeline.describe(bt, tier))
+    description.add_done_callback(lambda _: reservation.release())
+    return description
+
+
+async def _start_meal(  # noqa: PLR0913 - the options of the calling route
+    pipeline: DietPipeline,
+    urls: list[str],
+    *,
+    tier: LatencyTier | None,
+    timing: ServerTiming,
+    concurrency: int,
+    deadline: Deadline,
+    digests: list[str] | None = None,
+) -> asyncio.Task[str]:
+    """Fetch the photos of a meal within the in-flight bytes budget and start describing them.
+
+    The maximum size of every photo is reserved at once, capped to the whole budget, before
+    any is fetched. Photos are then fetched concurrently, at most `concurrency` at a time,
+    so a photo that cannot be fetched is reported as an HTTP error. The reservation is
+    shrunk to the real size of the photos, and released once the meal is described.
+
+    Parameters
+    ----------
+    pipeline : DietPipeline
+        The diet analysis pipeline.
+    urls : list[str]
+        The URLs of the photos.
+    tier : LatencyTier | None
+        The latency tier of the description calls, or None for the default tier.
+    timing : ServerTiming
+        The durations reported in the `Server-Timing` header.
+    concurrency : int
+        The maximum number of photos fetched or described at the same time.
+    deadline : Deadline
+        The deadline of the request, bounding the fetching of the photos.
+    digests : list[str] | None
+        The list receiving the SHA-256 digests of the photos, in the order of `urls`, once
+        they are fetched, or None when the digests are not needed.
+
+    Returns
+    -------
+    asyncio.Task[str]
+        The task describing the meal.
+
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    reservation: Reservation | None = None
+
+    async def load(url: str) -> memoryview:
+        async with semaphore:
+            return await pipeline.fetch(url)
+
+    try:
+        async with deadline.stage("fetch"):
+            # The whole meal is reserved at once: photos reserving their bytes one by one
+            # could each hold part of the budget while waiting for the rest, deadlocking
+            # concurrent meals.
+            with timing.measure("budget"):
+                reservation = await pipeline.budget.acquire(len(urls) * MAX_IMAGE_SIZE)
+            with timing.measure("fetch"):
+                async with asyncio.TaskGroup() as group:
+                    tasks = [group.create_task(load(url)) for url in urls]
+    except BaseException as e:
+        if reservation is not None:
+            reservation.release()
+        if isinstance(e, ExceptionGroup):
+            raise e.exceptions[0] from None
+        raise
+
+    contents = [task.result() for task in tasks]
+    reservation.shrink(sum(len(content) for content in contents))
+    if digests is not None:
+        digests.extend(hashlib.sha256(content).hexdigest() for content in contents)
+    description = asyncio.ensure_future(pipeline.describe_meal(contents, tier, concurrency))
+    description.add_done_callback(lambda _: reservation.release())
+    return description
+
+
+def _error_event(error: Exception) -> ServerSentEvent:
+    """Report an error raised after streaming started as an "error" event.
+
+    Parameters
+    ----------
+    error : Exception
+        The error raised while processing an image.
+
+    Returns
+    -------
+    ServerSentEvent
+        An "error" event with the `status_code`, `detail` and, for rate limiting and
+        overload, `retry_after` of the equivalent HTTP error.
+
+    """
+    http_error = _to_http_exception(error)
+    data: dict[str, Any] = {"status_code": http_error.status_code, "detail": http_error.detail}
+    if http_error.headers is not None and "Retry-After" in http_error.headers:
+        data["retry_after"] = int(http_error.headers["Retry-After"])
+    return ServerSentEvent("error", data)
+
+
+async def _events(  # noqa: PLR0913 - the options of the calling route
+    pipeline: DietPipeline,
+    source: AsyncIterator[str] | asyncio.Task[str],
+    output: OutputFormat = "text",
+    tier: LatencyTier | None = None,
+    record: Callable[[str, str], Awaitable[None]] | None = None,
+    *,
+    deadline: Deadline,
+) -> AsyncIterator[ServerSentEvent]:
+    """Turn a started analysis into server-sent events.
+
+    Parameters
+    ----------
+    pipeline : DietPipeline
+        The diet analysis pipeline.
+    source : AsyncIterator[str] | asyncio.Task[str]
+        The fused stream, or the task describing the image, returned by `_start`.
+    output : OutputFormat
+        Whether the text is sent as is or parsed into sections.
+    tier : LatencyTier | None
+        The latency tier of the feedback call, or None for the default tier.
+    record : Callable[[str, str], Awaitable[None]] | None
+        The function storing the description and the complete text of a successful
+        analysis before the "done" event, or None to not store it. The description is empty
+        in "fused" mode, where it is part of the text.
+    deadline : Deadline
+        The deadline of the request, bounding the description and the first token.
+
+    Yields
+    ------
+    ServerSentEvent
+        The "status" events of the analysis, its text as "delta" events or parsed into
+        section events, then a "done" or "error" event.
+
+    """
+    parser = FeedbackParser() if output == "sections" else None
+    text: list[str] = []
+    try:
+        description = ""
+        if isinstance(source, asyncio.Task):
+            yield ServerSentEvent.status("describing")
+            async with deadline.stage("description"):
+                description = await source
+            chunks = pipeline.feedback(description, tier)
+        else:
+            chunks = source
+        yield ServerSentEvent.status("streaming")
+        async for chunk in deadline.first(chunks):
+            text.append(chunk)
+            if parser is None:
+                yield ServerSentEvent.delta(chunk)
+            else:
+                for event in parser.feed(chunk):
+                    yield event
+        if record is not None:
+            await record(description, "".join(text))
+    except Exception as e:  # noqa: BLE001 - the response has started, so errors are sent as events
+        yield _error_event(e)
+        return
+    finally:
+        if isinstance(source, asyncio.Task):
+            _ = source.cancel()
+    if parser is None:
+        yield ServerSentEvent("done")
+        return
+    for event in parser.close():
+        yield event
+    yield ServerSentEvent("done", parser.result())
+
+
+async def _record(diet_log: DietLogStore, user: str, digests: list[str], description: str, feedback: str) -> None:
+    """Store a completed analysis in the diet log of a user.
+
+    Parameters
+    ----------
+    diet_log : DietLogStore
+        The diet log.
+    user : str
+        The key of the user.
+    digests : list[str]
+        The SHA-256 digests of the analysed images. The entry of a meal of several photos
+        is keyed by the digest of their digests.
+    description : str
+        The description of the images, or an empty string when it is part of the feedback,
+        as in "fused" mode.
+    feedback : str
+        The complete text of the feedback.
+
+    """
+    parser = FeedbackParser()
+    _ = parser.feed(feedback)
+    _ = parser.close()
+    image_hash = digests[0] if len(digests) == 1 else hashlib.sha256("".join(digests).encode()).hexdigest()
+    entry = LogEntry(
+        None,
+        user,
+        image_hash,
+        description or parser.sections.get("image_description", ""),
+        feedback,
+        parser.score,
+        time.time(),
+    )
+    _ = await diet_log.add(entry)
+
+
+async def run_job(pipeline: DietPipeline, job: Job) -> AsyncIterator[ServerSentEvent]:
+    """Analyse the image of a job, producing the same events as `/diet/process`.
+
+    Parameters
+    ----------
+    pipeline : DietPipeline
+        The diet analysis pipeline.
+    job : Job
+        The job to run.
+
+    Yields
+    ------
+    ServerSentEvent
+        The events of the analysis, ending with a "done" or "error" event.
+
+    """
+    mode = cast("PipelineMode", job.mode)
+    output = cast("OutputFormat", job.output)
+    tier = cast("LatencyTier | None", job.tier)
+    try:
+        source = await _start(
+            pipeline,
+            mode=mode,
+            tier=tier,
+            timing=ServerTiming(),
+            stage="fetch",
+            load=lambda: pipeline.fetch(job.url),
+            deadline=Deadline(None),
+        )
+    except Exception as e:  # noqa: BLE001 - job errors are reported as events
+        yield _error_event(e)
+        return
+    async for event in _events(pipeline, source, output, tier, deadline=Deadline(None)):
+        yield event
+
+
+async def _stream_feedback(  # noqa: PLR0913 - the dependencies of the calling route
+    request: Request,
+    pipeline: DietPipeline,
+    *,
+    settings: Settings,
+    scheduler: LLMScheduler | None,
+    output: OutputFormat,
+    tier: LatencyTier | None,
+    start: Callable[[ServerTiming, list[str], Deadline], Awaitable[AsyncIterator[str] | asyncio.Task[str]]],
+    budget: float | None = None,
+    record: Callable[[list[str], str, str], Awaitable[None]] | None = None,
+) -> StreamingResponse:
+    """Load the images of a request and stream their nutritional feedback as server-sent events.
+
+    Errors raised before streaming starts are reported as HTTP errors, later errors as an
+    "error" event.
+
+    Parameters
+    ----------
+    request : Request
+        The incoming request, watched for client disconnection.
+    pipeline : DietPipeline
+        The diet analysis pipeline.
+    settings : Settings
+        The application settings.
+    scheduler : LLMScheduler | None
+        The scheduler admitting LLM calls, checked before the images are loaded.
+    output : OutputFormat
+        Whether the text is sent as is or parsed into sections.
+    tier : LatencyTier | None
+        The latency tier of the feedback call, or None for the default tier.
+    start : Callable[[ServerTiming, list[str], Deadline], Awaitable[AsyncIterator[str] | asyncio.Task[str]]]
+        The function loading the images and starting the analysis, such as `_start`,
+        recording its stages in the given `Server-Timing` durations and the digests of the
+        images in the given list, within the given deadline.
+    budget : float | None
+        The time budget in seconds requested by the client, or None for `Settings.request_timeout`.
+        The shorter of the two applies.
+    record : Callable[[list[str], str, str], Awaitable[None]] | None
+        The function storing a successful analysis from the digests of its images, its
+        description and its text, such as `_record`, or None to not store it.
+
+    Returns
+    -------
+    StreamingResponse
+        The stream of server-sent events.
+
+    Raises
+    ------
+    HTTPException
+        If the request is shed, or an image cannot be loaded or prepared.
+
+    """
+    timing = ServerTiming()
+    digests: list[str] = []
+    budgets = [seconds for seconds in (budget, settings.request_timeout) if seconds]
+    deadline = Deadline(min(budgets) if budgets else None)
+    # Activated before the analysis starts, so the tasks it spawns inherit the deadline.
+    deadline.activate()
+    try:
+        if scheduler is not None:
+            scheduler.check()
+        source = await start(timing, digests, deadline)
+    except Exception as e:
+        raise _to_http_exception(e) from e
+
+    stream = EventStream(request.is_disconnected, settings.sse_heartbeat_interval)
+    store = partial(record, digests) if record is not None else None
+    return StreamingResponse(
+        stream.stream(_events(pipeline, source, output, tier, store, deadline=deadline)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Server-Timing": timing.header()},
+    )
+
+
+@diet_router.post("/process/meal", responses=_PROCESS_RESPONSES)
+async def process_meal(  # noqa: PLR0913, PLR0917 - the dependencies and headers of the route
+    body: Annotated[MealRequest, Body(...)],
+    request: Request,
+    pipeline: PipelineDep,
+    settings: SettingsDep,
+    scheduler: SchedulerDep,
+    diet_log: DietLogDep,
+    user: Annotated[str | None, Header(alias="X-User-Key", min_length=1, max_length=256)] = None,
+    budget: Annotated[float | None, Header(alias="X-Request-Timeout", gt=0)] = None,
+) -> StreamingResponse:
+    """Process the photos of a meal and generate a single nutritional feedback for it.
+
+    A meal is often photographed in several shots, such as the plate, a drink and a side.
+    The photos are fetched and described concurrently, at most `DIETLOG_MEAL_CONCURRENCY`
+    at a time, so the description phase takes about as long as the slowest photo. Their
+    descriptions are then merged into a single feedback stream covering the whole meal.
+
+    The response is a stream of server-sent events, as for `/diet/process` in "two_phase"
+    mode. Photos that cannot be fetched are reported as HTTP errors before streaming
+    starts; photos that cannot be described end the stream with an "error" event. With an
+    `X-User-Key` header, the meal is stored in the diet log of that user as a single entry.
+
+    """
+    return await _stream_feedback(
+        request,
+        pipeline,
+        settings=settings,
+        scheduler=scheduler,
+        output=body.output,
+        tier=body.tier,
+        budget=budget,
+        record=partial(_record, diet_log, user) if user is not None else None,
+        start=lambda timing, digests, deadline: _start_meal(
+            pipeline,
+            body.urls,
+            tier=body.tier,
+            timing=timing,
+            concurrency=settings.meal_concurrency,
+            digests=digests,
+            deadline=deadline,
+        ),
+    )
+
+
+@diet_router.post(
+    "/process/batch",
+    responses={
+        200: {
+            "description": "Successful response with one JSON line per image, in completion order",
+            "content": {
+                "application/x-ndjson": {
+                    "example": (
+                        '{"index": 1, "url": "https://example.com/b.jpg", "status": "ok", '
+                        '"description": "...", "feedback": "..."}\n'
+                        '{"index": 0, "url": "https://example.com/a.jpg", "status": "error", '
+                        '"status_code": 400, "detail": "Image too large. ..."}\n'
+                    )
+                }
+            },
+        },
+    },
+)
+async def process_batch(
+    body: Annotated[BatchImageRequest, Body(...)], pipeline: PipelineDep, settings: SettingsDep
+) -> StreamingResponse:
+    """Process several images of food and report the result of each one as soon as it is ready.
+
+    Images are processed concurrently, at most `DIETLOG_BATCH_CONCURRENCY` at a time. The
+    response is a stream of newline-delimited JSON objects, one per image, tagged with the
+    index of the image in the request. Errors affecting a single image, such as an image
+    that is too large, are reported in that image's object and do not interrupt the batch.
 
-    url = body.url
+    """
+    semaphore = asyncio.Semaphore(settings.batch_concurrency)
+
+    async def run(index: int, url: str) -> dict[str, Any]:
+        async with semaphore:
+            try:
+                description, feedback = await pipeline.analyse(url, body.tier)
+            except Exception as e:  # noqa: BLE001 - reported inline for this item only
+                error = _to_http_exception(e)
+                return {
+                    "index": index,
+                    "url": url,
+                    "status": "error",
+                    "status_code": error.status_code,
+                    "detail": error.detail,
+                }
+        return {"index": index, "url": url, "status": "ok", "description": description, "feedback": feedback}
+
+    async def generate() -> AsyncIterator[str]:
+        tasks = [asyncio.ensure_future(run(index, url)) for index, url in enumerate(body.urls)]
+        try:
+            for completed in asyncio.as_completed(tasks):
+                yield json.dumps(await completed) + "\n"
+        finally:
+            for task in tasks:
+                _ = task.cancel()
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+@diet_router.post("/jobs", status_code=202, responses={503: _PROCESS_RESPONSES[503]})
+async def submit_job(body: Annotated[ImageRequest, Body(...)], pipeline: PipelineDep, jobs: JobsDep) -> JobResponse:
+    """Submit an image of food for analysis in the background.
+
+    The job is queued and its identifier returned right away, so no connection is held
+    open while the LLM runs. The job runs with the `mode`, `output` and `tier` of the
+    request. The result is streamed by `GET /diet/jobs/{job_id}/stream` and kept for `DIETLOG_JOB_TTL` seconds. When `DIETLOG_JOB_QUEUE_SIZE` jobs are already
+    waiting, the request is rejected with a 503 and a `Retry-After` header.
+
+    """
     try:
-        bt = img.fetch_img_content(url)
-        content = img.decode_img_bytes(bt)
-        desc = await llm.get_image_description(content)
-        return await llm.stream_nutritional_feedback(desc)
-    except ImageTooLargeError as e:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Image too large. Maximum allowed size: {e.max_size} bytes, actual size: {e.actual_size} bytes",
-        ) from e
+        job = await jobs.submit(body.url, body.mode or pipeline.default_mode, body.output, body.tier)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal server error occurred: {e!s}") from e
+        raise _to_http_exception(e) from e
+    return JobResponse.of(job)
+
+
+@diet_router.get("/jobs/{job_id}", responses={404: {"description": "Unknown or expired job"}})
+async def get_job(job_id: str, jobs: JobsDep) -> JobResponse:
+    """Report the state of an analysis job."""
+    job = await jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return JobResponse.of(job)
+
+
+@diet_router.get(
+    "/jobs/{job_id}/stream",
+    responses={
+        200: _PROCESS_RESPONSES[200],
+        404: {"description": "Unknown or expired job"},
+    },
+)
+async def stream_job(
+    job_id: str,
+    request: Request,
+    jobs: JobsDep,
+    settings: SettingsDep,
+    last_event_id: Annotated[int, Header(alias="Last-Event-ID", ge=0)] = 0,
+) -> StreamingResponse:
+    """Stream the result of an analysis job as server-sent events.
+
+    The events are the same as those of `/diet/process`. A running job is followed live;
+    a finished job is replayed from the job store without running the analysis again.
+    Clients that reconnect send the id of the last event they received in the
+    `Last-Event-ID` header, as browsers do automatically with `EventSource`, and the stream
+    resumes with the following event. Disconnecting does not cancel the job.
+
+    """
+    job = await jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+
+    stream = EventStream(request.is_disconnected, settings.sse_heartbeat_interval)
+    return StreamingResponse(
+        stream.stream(jobs.follow(job_id, last_event_id), first_id=last_event_id + 1),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,166 @@
+"""Diet log endpoints.
+
+This module provides endpoints reading the diet log of a user: the history of the
+analysed meals, and the daily and weekly aggregates of their health scores. Analyses are
+added to the log by the processing endpoints when the request carries an `X-User-Key`
+header.
+"""
+
+import datetime as dt
+from typing import Annotated
+
+from fastapi import APIRouter, Header, Query
+from pydantic import BaseModel
+
+from app.api.dependencies import DietLogDep
+from app.interfaces.diet_log import LogEntry, Rollup, RollupPeriod
+
+log_router = APIRouter(prefix="/diet/log")
+
+UserKey = Annotated[str, Header(alias="X-User-Key", min_length=1, max_length=256)]
+"""The `X-User-Key` header identifying the user whose log is read."""
+
+
+class LogEntryResponse(BaseModel):
+    """Describes an analysed meal of the diet log.
+
+    Attributes
+    ----------
+    id : int
+        The identifier of the entry.
+    image_hash : str
+        The SHA-256 digest of the analysed image, or of the digests of every photo of a meal.
+    description : str
+        The description of the meal.
+    feedback : str
+        The complete nutritional feedback.
+    score : float | None
+        The health score parsed from the feedback, or None when it has none.
+    created_at : float
+        The UNIX time at which the analysis completed.
+
+    """
+
+    id: int
+    image_hash: str
+    description: str
+    feedback: str
+    score: float | None
+    created_at: float
+
+    @classmethod
+    def of(cls, entry: LogEntry) -> "LogEntryResponse":
+        """Describe an entry.
+
+        Parameters
+        ----------
+        entry : LogEntry
+            The stored entry.
+
+        Returns
+        -------
+        LogEntryResponse
+            The description of the entry.
+
+        """
+        return cls(
+            id=entry.id or 0,
+            image_hash=entry.image_hash,
+            description=entry.description,
+            feedback=entry.feedback,
+            score=entry.score,
+            created_at=entry.created_at,
+        )
+
+
+class RollupResponse(BaseModel):
+    """Describes the aggregated scores of a day or a week.
+
+    Attributes
+    ----------
+    start : str
+        The first day of the period, as an ISO date in UTC.
+    entries : int
+        The number of meals logged during the period.
+    scored : int
+        The number of those meals with a score.
+    mean_score : float | None
+        The average score, or None when no meal has a score.
+    min_score : float | None
+        The lowest score, or None when no meal has a score.
+    max_score : float | None
+        The highest score, or None when no meal has a score.
+
+    """
+
+    start: str
+    entries: int
+    scored: int
+    mean_score: float | None
+    min_score: float | None
+    max_score: float | None
+
+    @classmethod
+    def of(cls, rollup: Rollup) -> "RollupResponse":
+        """Describe a rollup.
+
+        Parameters
+        ----------
+        rollup : Rollup
+            The stored rollup.
+
+        Returns
+        -------
+        RollupResponse
+            The description of the rollup.
+
+        """
+        return cls(
+            start=rollup.start,
+            entries=rollup.entries,
+            scored=rollup.scored,
+            mean_score=rollup.mean_score,
+            min_score=rollup.score_min,
+            max_score=rollup.score_max,
+        )
+
+
+@log_router.get("")
+async def history(
+    user: UserKey,
+    diet_log: DietLogDep,
+    before: Annotated[float | None, Query()] = None,
+    limit: Annotated[int, Query(ge=1, le=200)] = 50,
+) -> list[LogEntryResponse]:
+    """List the latest analysed meals of a user, newest first.
+
+    Older meals are paged through by passing the `created_at` of the last entry received
+    as the `before` query parameter.
+
+    """
+    return [LogEntryResponse.of(entry) for entry in await diet_log.history(user, before=before, limit=limit)]
+
+
+@log_router.get("/rollups")
+async def rollups(
+    user: UserKey,
+    diet_log: DietLogDep,
+    period: RollupPeriod = "day",
+    since: dt.date | None = None,
+    until: dt.date | None = None,
+) -> list[RollupResponse]:
+    """Report the health scores of a user aggregated by day or by week, oldest first.
+
+    Aggregates are maintained as meals are logged, so they are read without scanning the
+    log. Weeks start on Monday and days are in UTC. The `since` and `until` query
+    parameters bound the first day of the periods returned; periods without meals are
+    omitted.
+
+    """
+    found = await diet_log.rollups(
+        user,
+        period,
+        since=since.isoformat() if since is not None else None,
+        until=until.isoformat() if until is not None else None,
+    )
+    return [RollupResponse.of(rollup) for rollup in found]
@@ -0,0 +1,73 @@
+"""Metrics endpoint.
+
+This module exposes the in-process pipeline metrics, the LLM token usage and the cache
+counters in the Prometheus text exposition format.
+"""
+
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from app.api.dependencies import get_registry
+from app.providers.registry import ServiceRegistry
+from app.services.metrics import Counter
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+async def metrics(registry: Annotated[ServiceRegistry, Depends(get_registry)]) -> PlainTextResponse:
+    """Report the application metrics in the Prometheus text format.
+
+    The report contains the duration of every pipeline stage, the size of the fetched and
+    prepared images and of the LLM streams, the tokens used by the LLM, the hits, misses
+    and evictions of the description, feedback and image download caches, the results of near-duplicate
+    image lookups, and the raw image bytes held by in-flight requests.
+
+    """
+    lines = registry.metrics.render()
+
+    usage = registry.llm.usage
+    lines += Counter.snapshot(
+        "dietlog_llm_requests_total",
+        "Completed LLM requests.",
+        "provider",
+        {registry.settings.llm_provider: usage.requests},
+    ).render()
+    lines += Counter.snapshot(
+        "dietlog_llm_tokens_total",
+        "Tokens used by the LLM.",
+        "kind",
+        {
+            "input": usage.input_tokens,
+            "output": usage.output_tokens,
+            "cache_creation_input": usage.cache_creation_input_tokens,
+            "cache_read_input": usage.cache_read_input_tokens,
+        },
+    ).render()
+
+    caches = {"description": registry.description_cache, "feedback": registry.feedback_cache}
+    stats = {name: cache.stats for name, cache in caches.items() if cache is not None}
+    fetch_stats = registry.img.cache_stats()
+    if fetch_stats is not None:
+        stats["fetch"] = fetch_stats
+    for event in ("hits", "misses", "evictions"):
+        lines += Counter.snapshot(
+            f"dietlog_cache_{event}_total",
+            f"Cache {event}.",
+            "cache",
+            {name: getattr(cache_stats, event) for name, cache_stats in stats.items()},
+        ).render()
+
+    budget = registry.pipeline.budget
+    lines += [
+        "# HELP dietlog_inflight_image_bytes Raw image bytes reserved by in-flight requests.",
+        "# TYPE dietlog_inflight_image_bytes gauge",
+        f"dietlog_inflight_image_bytes {budget.in_use}",
+        "# HELP dietlog_inflight_image_waiting Requests waiting for image bytes to be released.",
+        "# TYPE dietlog_inflight_image_waiting gauge",
+        f"dietlog_inflight_image_waiting {budget.waiting}",
+    ]
+
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
@@ -0,0 +1,278 @@
+"""Application configuration module.
+
+This module defines the `Settings` class, which gathers runtime configuration from
+environment variables. Every setting has a default so the application can start with
+only the credentials required by the selected integrations.
+"""
+
+import os
+
+
+class Settings:
+    """Runtime configuration for DietLogApp.
+
+    Values are read from environment variables prefixed with `DIETLOG_` when the
+    instance is created, so `.env` files must be loaded beforehand.
+
+    Attributes
+    ----------
+    llm_provider : str
+        The name of the LLM service implementation to use. Defaults to "anthropic".
+    image_provider : str
+        The name of the image service implementation to use. Defaults to "httpx".
+    description_cache : str
+        The backend used to cache image descriptions: "memory", "sqlite", "shared" or "none".
+        Defaults to "memory".
+    description_cache_path : str
+        The SQLite database file used by the "sqlite" and "shared" description caches.
+        Defaults to "dietlog-descriptions.sqlite3".
+    description_cache_ttl : float
+        The number of seconds a cached description stays valid. Defaults to one day.
+    description_cache_max_entries : int
+        The maximum number of cached descriptions.
+    description_cache_max_bytes : int
+        The maximum total size of the cached descriptions in bytes.
+    near_duplicate_distance : int
+        The maximum number of differing bits between the perceptual hashes of images whose
+        descriptions are shared. Defaults to 4.
+    near_duplicate_max_entries : int
+        The maximum number of images indexed by perceptual hash, or 0 to disable
+        near-duplicate detection. Defaults to 4096.
+    feedback_cache : str
+        The backend used to cache completed feedback streams: "memory", "sqlite", "shared" or
+        "none". Defaults to "memory".
+    feedback_cache_path : str
+        The SQLite database file used by the "sqlite" and "shared" feedback caches.
+        Defaults to "dietlog-feedback.sqlite3".
+    feedback_cache_ttl : float
+        The number of seconds a cached feedback stream stays valid. Defaults to one day.
+    feedback_cache_max_entries : int
+        The maximum number of cached feedback streams.
+    feedback_cache_max_bytes : int
+        The maximum total size of the cached feedback streams in bytes.
+    feedback_cache_paced : bool
+        Whether cached feedback is replayed with the pacing of the original stream.
+    pipeline_mode : str
+        The default pipeline mode: "two_phase" describes the image before streaming the
+        feedback, "fused" streams both from a single LLM call. Defaults to "two_phase".
+    image_max_edge : int
+        The maximum length in pixels of the longest edge of images sent to the LLM. Larger
+        images are downsized. Defaults to 1568.
+    image_format : str
+        The format used to re-encode downsized images: "jpeg" or "webp". Defaults to "jpeg".
+    image_quality : int
+        The encoder quality used to re-encode downsized images. Defaults to 85.
+    image_workers : int
+        The number of threads used to preprocess images. Defaults to 4.
+    batch_concurrency : int
+        The maximum number of images of a batch request processed at the same time.
+    meal_concurrency : int
+        The maximum number of photos of a meal request fetched or described at the same time.
+        Defaults to 4.
+    fetch_cache_max_bytes : int
+        The maximum total size of the cached image downloads in bytes, or 0 to disable the cache.
+    fetch_cache_negative_ttl : float
+        The number of seconds a URL that failed with a client error or an oversized body is
+        rejected without network I/O.
+    fetch_cache_shared_path : str
+        The SQLite database file of the image downloads shared by the worker processes.
+        Defaults to "dietlog-images.sqlite3".
+    fetch_cache_shared_max_bytes : int
+        The maximum total size in bytes of the image downloads shared by the worker
+        processes, or 0 to only cache downloads in process. Defaults to 0.
+    fetch_cache_shared_max_entries : int
+        The maximum number of image downloads shared by the worker processes. Downloads are
+        bounded by size, so this only caps the number of tiny images. Defaults to 65536.
+    inflight_image_bytes : int
+        The maximum total size in bytes of the raw images held by in-flight requests;
+        requests wait for images to be released beyond it. Defaults to 128 MiB.
+    job_store_path : str
+        The database file of the background job store. Defaults to "dietlog-jobs.sqlite3".
+    job_workers : int
+        The number of background jobs run at the same time. Defaults to 8.
+    job_queue_size : int
+        The maximum number of background jobs waiting for a worker. Defaults to 256.
+    job_ttl : float
+        The number of seconds the result of a background job is kept. Defaults to one day.
+    diet_log_path : str
+        The database file of the diet log. Defaults to "dietlog-log.sqlite3".
+    sse_heartbeat_interval : float
+        The number of seconds without an event after which a heartbeat is sent to streaming
+        clients. Defaults to 15.
+    llm_model : str
+        The larger model, used by the "quality" tier, as the fallback of the "fast" tier
+        and by LLM calls that do not select a model. Defaults to "claude-3-5-sonnet-latest".
+    llm_fast_model : str
+        The smaller, faster model used by the "fast" tier. Defaults to "claude-3-haiku-20240307".
+    llm_description_tier : str
+        The default latency tier of image descriptions: "fast" or "quality". Defaults to "fast".
+    llm_feedback_tier : str
+        The default latency tier of nutritional feedback. Defaults to "quality".
+    llm_fused_tier : str
+        The default latency tier of fused analyses. Defaults to "quality".
+    llm_fast_max_image_bytes : int
+        The size in bytes of the largest raw image sent to the fast model, or 0 for no limit.
+        Defaults to 0.
+    llm_timeout : float
+        The maximum number of seconds an LLM call waits for a response, or between two
+        chunks of a stream. Defaults to 60.
+    llm_retries : int
+        The number of times a failed LLM call is retried with the "quality" model, when the
+        request deadline leaves time for it. Defaults to 1.
+    llm_hedge_quantile : float
+        The quantile of the recent latencies of image descriptions after which an identical
+        description call is started and the first result kept, such as 0.95, or 0 to
+        disable hedging. Defaults to 0.
+    request_timeout : float
+        The time budget in seconds of a processing request before its first feedback chunk,
+        split across loading, describing and the first token. Requests can shorten it with
+        the `X-Request-Timeout` header. 0 disables the deadline. Defaults to 60.
+    llm_max_concurrency : int
+        The maximum number of LLM calls running at the same time. Defaults to 16.
+    llm_requests_per_minute : int
+        The maximum number of LLM calls started per minute, or 0 to only follow the limits
+        reported by the provider. Defaults to 0.
+    llm_tokens_per_minute : int
+        The maximum number of estimated LLM tokens per minute, or 0 to only follow the limits
+        reported by the provider. Defaults to 0.
+    llm_queue_size : int
+        The maximum number of LLM calls waiting to start. Defaults to 64.
+    llm_queue_timeout : float
+        The maximum number of seconds an LLM call waits to start before it is rejected.
+        Defaults to 10.
+
+    """
+
+    def __init__(self) -> None:
+        """Initialize the settings from the current environment."""
+        self.llm_provider: str = self._str("LLM_PROVIDER", "anthropic")
+        self.image_provider: str = self._str("IMAGE_PROVIDER", "httpx")
+        self.description_cache: str = self._str("DESCRIPTION_CACHE", "memory")
+        self.description_cache_path: str = self._str("DESCRIPTION_CACHE_PATH", "dietlog-descriptions.sqlite3")
+        self.description_cache_ttl: float = self._float("DESCRIPTION_CACHE_TTL", 24 * 60 * 60)
+        self.description_cache_max_entries: int = self._int("DESCRIPTION_CACHE_MAX_ENTRIES", 4096)
+        self.description_cache_max_bytes: int = self._int("DESCRIPTION_CACHE_MAX_BYTES", 16 * 1024 * 1024)
+        self.near_duplicate_distance: int = self._int("NEAR_DUPLICATE_DISTANCE", 4)
+        self.near_duplicate_max_entries: int = self._int("NEAR_DUPLICATE_MAX_ENTRIES", 4096)
+        self.feedback_cache: str = self._str("FEEDBACK_CACHE", "memory")
+        self.feedback_cache_path: str = self._str("FEEDBACK_CACHE_PATH", "dietlog-feedback.sqlite3")
+        self.feedback_cache_ttl: float = self._float("FEEDBACK_CACHE_TTL", 24 * 60 * 60)
+        self.feedback_cache_max_entries: int = self._int("FEEDBACK_CACHE_MAX_ENTRIES", 1024)
+        self.feedback_cache_max_bytes: int = self._int("FEEDBACK_CACHE_MAX_BYTES", 16 * 1024 * 1024)
+        self.feedback_cache_paced: bool = self._bool("FEEDBACK_CACHE_PACED", default=False)
+        self.pipeline_mode: str = self._str("PIPELINE_MODE", "two_phase")
+        self.image_max_edge: int = self._int("IMAGE_MAX_EDGE", 1568)
+        self.image_format: str = self._str("IMAGE_FORMAT", "jpeg")
+        self.image_quality: int = self._int("IMAGE_QUALITY", 85)
+        self.image_workers: int = self._int("IMAGE_WORKERS", 4)
+        self.batch_concurrency: int = self._int("BATCH_CONCURRENCY", 4)
+        self.meal_concurrency: int = self._int("MEAL_CONCURRENCY", 4)
+        self.fetch_cache_max_bytes: int = self._int("FETCH_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+        self.fetch_cache_negative_ttl: float = self._float("FETCH_CACHE_NEGATIVE_TTL", 60)
+        self.fetch_cache_shared_path: str = self._str("FETCH_CACHE_SHARED_PATH", "dietlog-images.sqlite3")
+        self.fetch_cache_shared_max_bytes: int = self._int("FETCH_CACHE_SHARED_MAX_BYTES", 0)
+        self.fetch_cache_shared_max_entries: int = self._int("FETCH_CACHE_SHARED_MAX_ENTRIES", 65536)
+        self.inflight_image_bytes: int = self._int("INFLIGHT_IMAGE_BYTES", 128 * 1024 * 1024)
+        self.job_store_path: str = self._str("JOB_STORE_PATH", "dietlog-jobs.sqlite3")
+        self.job_workers: int = self._int("JOB_WORKERS", 8)
+        self.job_queue_size: int = self._int("JOB_QUEUE_SIZE", 256)
+        self.job_ttl: float = self._float("JOB_TTL", 86400)
+        self.diet_log_path: str = self._str("DIET_LOG_PATH", "dietlog-log.sqlite3")
+        self.sse_heartbeat_interval: float = self._float("SSE_HEARTBEAT_INTERVAL", 15)
+        self.llm_model: str = self._str("LLM_MODEL", "claude-3-5-sonnet-latest")
+        self.llm_fast_model: str = self._str("LLM_FAST_MODEL", "claude-3-haiku-20240307")
+        self.llm_description_tier: str = self._str("LLM_DESCRIPTION_TIER", "fast")
+        self.llm_feedback_tier: str = self._str("LLM_FEEDBACK_TIER", "quality")
+        self.llm_fused_tier: str = self._str("LLM_FUSED_TIER", "quality")
+        self.llm_fast_max_image_bytes: int = self._int("LLM_FAST_MAX_IMAGE_BYTES", 0)
+        self.llm_timeout: float = self._float("LLM_TIMEOUT", 60)
+        self.llm_retries: int = self._int("LLM_RETRIES", 1)
+        self.llm_hedge_quantile: float = self._float("LLM_HEDGE_QUANTILE", 0)
+        self.request_timeout: float = self._float("REQUEST_TIMEOUT", 60)
+        self.llm_max_concurrency: int = self._int("LLM_MAX_CONCURRENCY", 16)
+        self.llm_requests_per_minute: int = self._int("LLM_REQUESTS_PER_MINUTE", 0)
+        self.llm_tokens_per_minute: int = self._int("LLM_TOKENS_PER_MINUTE", 0)
+        self.llm_queue_size: int = self._int("LLM_QUEUE_SIZE", 64)
+        self.llm_queue_timeout: float = self._float("LLM_QUEUE_TIMEOUT", 10)
+
+    @staticmethod
+    def _str(name: str, default: str) -> str:
+        """Read a string setting.
+
+        Parameters
+        ----------
+        name : str
+            The setting name, without the `DIETLOG_` prefix.
+        default : str
+            The value used when the variable is not set.
+
+        Returns
+        -------
+        str
+            The configured value.
+
+        """
+        return os.environ.get(f"DIETLOG_{name}", default)
+
+    @staticmethod
+    def _int(name: str, default: int) -> int:
+        """Read an integer setting.
+
+        Parameters
+        ----------
+        name : str
+            The setting name, without the `DIETLOG_` prefix.
+        default : int
+            The value used when the variable is not set.
+
+        Returns
+        -------
+        int
+            The configured value.
+
+        """
+        value = os.environ.get(f"DIETLOG_{name}")
+        return int(value) if value is not None else default
+
+    @staticmethod
+    def _float(name: str, default: float) -> float:
+        """Read a floating-point setting.
+
+        Parameters
+        ----------
+        name : str
+            The setting name, without the `DIETLOG_` prefix.
+        default : float
+            The value used when the variable is not set.
+
+        Returns
+        -------
+        float
+            The configured value.
+
+        """
+        value = os.environ.get(f"DIETLOG_{name}")
+        return float(value) if value is not None else default
+
+    @staticmethod
+    def _bool(name: str, *, default: bool) -> bool:
+        """Read a boolean setting.
+
+        The values "1", "true", "yes" and "on" (in any case) are read as true, anything
+        else as false.
+
+        Parameters
+        ----------
+        name : str
+            The setting name, without the `DIETLOG_` prefix.
+        default : bool
+            The value used when the variable is not set.
+
+        Returns
+        -------
+        bool
+            The configured value.
+
+        """
+        value = os.environ.get(f"DIETLOG_{name}")
+        return value.strip().lower() in {"1", "true", "yes", "on"} if value is not None else default
@@ -0,0 +1,30 @@
+"""Custom exceptions related to request deadlines.
+
+This module defines the exception raised when a stage of a request does not complete
+within its share of the time budget of the request.
+"""
+
+
+class DeadlineExceededError(Exception):
+    """Exception raised when a stage of a request runs out of the request's time budget.
+
+    Attributes:
+        stage (str): The stage that did not complete in time, such as "fetch" or "description".
+        budget (float): The total time budget of the request, in seconds.
+
+    """
+
+    def __init__(self, stage: str, budget: float) -> None:
+        """Initialize the DeadlineExceededError with the stage and budget.
+
+        Parameters
+        ----------
+        stage : str
+            The stage that did not complete in time.
+        budget : float
+            The total time budget of the request, in seconds.
+
+        """
+        self.stage: str = stage
+        self.budget: float = budget
+        super().__init__(f"The {stage} stage exceeded the {budget:g} s deadline of the request")
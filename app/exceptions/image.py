@@ -1,7 +1,8 @@
 """Custom exceptions related to image processing.
 
 This module defines exceptions that are raised when specific image-related
-conditions are not met, such as exceeding the maximum allowed image size.
+conditions are not met, such as exceeding the maximum allowed image size or the image host
+rejecting the request.
 """
 
 
@@ -28,3 +29,70 @@ class ImageTooLargeError(Exception):
         self.max_size: int = max_size
         self.actual_size: int = actual_size
         super().__init__(f"Image size {actual_size} exceeds maximum allowed size of {max_size} bytes")
+
+
+class ImageFetchError(Exception):
+    """Exception raised when an image host rejects a request with a client error.
+
+    Attributes:
+        url (str): The URL of the image that could not be fetched.
+        status_code (int): The HTTP status code returned by the image host.
+
+    """
+
+    def __init__(self, url: str, status_code: int) -> None:
+        """Initialize the ImageFetchError with request details.
+
+        Parameters
+        ----------
+        url : str
+            The URL of the image that could not be fetched.
+        status_code : int
+            The HTTP status code returned by the image host.
+
+        """
+        self.url: str = url
+        self.status_code: int = status_code
+        super().__init__(f"Image host returned status {status_code} for {url}")
+
+
+class UnsupportedImageError(Exception):
+    """Exception raised when image content is not in a supported format or cannot be decoded.
+
+    Attributes:
+        reason (str): A short explanation of why the image was rejected.
+
+    """
+
+    def __init__(self, reason: str) -> None:
+        """Initialize the UnsupportedImageError with the rejection reason.
+
+        Parameters
+        ----------
+        reason : str
+            A short explanation of why the image was rejected.
+
+        """
+        self.reason: str = reason
+        super().__init__(f"Unsupported image: {reason}")
+
+
+class InvalidUploadError(Exception):
+    """Exception raised when an uploaded request body does not contain a usable image.
+
+    Attributes:
+        reason (str): A short explanation of why the upload was rejected.
+
+    """
+
+    def __init__(self, reason: str) -> None:
+        """Initialize the InvalidUploadError with the rejection reason.
+
+        Parameters
+        ----------
+        reason : str
+            A short explanation of why the upload was rejected.
+
+        """
+        self.reason: str = reason
+        super().__init__(f"Invalid upload: {reason}")
@@ -0,0 +1,80 @@
+"""Custom exceptions related to LLM calls.
+
+This module defines exceptions that are raised when an LLM call is rejected before or by
+the provider because of rate limits or overload, so that clients can be told when to retry,
+and when a streamed response is cut off by its token limit.
+"""
+
+
+class LLMRateLimitError(Exception):
+    """Exception raised when a call would exceed the request or token rate limits.
+
+    Attributes:
+        retry_after (float): The number of seconds after which the call is expected to succeed.
+        reason (str): A short explanation of which limit was hit.
+
+    """
+
+    def __init__(self, retry_after: float, reason: str) -> None:
+        """Initialize the LLMRateLimitError with the retry delay.
+
+        Parameters
+        ----------
+        retry_after : float
+            The number of seconds after which the call is expected to succeed.
+        reason : str
+            A short explanation of which limit was hit.
+
+        """
+        self.retry_after: float = retry_after
+        self.reason: str = reason
+        super().__init__(f"LLM rate limit reached: {reason}")
+
+
+class LLMUnavailableError(Exception):
+    """Exception raised when a call is shed because the LLM is saturated or overloaded.
+
+    Attributes:
+        retry_after (float): The number of seconds after which the call may be retried.
+        reason (str): A short explanation of why the call was shed.
+
+    """
+
+    def __init__(self, retry_after: float, reason: str) -> None:
+        """Initialize the LLMUnavailableError with the retry delay.
+
+        Parameters
+        ----------
+        retry_after : float
+            The number of seconds after which the call may be retried.
+        reason : str
+            A short explanation of why the call was shed.
+
+        """
+        self.retry_after: float = retry_after
+        self.reason: str = reason
+        super().__init__(f"LLM unavailable: {reason}")
+
+
+class LLMTruncatedError(Exception):
+    """Exception raised when a streamed LLM response stops at its token limit.
+
+    The chunks already streamed are an incomplete answer, so the stream must not be cached
+    or logged as a complete one.
+
+    Attributes:
+        max_tokens (int): The token limit the response reached.
+
+    """
+
+    def __init__(self, max_tokens: int) -> None:
+        """Initialize the LLMTruncatedError with the token limit.
+
+        Parameters
+        ----------
+        max_tokens : int
+            The token limit the response reached.
+
+        """
+        self.max_tokens: int = max_tokens
+        super().__init__(f"LLM response truncated at {max_tokens} tokens")
@@ -4,16 +4,88 @@ This module provides an implementation of the `LLMService` interface using Anthr
 It includes functionality for generating image descriptions and streaming nutritional feedback
 based on structured prompts. The prompts are designed to guide the AI in analyzing food images
 and providing detailed, health-focused feedback.
+
+The static prompts are sent as system blocks ahead of the per-request image or
+description, and are marked with `cache_control` so that Anthropic can serve them from its
+prompt cache once they reach the minimum cacheable length of the model: 1024 tokens, or
+2048 for Haiku models. At about 650 to 800 tokens, none of the current prompts reaches it,
+so they are sent without a cache breakpoint and prompt caching has no effect until they
+grow; `TokenUsage.cache_read_input_tokens` stays at 0 meanwhile.
+
+When a scheduler is given, every call waits for its admission, the rate-limit headers of
+every response adapt its limits, and rate-limit and overload errors from Anthropic are
+translated into `LLMRateLimitError` and `LLMUnavailableError`.
+
+Every call is bounded by a timeout. The timeout of descriptions is shortened to the
+remaining budget of the request when it has a deadline. Streams keep the configured
+timeout for each read, and the caller bounds only the wait for their first chunk by the
+deadline. The client does not retry on its own: retries are made by the `ModelRouter`,
+which knows whether the deadline leaves time for them.
 """
 
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, AsyncIterator
+from contextlib import asynccontextmanager, nullcontext
 from typing import override
 
-from anthropic import AsyncAnthropic
+from anthropic import AsyncAnthropic, InternalServerError, RateLimitError
+from anthropic.types import Message, TextBlockParam, Usage
 from anthropic.types.text_block import TextBlock
-from fastapi.responses import StreamingResponse
+from httpx import Headers
+
+from app.exceptions.llm import LLMRateLimitError, LLMTruncatedError, LLMUnavailableError
+from app.interfaces.image import ImageMediaType
+from app.interfaces.llm import LLMService, TokenUsage
+from app.services.deadline import current_deadline
+from app.services.scheduler import LLMScheduler
+
+_IMAGE_TOKENS = 1600
+_CHARS_PER_TOKEN = 4
+_MIN_CACHEABLE_TOKENS = 1024
+_MIN_CACHEABLE_TOKENS_HAIKU = 2048
+_OVERLOADED = 529
+_DEFAULT_RETRY_AFTER = 5.0
+
+
+def _header_int(headers: Headers, name: str) -> int | None:
+    """Read an integer response header.
+
+    Parameters
+    ----------
+    headers : Headers
+        The response headers.
+    name : str
+        The header name.
+
+    Returns
+    -------
+    int | None
+        The value of the header, or None if it is missing or malformed.
+
+    """
+    try:
+        return int(headers[name])
+    except (KeyError, ValueError):
+        return None
+
 
-from app.interfaces.llm import LLMService
+def _retry_after(headers: Headers) -> float:
+    """Read the delay requested by a `Retry-After` header.
+
+    Parameters
+    ----------
+    headers : Headers
+        The response headers.
+
+    Returns
+    -------
+    float
+        The delay in seconds, or a default when the header is missing or not a number.
+
+    """
+    try:
+        return max(0.0, float(headers["retry-after"]))
+    except (KeyError, ValueError):
+        return _DEFAULT_RETRY_AFTER
 
 
 class AnthropicService(LLMService):
@@ -26,17 +98,53 @@ class AnthropicService(LLMService):
     Attributes
     ----------
     client : AsyncAnthropic
-        The Anthropic API client used for making requests.
+        The Anthropic API client used for making requests, without automatic retries.
+    timeout : float
+        The maximum number of seconds a call may wait for a response, or between two
+        chunks of a stream.
+    scheduler : LLMScheduler | None
+        The scheduler admitting every call, or None to call the API without admission control.
+    usage : TokenUsage
+        The token counters of every request, including prompt cache reads and writes.
+    model : str
+        The Anthropic model used by calls that do not select one.
+    description_prompt_version : str
+        The revision of `food_image_description_prompt`. Bump it whenever the prompt changes
+        so that cached descriptions produced by the previous prompt are no longer reused.
     food_image_description_prompt : str
-        A prompt template for generating detailed descriptions of food images.
+        The system prompt for generating detailed descriptions of food images.
     food_nutritional_feedback_prompt : str
-        A prompt template for generating nutritional feedback based on food descriptions.
+        The system prompt for generating nutritional feedback based on food descriptions.
+    fused_prompt_version : str
+        The revision of `food_fused_analysis_prompt`, bumped whenever the prompt changes.
+    food_fused_analysis_prompt : str
+        The system prompt for describing a food image and generating nutritional feedback in a single call.
 
     """
 
-    def __init__(self) -> None:
-        """Initialize the AnthropicService with the API client and prompts."""
-        self.client: AsyncAnthropic = AsyncAnthropic()
+    def __init__(
+        self, scheduler: LLMScheduler | None = None, timeout: float = 60.0, model: str = "claude-3-5-sonnet-latest"
+    ) -> None:
+        """Initialize the AnthropicService with the API client and prompts.
+
+        Parameters
+        ----------
+        scheduler : LLMScheduler | None
+            The scheduler admitting every call, or None to call the API without admission control.
+        timeout : float
+            The maximum number of seconds a call may wait for a response, or between two
+            chunks of a stream.
+        model : str
+            The Anthropic model used by calls that do not select one.
+
+        """
+        self.client: AsyncAnthropic = AsyncAnthropic(timeout=timeout, max_retries=0)
+        self.timeout: float = timeout
+        self.scheduler: LLMScheduler | None = scheduler
+        self.usage: TokenUsage = TokenUsage()
+        self.model: str = model
+        self.description_prompt_version: str = "2"
+        self.fused_prompt_version: str = "2"
         self.food_image_description_prompt: str = """
             You are an AI assistant tasked with analyzing a food image and providing a detailed description of
             the meal and its ingredients. Your goal is to accurately describe what you can see in the image
@@ -96,11 +204,8 @@ class AnthropicService(LLMService):
             You are an AI nutritionist with extensive knowledge of food, nutrition, and health.
             Your task is to analyze food descriptions and provide comprehensive, health-focused feedback.
 
-            Here's the description of the food you need to analyze:
-
-            <image_description>
-            {{IMAGE_DESCRIPTION}}
-            </image_description>
+            The description of the food you need to analyze is provided in the user message, inside
+            <image_description> tags.
 
             Your analysis should follow these steps:
 
@@ -157,15 +262,276 @@ class AnthropicService(LLMService):
 
             Now, please proceed with your analysis of the described food.
         """
+        self.food_fused_analysis_prompt: str = """
+            You are an AI nutritionist with extensive knowledge of food, nutrition, and health.
+            Your task is to analyze a food image and provide comprehensive, health-focused feedback
+            in a single response.
+
+            First, carefully examine the image and describe what you can clearly see:
+
+            1. Overall appearance of the dish
+            2. Identifiable ingredients
+            3. Cooking methods (if apparent)
+            4. Presentation and plating
+            5. Portion size
+            6. Any notable textures or colors
+
+            Do not make assumptions about ingredients or dishes that you cannot clearly identify. If you are
+            unsure about any element, say so and describe its appearance, color, or texture without specifying
+            what it might be, using phrases like "what appears to be" when describing ambiguous elements.
+
+            Then, based solely on your description, analyze the nutritional value of the meal, considering:
+               a. Nutritional balance (proteins, carbohydrates, fats, vitamins, and minerals)
+               b. Portion sizes
+               c. Cooking methods (e.g., fried, baked, grilled, raw)
+               d. Presence of processed vs. whole foods
+               e. Estimated calorie density
+               f. Fiber content
+               g. Presence of added sugars or unhealthy fats
+
+            Assess the overall healthiness of the meal, determine a health score on a scale of 1 to 10
+            (1 being extremely unhealthy, 10 being very healthy), explain your reasoning, and offer
+            constructive feedback and suggestions for improvement.
+
+            Your output should be structured as follows:
+
+            <image_description>
+            [Description of the dish, its identifiable ingredients, uncertain elements, cooking methods,
+            presentation and portion size]
+            </image_description>
+
+            <nutritional_breakdown>
+            [Detailed breakdown of the meal components and their health implications]
+            </nutritional_breakdown>
+
+            <reasoning>
+            [Explanation of how you arrived at the health score]
+            </reasoning>
+
+            <score>
+            [Health score between 1 and 10]
+            </score>
+
+            <feedback>
+            [Constructive feedback about the meal's healthiness and specific suggestions for improvement]
+            </feedback>
+
+            Remember, accuracy and honesty about what you can and cannot identify are more important than making
+            guesses, and your suggestions should be specific and actionable.
+        """
 
+    @property
     @override
-    async def get_image_description(self, image_data: str) -> str:
+    def description_fingerprint(self) -> str:
+        """Identify the model and prompt used by `get_image_description`."""
+        return f"{self.model}:{self.description_prompt_version}"
+
+    @property
+    @override
+    def fused_fingerprint(self) -> str:
+        """Identify the model and prompt used by `iter_fused_analysis`."""
+        return f"{self.model}:fused:{self.fused_prompt_version}"
+
+    @override
+    def feedback_fingerprint(self, img_description: str) -> str:
+        """Identify the request made by `iter_nutritional_feedback` for a description.
+
+        Parameters
+        ----------
+        img_description : str
+            The description of the food to analyse.
+
+        Returns
+        -------
+        str
+            The model followed by the rendered feedback prompt.
+
+        """
+        return f"{self.model}\n{self.food_nutritional_feedback_prompt}\n{self._render_feedback_prompt(img_description)}"
+
+    def _render_feedback_prompt(self, img_description: str) -> str:
+        """Wrap a description into the user message of the nutritional feedback request.
+
+        Parameters
+        ----------
+        img_description : str
+            The description of the food to analyse.
+
+        Returns
+        -------
+        str
+            The user message, which follows the cached system prompt.
+
+        """
+        return f"<image_description>\n{img_description}\n</image_description>"
+
+    @staticmethod
+    def _system(prompt: str, model: str) -> list[TextBlockParam]:
+        """Build a system prompt, marked as a prompt cache breakpoint when it can be cached.
+
+        Anthropic ignores breakpoints after prefixes shorter than the minimum cacheable
+        length of the model, so the prompt is only marked when it is estimated to reach it.
+
+        Parameters
+        ----------
+        prompt : str
+            The static instructions.
+        model : str
+            The model the prompt is sent to.
+
+        Returns
+        -------
+        list[TextBlockParam]
+            The system blocks, cached by Anthropic for subsequent requests sharing the prefix
+            when the prompt is long enough.
+
+        """
+        minimum = _MIN_CACHEABLE_TOKENS_HAIKU if "haiku" in model else _MIN_CACHEABLE_TOKENS
+        if len(prompt) // _CHARS_PER_TOKEN < minimum:
+            return [{"type": "text", "text": prompt}]
+        return [{"type": "text", "text": prompt, "cache_control": {"type": "ephemeral"}}]
+
+    def _record_usage(self, usage: Usage) -> None:
+        """Add the token usage of a completed request to `usage`.
+
+        Parameters
+        ----------
+        usage : Usage
+            The usage reported by the Anthropic API.
+
+        """
+        self.usage.add(
+            usage.input_tokens,
+            usage.output_tokens,
+            usage.cache_creation_input_tokens or 0,
+            usage.cache_read_input_tokens or 0,
+        )
+
+    def _finish(self, message: Message, max_tokens: int) -> None:
+        """Record the usage of a completed stream and check that it was not cut off.
+
+        Parameters
+        ----------
+        message : Message
+            The final message of the stream.
+        max_tokens : int
+            The token limit of the call.
+
+        Raises
+        ------
+        LLMTruncatedError
+            If the response stopped at `max_tokens`, so that the incomplete stream is
+            neither cached nor logged as a complete answer.
+
+        """
+        self._record_usage(message.usage)
+        if message.stop_reason == "max_tokens":
+            raise LLMTruncatedError(max_tokens)
+
+    @staticmethod
+    def _estimate_tokens(*texts: str, images: int, max_tokens: int) -> int:
+        """Estimate the tokens counted against the rate limits for a call.
+
+        Parameters
+        ----------
+        *texts : str
+            The text of the prompts.
+        images : int
+            The number of images sent, each counted as a downsized image.
+        max_tokens : int
+            The maximum number of tokens generated.
+
+        Returns
+        -------
+        int
+            The estimated number of input and output tokens.
+
+        """
+        return sum(len(text) for text in texts) // _CHARS_PER_TOKEN + images * _IMAGE_TOKENS + max_tokens
+
+    @asynccontextmanager
+    async def _admitted(self, tokens: int) -> AsyncIterator[None]:
+        """Run one API call under the scheduler, translating rate-limit and overload errors.
+
+        Parameters
+        ----------
+        tokens : int
+            The estimated number of tokens of the call.
+
+        Yields
+        ------
+        None
+            Control while the call runs.
+
+        Raises
+        ------
+        LLMRateLimitError
+            If the scheduler or Anthropic rejected the call because of the rate limits.
+        LLMUnavailableError
+            If the scheduler shed the call or Anthropic is overloaded.
+
+        """
+        async with self.scheduler.slot(tokens) if self.scheduler is not None else nullcontext():
+            try:
+                yield
+            except RateLimitError as e:
+                retry_after = _retry_after(e.response.headers)
+                if self.scheduler is not None:
+                    self.scheduler.pause(retry_after)
+                raise LLMRateLimitError(retry_after, "Anthropic rejected the request") from e
+            except InternalServerError as e:
+                if e.status_code != _OVERLOADED:
+                    raise
+                raise LLMUnavailableError(_retry_after(e.response.headers), "Anthropic is overloaded") from e
+
+    def _client(self) -> AsyncAnthropic:
+        """Return the client of a non-streamed call, with a timeout bounded by the deadline.
+
+        Streams must not use it: the timeout of the client applies to every read, so a
+        shortened timeout would cut streams still sending data to the client.
+
+        Returns
+        -------
+        AsyncAnthropic
+            The client, or a copy of it sharing its connections with a shorter timeout.
+
+        """
+        deadline = current_deadline()
+        if deadline is None or deadline.remaining() >= self.timeout:
+            return self.client
+        return self.client.with_options(timeout=max(deadline.remaining(), 0.001))
+
+    def _observe(self, headers: Headers) -> None:
+        """Adapt the scheduler to the rate-limit headers of a response.
+
+        Parameters
+        ----------
+        headers : Headers
+            The response headers.
+
+        """
+        if self.scheduler is not None:
+            self.scheduler.observe(
+                requests_limit=_header_int(headers, "anthropic-ratelimit-requests-limit"),
+                requests_remaining=_header_int(headers, "anthropic-ratelimit-requests-remaining"),
+                tokens_limit=_header_int(headers, "anthropic-ratelimit-tokens-limit"),
+                tokens_remaining=_header_int(headers, "anthropic-ratelimit-tokens-remaining"),
+            )
+
+    @override
+    async def get_image_description(
+        self, image_data: str, media_type: ImageMediaType = "image/jpeg", model: str | None = None
+    ) -> str:
         """Generate a description for an image using a large language model.
 
         Parameters
         ----------
         image_data : str
             The base64-encoded string representation of the image.
+        media_type : ImageMediaType
+            The media type of the image, such as "image/jpeg" or "image/png".
+        model : str | None
+            The model generating the description, or None for `model`.
 
         Returns
         -------
@@ -173,26 +539,32 @@ class AnthropicService(LLMService):
             A textual description of the image generated by the LLM.
 
         """
-        response = await self.client.messages.create(
-            model="claude-3-5-sonnet-latest",
-            max_tokens=480,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "image",
-                            "source": {
-                                "type": "base64",
-                                "media_type": "image/jpeg",
-                                "data": image_data,
+        tokens = self._estimate_tokens(self.food_image_description_prompt, images=1, max_tokens=480)
+        async with self._admitted(tokens):
+            raw = await self._client().messages.with_raw_response.create(
+                model=model or self.model,
+                max_tokens=480,
+                system=self._system(self.food_image_description_prompt, model or self.model),
+                messages=[
+                    {
+                        "role": "user",
+                        "content": [
+                            {
+                                "type": "image",
+                                "source": {
+                                    "type": "base64",
+                                    "media_type": media_type,
+                                    "data": image_data,
+                                },
                             },
-                        },
-                        {"type": "text", "text": self.food_image_description_prompt},
-                    ],
-                }
-            ],
-        )
+                            {"type": "text", "text": "Please describe the meal in this image."},
+                        ],
+                    }
+                ],
+            )
+        self._observe(raw.headers)
+        response = raw.parse()
+        self._record_usage(response.usage)
 
         if response and response.content and len(response.content) > 0:
             content = response.content[0]
@@ -202,40 +574,103 @@ class AnthropicService(LLMService):
         return ""
 
     @override
-    async def stream_nutritional_feedback(self, img_description: str) -> StreamingResponse:
-        """Stream nutritional feedback based on a user prompt using a large language model.
+    async def iter_nutritional_feedback(
+        self, img_description: str, model: str | None = None
+    ) -> AsyncGenerator[str, None]:
+        """Generate nutritional feedback as a stream of text chunks.
 
         Parameters
         ----------
         img_description : str
-            The user's input prompt, typically related to nutritional information or queries.
+            The description of the food to analyse.
+        model : str | None
+            The model generating the feedback, or None for `model`.
 
-        Returns
-        -------
-        StreamingResponse
-            A streaming response containing the LLM-generated feedback in real-time.
+        Yields
+        ------
+        str
+            The chunks of the LLM-generated feedback, as soon as they are produced.
 
         """
-
-        async def generate() -> AsyncGenerator[str, None]:
-            async with self.client.messages.stream(
+        tokens = self._estimate_tokens(
+            self.food_nutritional_feedback_prompt, img_description, images=0, max_tokens=1024
+        )
+        async with (
+            self._admitted(tokens),
+            self.client.messages.stream(
                 max_tokens=1024,
+                system=self._system(self.food_nutritional_feedback_prompt, model or self.model),
                 messages=[
                     {
                         "role": "user",
                         "content": [
                             {
                                 "type": "text",
-                                "text": self.food_nutritional_feedback_prompt.replace(
-                                    "{{IMAGE_DESCRIPTION}}", img_description
-                                ),
+                                "text": self._render_feedback_prompt(img_description),
+                            },
+                        ],
+                    }
+                ],
+                model=model or self.model,
+            ) as stream,
+        ):
+            self._observe(stream.response.headers)
+            async for text in stream.text_stream:
+                yield f"{text}"
+            self._finish(await stream.get_final_message(), 1024)
+
+    @override
+    async def iter_fused_analysis(
+        self, image_data: str, media_type: ImageMediaType = "image/jpeg", model: str | None = None
+    ) -> AsyncGenerator[str, None]:
+        """Describe an image and generate nutritional feedback in a single streamed call.
+
+        Parameters
+        ----------
+        image_data : str
+            The base64-encoded string representation of the image.
+        media_type : ImageMediaType
+            The media type of the image, such as "image/jpeg" or "image/png".
+        model : str | None
+            The model generating the analysis, or None for `model`.
+
+        Yields
+        ------
+        str
+            The chunks of the combined description and feedback, as soon as they are produced.
+
+        """
+        tokens = self._estimate_tokens(self.food_fused_analysis_prompt, images=1, max_tokens=1504)
+        async with (
+            self._admitted(tokens),
+            self.client.messages.stream(
+                max_tokens=1504,
+                system=self._system(self.food_fused_analysis_prompt, model or self.model),
+                messages=[
+                    {
+                        "role": "user",
+                        "content": [
+                            {
+                                "type": "image",
+                                "source": {
+                                    "type": "base64",
+                                    "media_type": media_type,
+                                    "data": image_data,
+                                },
                             },
+                            {"type": "text", "text": "Please analyze the meal in this image."},
                         ],
                     }
                 ],
-                model="claude-3-5-sonnet-latest",
-            ) as stream:
-                async for text in stream.text_stream:
-                    yield f"{text}"
+                model=model or self.model,
+            ) as stream,
+        ):
+            self._observe(stream.response.headers)
+            async for text in stream.text_stream:
+                yield f"{text}"
+            self._finish(await stream.get_final_message(), 1504)
 
-        return StreamingResponse(generate(), media_type="text/event-stream")
+    @override
+    async def aclose(self) -> None:
+        """Close the Anthropic API client and its pooled connections."""
+        await self.client.close()
@@ -0,0 +1,555 @@
+"""Cache backend implementations.
+
+This module provides implementations of the `CacheBackend` interface: an in-memory LRU
+cache bounded by entry count and total size, an on-disk cache backed by SQLite whose
+contents survive application restarts, and a SQLite cache in WAL mode shared by the worker
+processes of a host, so that an entry computed by one worker is a hit for all the others.
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import override
+
+from app.interfaces.cache import CacheBackend, CacheStats
+
+
+class MemoryCache(CacheBackend):
+    """In-memory LRU cache with per-entry expiry.
+
+    Entries are evicted in least-recently-used order whenever the number of entries or the
+    total size of the stored values exceeds the configured limits.
+
+    Attributes
+    ----------
+    max_entries : int
+        The maximum number of entries kept in the cache.
+    max_bytes : int
+        The maximum total size of the stored values in bytes.
+    ttl : float | None
+        The default number of seconds an entry stays valid, or None for no expiry.
+    stats : CacheStats
+        The hit, miss and eviction counters of the cache.
+
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float | None = None) -> None:
+        """Initialize an empty cache.
+
+        Parameters
+        ----------
+        max_entries : int
+            The maximum number of entries kept in the cache.
+        max_bytes : int
+            The maximum total size of the stored values in bytes.
+        ttl : float | None
+            The default number of seconds an entry stays valid, or None for no expiry.
+
+        """
+        self.max_entries: int = max_entries
+        self.max_bytes: int = max_bytes
+        self.ttl: float | None = ttl
+        self.stats: CacheStats = CacheStats()
+        self._entries: OrderedDict[str, tuple[bytes, float | None]] = OrderedDict()
+        self._size: int = 0
+
+    @override
+    async def get(self, key: str) -> bytes | None:
+        """Return the value stored under a key.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+
+        Returns
+        -------
+        bytes | None
+            The stored value, or None if the key is missing or expired.
+
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._remove(key)
+            self.stats.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    @override
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        """Store a value under a key, evicting older entries if needed.
+
+        Values larger than `max_bytes` are not stored.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+        value : bytes
+            The value to store.
+        ttl : float | None
+            The number of seconds the value stays valid, or None to use the default `ttl`.
+
+        """
+        if key in self._entries:
+            self._remove(key)
+        if len(value) > self.max_bytes:
+            return
+
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._entries[key] = (value, expires_at)
+        self._size += len(value)
+
+        while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats.evictions += 1
+
+    @override
+    async def aclose(self) -> None:
+        """Drop every entry held by the cache."""
+        self._entries.clear()
+        self._size = 0
+
+    def _remove(self, key: str) -> None:
+        """Remove an entry and update the total size.
+
+        Parameters
+        ----------
+        key : str
+            The key of the entry to remove.
+
+        """
+        value, _ = self._entries.pop(key)
+        self._size -= len(value)
+
+
+class SQLiteCache(CacheBackend):
+    """On-disk cache backed by a SQLite database.
+
+    Database access runs in worker threads so the event loop is never blocked on disk I/O.
+    Entries are evicted in least-recently-used order once the entry count or total size
+    exceeds the configured limits.
+
+    Attributes
+    ----------
+    path : Path
+        The location of the SQLite database file.
+    table : str
+        The table holding the entries, so that several caches can share one database file.
+    max_entries : int
+        The maximum number of entries kept in the cache.
+    max_bytes : int
+        The maximum total size of the stored values in bytes.
+    ttl : float | None
+        The default number of seconds an entry stays valid, or None for no expiry.
+    stats : CacheStats
+        The hit, miss and eviction counters of the cache.
+
+    """
+
+    def __init__(self, path: Path, table: str, max_entries: int, max_bytes: int, ttl: float | None = None) -> None:
+        """Open the database and create the cache table if needed.
+
+        Parameters
+        ----------
+        path : Path
+            The location of the SQLite database file.
+        table : str
+            The table holding the entries. Must be a valid SQL identifier.
+        max_entries : int
+            The maximum number of entries kept in the cache.
+        max_bytes : int
+            The maximum total size of the stored values in bytes.
+        ttl : float | None
+            The default number of seconds an entry stays valid, or None for no expiry.
+
+        """
+        if not table.isidentifier():
+            msg = f"Invalid cache table name: {table!r}"
+            raise ValueError(msg)
+
+        self.path: Path = path
+        self.table: str = table
+        self.max_entries: int = max_entries
+        self.max_bytes: int = max_bytes
+        self.ttl: float | None = ttl
+        self.stats: CacheStats = CacheStats()
+        self._lock: threading.Lock = threading.Lock()
+        self._conn: sqlite3.Connection = sqlite3.connect(path, check_same_thread=False)
+        _ = self._conn.executescript(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS {table}_accessed_at ON {table} (accessed_at);
+            """
+        )
+
+    @override
+    async def get(self, key: str) -> bytes | None:
+        """Return the value stored under a key.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+
+        Returns
+        -------
+        bytes | None
+            The stored value, or None if the key is missing or expired.
+
+        """
+        value = await asyncio.to_thread(self._get, key)
+        if value is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return value
+
+    @override
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        """Store a value under a key, evicting older entries if needed.
+
+        Values larger than `max_bytes` are not stored.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+        value : bytes
+            The value to store.
+        ttl : float | None
+            The number of seconds the value stays valid, or None to use the default `ttl`.
+
+        """
+        if len(value) > self.max_bytes:
+            return
+
+        ttl = self.ttl if ttl is None else ttl
+        self.stats.evictions += await asyncio.to_thread(self._set, key, value, ttl)
+
+    @override
+    async def aclose(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def _get(self, key: str) -> bytes | None:
+        """Look up a key and refresh its access time.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+
+        Returns
+        -------
+        bytes | None
+            The stored value, or None if the key is missing or expired.
+
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                f"SELECT value FROM {self.table} WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",  # noqa: S608 - the table name is a validated identifier
+                (key, now),
+            ).fetchone()
+            if row is None:
+                return None
+
+            _ = self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))  # noqa: S608 - the table name is a validated identifier
+            return row[0]
+
+    def _set(self, key: str, value: bytes, ttl: float | None) -> int:
+        """Store a value and evict expired and least-recently-used entries.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+        value : bytes
+            The value to store.
+        ttl : float | None
+            The number of seconds the value stays valid, or None for no expiry.
+
+        Returns
+        -------
+        int
+            The number of evicted entries.
+
+        """
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        with self._lock, self._conn:
+            _ = self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",  # noqa: S608 - the table name is a validated identifier
+                (key, value, len(value), expires_at, now),
+            )
+            evicted = self._conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,)).rowcount  # noqa: S608 - the table name is a validated identifier
+
+            count, size = self._conn.execute(f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}").fetchone()  # noqa: S608 - the table name is a validated identifier
+            if count <= self.max_entries and size <= self.max_bytes:
+                return evicted
+
+            rows = self._conn.execute(f"SELECT key, size FROM {self.table} ORDER BY accessed_at").fetchall()  # noqa: S608 - the table name is a validated identifier
+            for old_key, old_size in rows:
+                if count <= self.max_entries and size <= self.max_bytes:
+                    break
+                _ = self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (old_key,))  # noqa: S608 - the table name is a validated identifier
+                count -= 1
+                size -= old_size
+                evicted += 1
+
+            return evicted
+
+
+_TOUCH_INTERVAL = 1.0
+_EVICTION_BATCH = 64
+
+
+class SharedCache(CacheBackend):
+    """LRU cache in a SQLite database shared by the worker processes of a host.
+
+    The database runs in write-ahead-log mode, so lookups from every process proceed while
+    one of them writes. Each write, together with the evictions it causes, runs in a single
+    immediate transaction, so concurrent writers from different processes never observe or
+    leave the cache beyond its limits. The entry count and total size are maintained by
+    triggers in a usage row, so enforcing the limits does not scan the table, and access
+    times are refreshed at most once per second per entry, so hits rarely need the write
+    lock.
+
+    Attributes
+    ----------
+    path : Path
+        The location of the SQLite database file, the same for every worker.
+    table : str
+        The table holding the entries, so that several caches can share one database file.
+    max_entries : int
+        The maximum number of entries kept in the cache, across every worker.
+    max_bytes : int
+        The maximum total size of the stored values in bytes, across every worker.
+    ttl : float | None
+        The default number of seconds an entry stays valid, or None for no expiry.
+    stats : CacheStats
+        The hit, miss and eviction counters of the cache in this process.
+
+    """
+
+    def __init__(  # noqa: PLR0913, PLR0917 - mirrors the SQLiteCache configuration
+        self,
+        path: Path,
+        table: str,
+        max_entries: int,
+        max_bytes: int,
+        ttl: float | None = None,
+        busy_timeout: float = 5.0,
+    ) -> None:
+        """Open the database and create the cache table if needed.
+
+        Parameters
+        ----------
+        path : Path
+            The location of the SQLite database file, the same for every worker.
+        table : str
+            The table holding the entries. Must be a valid SQL identifier.
+        max_entries : int
+            The maximum number of entries kept in the cache, across every worker.
+        max_bytes : int
+            The maximum total size of the stored values in bytes, across every worker.
+        ttl : float | None
+            The default number of seconds an entry stays valid, or None for no expiry.
+        busy_timeout : float
+            The number of seconds to wait for another process holding the write lock.
+
+        """
+        if not table.isidentifier():
+            msg = f"Invalid cache table name: {table!r}"
+            raise ValueError(msg)
+
+        self.path: Path = path
+        self.table: str = table
+        self.max_entries: int = max_entries
+        self.max_bytes: int = max_bytes
+        self.ttl: float | None = ttl
+        self.stats: CacheStats = CacheStats()
+        self._lock: threading.Lock = threading.Lock()
+        self._conn: sqlite3.Connection = sqlite3.connect(
+            path, timeout=busy_timeout, isolation_level=None, check_same_thread=False
+        )
+        _ = self._conn.execute("PRAGMA journal_mode = WAL")
+        _ = self._conn.execute("PRAGMA synchronous = NORMAL")
+        _ = self._conn.executescript(
+            f"""
+            BEGIN IMMEDIATE;
+            CREATE TABLE IF NOT EXISTS {table} (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS {table}_accessed_at ON {table} (accessed_at);
+            CREATE INDEX IF NOT EXISTS {table}_expires_at ON {table} (expires_at) WHERE expires_at IS NOT NULL;
+            CREATE TABLE IF NOT EXISTS {table}_usage (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                entries INTEGER NOT NULL,
+                size INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO {table}_usage SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM {table};
+            CREATE TRIGGER IF NOT EXISTS {table}_inserted AFTER INSERT ON {table} BEGIN
+                UPDATE {table}_usage SET entries = entries + 1, size = size + new.size;
+            END;
+            CREATE TRIGGER IF NOT EXISTS {table}_deleted AFTER DELETE ON {table} BEGIN
+                UPDATE {table}_usage SET entries = entries - 1, size = size - old.size;
+            END;
+            CREATE TRIGGER IF NOT EXISTS {table}_resized AFTER UPDATE OF size ON {table} BEGIN
+                UPDATE {table}_usage SET size = size - old.size + new.size;
+            END;
+            COMMIT;
+            """  # noqa: S608 - the table name is a validated identifier
+        )
+
+    @override
+    async def get(self, key: str) -> bytes | None:
+        """Return the value stored under a key by any worker.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+
+        Returns
+        -------
+        bytes | None
+            The stored value, or None if the key is missing or expired.
+
+        """
+        value = await asyncio.to_thread(self._get, key)
+        if value is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return value
+
+    @override
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        """Store a value under a key, evicting the least recently used entries if needed.
+
+        Values larger than `max_bytes` are not stored.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+        value : bytes
+            The value to store.
+        ttl : float | None
+            The number of seconds the value stays valid, or None to use the default `ttl`.
+
+        """
+        if len(value) > self.max_bytes:
+            return
+
+        ttl = self.ttl if ttl is None else ttl
+        self.stats.evictions += await asyncio.to_thread(self._set, key, value, ttl)
+
+    @override
+    async def aclose(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def _get(self, key: str) -> bytes | None:
+        """Look up a key, refreshing its access time when it is older than a second.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+
+        Returns
+        -------
+        bytes | None
+            The stored value, or None if the key is missing or expired.
+
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, accessed_at FROM {self.table} WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",  # noqa: S608 - the table name is a validated identifier
+                (key, now),
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, accessed_at = row
+            if accessed_at < now - _TOUCH_INTERVAL:
+                _ = self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))  # noqa: S608 - the table name is a validated identifier
+            return value
+
+    def _set(self, key: str, value: bytes, ttl: float | None) -> int:
+        """Store a value and evict expired and least-recently-used entries in one transaction.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+        value : bytes
+            The value to store.
+        ttl : float | None
+            The number of seconds the value stays valid, or None for no expiry.
+
+        Returns
+        -------
+        int
+            The number of evicted entries.
+
+        """
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        with self._lock, self._conn:
+            _ = self._conn.execute("BEGIN IMMEDIATE")
+            _ = self._conn.execute(
+                f"INSERT INTO {self.table} (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?) "  # noqa: S608 - the table name is a validated identifier
+                "ON CONFLICT (key) DO UPDATE SET "
+                "value = excluded.value, size = excluded.size, "
+                "expires_at = excluded.expires_at, accessed_at = excluded.accessed_at",
+                (key, value, len(value), expires_at, now),
+            )
+            evicted = self._conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,)).rowcount  # noqa: S608 - the table name is a validated identifier
+
+            count, size = self._conn.execute(f"SELECT entries, size FROM {self.table}_usage").fetchone()  # noqa: S608 - the table name is a validated identifier
+            while count > self.max_entries or size > self.max_bytes:
+                rows = self._conn.execute(
+                    f"SELECT key, size FROM {self.table} WHERE key != ? ORDER BY accessed_at LIMIT ?",  # noqa: S608 - the table name is a validated identifier
+                    (key, _EVICTION_BATCH),
+                ).fetchall()
+                if not rows:
+                    break
+                for old_key, old_size in rows:
+                    if count <= self.max_entries and size <= self.max_bytes:
+                        break
+                    _ = self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (old_key,))  # noqa: S608 - the table name is a validated identifier
+                    count -= 1
+                    size -= old_size
+                    evicted += 1
+
+            return evicted
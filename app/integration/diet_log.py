@@ -0,0 +1,230 @@
+"""Diet log store implementations.
+
+This module provides `SQLiteDietLogStore`, an implementation of the `DietLogStore`
+interface backed by a local SQLite database. Every insert also updates the day and week
+rows of a rollup table in the same transaction, so aggregates are read with an index
+lookup per period.
+"""
+
+import asyncio
+import sqlite3
+import threading
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any, override
+
+from app.interfaces.diet_log import DietLogStore, LogEntry, Rollup, RollupPeriod
+
+_UPSERT_ROLLUP = """
+    INSERT INTO rollups (user, period, start, entries, scored, score_sum, score_min, score_max)
+    VALUES (?, ?, ?, 1, ?, ?, ?, ?)
+    ON CONFLICT (user, period, start) DO UPDATE SET
+        entries = entries + 1,
+        scored = scored + excluded.scored,
+        score_sum = score_sum + excluded.score_sum,
+        score_min = min(coalesce(score_min, excluded.score_min), coalesce(excluded.score_min, score_min)),
+        score_max = max(coalesce(score_max, excluded.score_max), coalesce(excluded.score_max, score_max))
+"""
+
+
+def _period_starts(created_at: float) -> dict[RollupPeriod, str]:
+    """Find the periods a time belongs to.
+
+    Parameters
+    ----------
+    created_at : float
+        The UNIX time.
+
+    Returns
+    -------
+    dict[RollupPeriod, str]
+        The first day of the day and of the week containing the time, as ISO dates in UTC.
+
+    """
+    day = datetime.fromtimestamp(created_at, UTC).date()
+    return {"day": day.isoformat(), "week": (day - timedelta(days=day.weekday())).isoformat()}
+
+
+class SQLiteDietLogStore(DietLogStore):
+    """Diet log backed by a SQLite database.
+
+    Database access runs in worker threads so the event loop is never blocked on disk I/O.
+
+    Attributes
+    ----------
+    path : Path
+        The location of the SQLite database file.
+
+    """
+
+    def __init__(self, path: Path) -> None:
+        """Open the database and create the log tables if needed.
+
+        Parameters
+        ----------
+        path : Path
+            The location of the SQLite database file.
+
+        """
+        self.path: Path = path
+        self._lock: threading.Lock = threading.Lock()
+        self._conn: sqlite3.Connection = sqlite3.connect(path, check_same_thread=False)
+        _ = self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY,
+                user TEXT NOT NULL,
+                image_hash TEXT NOT NULL,
+                description TEXT NOT NULL,
+                feedback TEXT NOT NULL,
+                score REAL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_user_created_at ON entries (user, created_at);
+            CREATE INDEX IF NOT EXISTS entries_image_hash ON entries (image_hash);
+            CREATE TABLE IF NOT EXISTS rollups (
+                user TEXT NOT NULL,
+                period TEXT NOT NULL,
+                start TEXT NOT NULL,
+                entries INTEGER NOT NULL,
+                scored INTEGER NOT NULL,
+                score_sum REAL NOT NULL,
+                score_min REAL,
+                score_max REAL,
+                PRIMARY KEY (user, period, start)
+            ) WITHOUT ROWID;
+            """
+        )
+
+    @override
+    async def add(self, entry: LogEntry) -> LogEntry:
+        """Store an entry and update the rollups of its day and week.
+
+        Parameters
+        ----------
+        entry : LogEntry
+            The entry to store, without identifier.
+
+        Returns
+        -------
+        LogEntry
+            The stored entry, with its identifier.
+
+        """
+        entry.id = await asyncio.to_thread(self._add, entry)
+        return entry
+
+    @override
+    async def history(self, user: str, *, before: float | None = None, limit: int = 50) -> list[LogEntry]:
+        """Return the latest entries of a user.
+
+        Parameters
+        ----------
+        user : str
+            The key of the user.
+        before : float | None
+            Only return entries created before this UNIX time, to page through the history,
+            or None to start from the latest entry.
+        limit : int
+            The maximum number of entries returned.
+
+        Returns
+        -------
+        list[LogEntry]
+            The entries, newest first.
+
+        """
+        rows = await asyncio.to_thread(
+            self._fetch,
+            "SELECT id, user, image_hash, description, feedback, score, created_at FROM entries "
+            "WHERE user = ? AND created_at < ? ORDER BY created_at DESC, id DESC LIMIT ?",
+            (user, before if before is not None else float("inf"), limit),
+        )
+        return [LogEntry(*row) for row in rows]
+
+    @override
+    async def rollups(
+        self, user: str, period: RollupPeriod, *, since: str | None = None, until: str | None = None
+    ) -> list[Rollup]:
+        """Return the score aggregates of a user.
+
+        Parameters
+        ----------
+        user : str
+            The key of the user.
+        period : RollupPeriod
+            The length of the periods.
+        since : str | None
+            The ISO date of the earliest period start returned, or None for no lower bound.
+        until : str | None
+            The ISO date of the latest period start returned, or None for no upper bound.
+
+        Returns
+        -------
+        list[Rollup]
+            The aggregates of every period with entries, oldest first.
+
+        """
+        rows = await asyncio.to_thread(
+            self._fetch,
+            "SELECT period, start, entries, scored, score_sum, score_min, score_max FROM rollups "
+            "WHERE user = ? AND period = ? AND start >= ? AND start <= ? ORDER BY start",
+            (user, period, since or "", until or "9999-12-31"),
+        )
+        return [Rollup(*row) for row in rows]
+
+    @override
+    async def aclose(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def _add(self, entry: LogEntry) -> int:
+        """Insert an entry and update its rollups in one transaction.
+
+        Parameters
+        ----------
+        entry : LogEntry
+            The entry to store.
+
+        Returns
+        -------
+        int
+            The identifier of the inserted entry.
+
+        """
+        scored = int(entry.score is not None)
+        score = entry.score or 0.0
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO entries (user, image_hash, description, feedback, score, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (entry.user, entry.image_hash, entry.description, entry.feedback, entry.score, entry.created_at),
+            )
+            _ = self._conn.executemany(
+                _UPSERT_ROLLUP,
+                [
+                    (entry.user, period, start, scored, score, entry.score, entry.score)
+                    for period, start in _period_starts(entry.created_at).items()
+                ],
+            )
+            return cursor.lastrowid or 0
+
+    def _fetch(self, sql: str, parameters: tuple[object, ...]) -> list[tuple[Any, ...]]:
+        """Run a query and return every row.
+
+        Parameters
+        ----------
+        sql : str
+            The query.
+        parameters : tuple[object, ...]
+            The values bound to the query.
+
+        Returns
+        -------
+        list[tuple[Any, ...]]
+            The rows of the result.
+
+        """
+        with self._lock:
+            return self._conn.execute(sql, parameters).fetchall()
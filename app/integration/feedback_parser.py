@@ -0,0 +1,210 @@
+"""Incremental parser for the tagged sections of LLM feedback.
+
+This module provides the `FeedbackParser` class, which turns the text streamed by the
+feedback and fused prompts into typed events as it arrives. The prompts wrap their output
+in `<image_description>`, `<nutritional_breakdown>`, `<reasoning>`, `<score>` and
+`<feedback>` tags; the parser reports the start, the text and the end of every section,
+and the numeric score as soon as `</score>` is received, so clients can render the score
+without buffering the whole response.
+
+Tags may be split across chunks: text that could be the beginning of a tag is held back
+until the next chunk tells whether it is one. Text outside the known sections, such as
+whitespace between them, is dropped.
+"""
+
+import re
+from typing import Any
+
+from app.interfaces.events import ServerSentEvent
+
+SECTIONS: tuple[str, ...] = ("image_description", "nutritional_breakdown", "reasoning", "score", "feedback")
+"""The sections produced by the feedback and fused prompts, in order."""
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+
+class FeedbackParser:
+    """Streaming parser of the tagged sections of LLM feedback.
+
+    Attributes
+    ----------
+    sections : dict[str, str]
+        The text of every section completed so far, without surrounding whitespace.
+    score : float | None
+        The health score, once the score section is complete and holds a number.
+
+    """
+
+    def __init__(self, names: tuple[str, ...] = SECTIONS) -> None:
+        """Initialize the parser before the first chunk.
+
+        Parameters
+        ----------
+        names : tuple[str, ...]
+            The names of the tags delimiting sections.
+
+        """
+        self.sections: dict[str, str] = {}
+        self.score: float | None = None
+        self._openings: dict[str, str] = {f"<{name}>": name for name in names}
+        self._buffer: str = ""
+        self._section: str | None = None
+        self._text: list[str] = []
+
+    def feed(self, chunk: str) -> list[ServerSentEvent]:
+        """Parse the next chunk of the stream.
+
+        Parameters
+        ----------
+        chunk : str
+            The next chunk of text.
+
+        Returns
+        -------
+        list[ServerSentEvent]
+            The "section_start", "section_delta", "section_end" and "score" events completed
+            by the chunk, in order.
+
+        """
+        self._buffer += chunk
+        events: list[ServerSentEvent] = []
+        while self._step(events):
+            pass
+        return events
+
+    def close(self) -> list[ServerSentEvent]:
+        """Flush the text held back at the end of the stream.
+
+        A section left open by a truncated response is ended with the text received so far.
+
+        Returns
+        -------
+        list[ServerSentEvent]
+            The events of the held-back text.
+
+        """
+        events: list[ServerSentEvent] = []
+        if self._section is not None:
+            self._delta(self._buffer, events)
+            self._end(events)
+        self._buffer = ""
+        return events
+
+    def result(self) -> dict[str, Any]:
+        """Summarize the parsed response, such as for storage or a JSON response.
+
+        Returns
+        -------
+        dict[str, Any]
+            The completed `sections` and the `score`.
+
+        """
+        return {"sections": dict(self.sections), "score": self.score}
+
+    def _step(self, events: list[ServerSentEvent]) -> bool:
+        """Consume the buffer up to the next tag.
+
+        Parameters
+        ----------
+        events : list[ServerSentEvent]
+            The list receiving the events produced.
+
+        Returns
+        -------
+        bool
+            Whether a tag was consumed, so another step may make progress.
+
+        """
+        if self._section is None:
+            return self._open(events)
+
+        closing = f"</{self._section}>"
+        end = self._buffer.find(closing)
+        if end >= 0:
+            self._delta(self._buffer[:end], events)
+            self._buffer = self._buffer[end + len(closing) :]
+            self._end(events)
+            return True
+
+        # Hold back a possible beginning of the closing tag.
+        held = self._buffer.rfind("<")
+        if held < 0 or not closing.startswith(self._buffer[held:]):
+            held = len(self._buffer)
+        self._delta(self._buffer[:held], events)
+        self._buffer = self._buffer[held:]
+        return False
+
+    def _open(self, events: list[ServerSentEvent]) -> bool:
+        """Look for the opening tag of a section outside of any section.
+
+        Parameters
+        ----------
+        events : list[ServerSentEvent]
+            The list receiving the events produced.
+
+        Returns
+        -------
+        bool
+            Whether a section was opened.
+
+        """
+        start = self._buffer.find("<")
+        while start >= 0:
+            end = self._buffer.find(">", start)
+            if end < 0:
+                candidate = self._buffer[start:]
+                if any(opening.startswith(candidate) for opening in self._openings):
+                    self._buffer = candidate
+                    return False
+            else:
+                name = self._openings.get(self._buffer[start : end + 1])
+                if name is not None:
+                    self._buffer = self._buffer[end + 1 :]
+                    self._section = name
+                    events.append(ServerSentEvent("section_start", {"section": name}))
+                    return True
+            start = self._buffer.find("<", start + 1)
+        self._buffer = ""
+        return False
+
+    def _delta(self, text: str, events: list[ServerSentEvent]) -> None:
+        """Report text of the current section, without the whitespace that starts it.
+
+        Parameters
+        ----------
+        text : str
+            The text.
+        events : list[ServerSentEvent]
+            The list receiving the events produced.
+
+        """
+        if not self._text:
+            text = text.lstrip()
+        if text:
+            self._text.append(text)
+            events.append(ServerSentEvent("section_delta", {"section": self._section, "text": text}))
+
+    def _end(self, events: list[ServerSentEvent]) -> None:
+        """Close the current section, reporting the score when it is the score section.
+
+        Parameters
+        ----------
+        events : list[ServerSentEvent]
+            The list receiving the events produced.
+
+        """
+        name = self._section
+        if name is None:
+            return
+        text = "".join(self._text).strip()
+        self.sections[name] = text
+        self._section = None
+        self._text = []
+        events.append(ServerSentEvent("section_end", {"section": name}))
+
+        if name == "score":
+            match = _NUMBER.search(text)
+            if match is not None:
+                value = float(match.group())
+                self.score = int(value) if value.is_integer() else value
+                events.append(ServerSentEvent("score", {"score": self.score}))
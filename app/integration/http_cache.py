@@ -0,0 +1,384 @@
+"""HTTP-aware cache for downloaded images.
+
+This module provides the `HTTPCache` class used by the HTTPX image service. It keeps image
+bodies together with their validators (`ETag` and `Last-Modified`) so that repeated requests
+for the same URL can be answered locally while fresh, or revalidated with a conditional
+request instead of downloading the body again. It also remembers URLs that recently failed
+so that repeated bad requests are rejected without any network I/O.
+
+An optional shared `CacheBackend`, such as a `SharedCache` used by every worker process of
+a host, can back the in-process cache: images downloaded by one worker are then stored
+there with their validators, and loaded by the other workers instead of being downloaded
+again. Failures are only remembered by the worker that saw them.
+"""
+
+import json
+import re
+import time
+from collections import OrderedDict
+from functools import partial
+from typing import TYPE_CHECKING
+
+from httpx import Headers
+
+from app.exceptions.image import ImageFetchError, ImageTooLargeError
+from app.interfaces.cache import CacheBackend, CacheStats
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+_MAX_AGE = re.compile(r"max-age\s*=\s*(\d+)")
+_MAX_FAILURES = 4096
+
+
+class CachedImage:
+    """A cached image body and the metadata needed to revalidate it.
+
+    Attributes
+    ----------
+    body : memoryview
+        A read-only view of the image content.
+    etag : str | None
+        The `ETag` validator returned by the image host.
+    last_modified : str | None
+        The `Last-Modified` validator returned by the image host.
+    fresh_until : float
+        The monotonic time until which the body can be used without revalidation.
+
+    """
+
+    def __init__(self, body: memoryview, etag: str | None, last_modified: str | None, fresh_until: float) -> None:
+        """Initialize the cached image.
+
+        Parameters
+        ----------
+        body : memoryview
+            A read-only view of the image content.
+        etag : str | None
+            The `ETag` validator returned by the image host.
+        last_modified : str | None
+            The `Last-Modified` validator returned by the image host.
+        fresh_until : float
+            The monotonic time until which the body can be used without revalidation.
+
+        """
+        self.body: memoryview = body
+        self.etag: str | None = etag
+        self.last_modified: str | None = last_modified
+        self.fresh_until: float = fresh_until
+
+    @property
+    def is_fresh(self) -> bool:
+        """Whether the body can be used without revalidation."""
+        return time.monotonic() < self.fresh_until
+
+    def conditional_headers(self) -> dict[str, str]:
+        """Build the headers of a conditional request revalidating this image.
+
+        Returns
+        -------
+        dict[str, str]
+            The `If-None-Match` and `If-Modified-Since` headers for the known validators.
+
+        """
+        headers: dict[str, str] = {}
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def encode(self) -> bytes:
+        """Serialize the image for a cache shared with other processes.
+
+        Returns
+        -------
+        bytes
+            A JSON line with the validators and the wall-clock expiry of the freshness,
+            followed by the body.
+
+        """
+        meta = {
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "fresh_until": time.time() + self.fresh_until - time.monotonic(),
+        }
+        return json.dumps(meta).encode() + b"\n" + self.body
+
+    @classmethod
+    def decode(cls, data: bytes) -> "CachedImage":
+        """Deserialize an image serialized by `encode`, possibly in another process.
+
+        Parameters
+        ----------
+        data : bytes
+            The serialized image.
+
+        Returns
+        -------
+        CachedImage
+            The image, with a body viewing `data` without copying it.
+
+        """
+        end = data.index(b"\n")
+        meta = json.loads(data[:end])
+        fresh_until = time.monotonic() + meta["fresh_until"] - time.time()
+        return cls(memoryview(data)[end + 1 :], meta["etag"], meta["last_modified"], fresh_until)
+
+
+class HTTPCache:
+    """Byte-bounded LRU cache of image responses with negative caching.
+
+    Attributes
+    ----------
+    max_bytes : int
+        The maximum total size of the cached bodies in bytes.
+    negative_ttl : float
+        The number of seconds a failed URL is rejected without network I/O.
+    shared : CacheBackend | None
+        The cache shared with the other worker processes, or None to only cache in process.
+    stats : CacheStats
+        The hit, miss and eviction counters of the cache. Revalidated responses count as hits.
+
+    """
+
+    def __init__(self, max_bytes: int, negative_ttl: float, shared: CacheBackend | None = None) -> None:
+        """Initialize an empty cache.
+
+        Parameters
+        ----------
+        max_bytes : int
+            The maximum total size of the cached bodies in bytes.
+        negative_ttl : float
+            The number of seconds a failed URL is rejected without network I/O.
+        shared : CacheBackend | None
+            The cache shared with the other worker processes, or None to only cache in process.
+
+        """
+        self.max_bytes: int = max_bytes
+        self.negative_ttl: float = negative_ttl
+        self.shared: CacheBackend | None = shared
+        self.stats: CacheStats = CacheStats()
+        self._entries: OrderedDict[str, CachedImage] = OrderedDict()
+        self._failures: dict[str, tuple[Callable[[], Exception], float]] = {}
+        self._size: int = 0
+
+    def raise_if_failed(self, url: str) -> None:
+        """Re-raise the error of a URL that failed recently.
+
+        Parameters
+        ----------
+        url : str
+            The URL of the image.
+
+        Raises
+        ------
+        ImageFetchError | ImageTooLargeError
+            A new error like the one recorded by `fail`, while it has not expired.
+
+        """
+        failure = self._failures.get(url)
+        if failure is None:
+            return
+
+        recreate, expires_at = failure
+        if expires_at <= time.monotonic():
+            del self._failures[url]
+            return
+
+        raise recreate()
+
+    def fail(self, url: str, error: ImageFetchError | ImageTooLargeError) -> None:
+        """Record an error so that the URL is rejected for `negative_ttl` seconds.
+
+        Only the arguments of the error are kept, and a new error is raised for every
+        subsequent request, so that concurrent requests never share the traceback and
+        context of the same exception.
+
+        Parameters
+        ----------
+        url : str
+            The URL of the image.
+        error : ImageFetchError | ImageTooLargeError
+            The error to raise again for subsequent requests.
+
+        """
+        if self.negative_ttl <= 0:
+            return
+
+        if isinstance(error, ImageFetchError):
+            recreate = partial(ImageFetchError, error.url, error.status_code)
+        else:
+            recreate = partial(ImageTooLargeError, error.max_size, error.actual_size)
+
+        self._discard(url)
+        now = time.monotonic()
+        if len(self._failures) >= _MAX_FAILURES:
+            self._failures = {key: value for key, value in self._failures.items() if value[1] > now}
+            while len(self._failures) >= _MAX_FAILURES:
+                del self._failures[next(iter(self._failures))]
+        self._failures[url] = (recreate, now + self.negative_ttl)
+
+    def get(self, url: str) -> CachedImage | None:
+        """Return the cached image of a URL, fresh or not.
+
+        Parameters
+        ----------
+        url : str
+            The URL of the image.
+
+        Returns
+        -------
+        CachedImage | None
+            The cached image, or None if the URL is not cached.
+
+        """
+        entry = self._entries.get(url)
+        if entry is not None:
+            self._entries.move_to_end(url)
+        return entry
+
+    async def load(self, url: str) -> CachedImage | None:
+        """Return the cached image of a URL, fresh or not, from this process or the shared cache.
+
+        Images found in the shared cache are kept in process for later requests.
+
+        Parameters
+        ----------
+        url : str
+            The URL of the image.
+
+        Returns
+        -------
+        CachedImage | None
+            The cached image, or None if the URL is not cached.
+
+        """
+        entry = self.get(url)
+        if entry is not None or self.shared is None:
+            return entry
+
+        data = await self.shared.get(url)
+        if data is None:
+            return None
+        entry = CachedImage.decode(data)
+        self._insert(url, entry)
+        return entry
+
+    async def store(self, url: str, body: memoryview, headers: Headers) -> None:
+        """Cache a downloaded image if its response allows it, sharing it with other workers.
+
+        Parameters
+        ----------
+        url : str
+            The URL of the image.
+        body : memoryview
+            A read-only view of the image content.
+        headers : Headers
+            The response headers.
+
+        """
+        self._discard(url)
+        _ = self._failures.pop(url, None)
+
+        max_age = self._max_age(headers)
+        if max_age is None or len(body) > self.max_bytes:
+            return
+
+        entry = CachedImage(body, headers.get("ETag"), headers.get("Last-Modified"), time.monotonic() + max_age)
+        if max_age == 0 and entry.etag is None and entry.last_modified is None:
+            return
+
+        self._insert(url, entry)
+        if self.shared is not None:
+            await self.shared.set(url, entry.encode())
+
+    async def revalidated(self, url: str, headers: Headers) -> None:
+        """Refresh a cached image after the host answered `304 Not Modified`.
+
+        The refreshed image is written back to the shared cache, so the other workers do
+        not revalidate it again.
+
+        Parameters
+        ----------
+        url : str
+            The URL of the image.
+        headers : Headers
+            The headers of the `304` response.
+
+        """
+        entry = self._entries.get(url)
+        if entry is None:
+            return
+
+        max_age = self._max_age(headers)
+        if max_age is None:
+            self._discard(url)
+            return
+
+        entry.fresh_until = time.monotonic() + max_age
+        entry.etag = headers.get("ETag", entry.etag)
+        entry.last_modified = headers.get("Last-Modified", entry.last_modified)
+        if self.shared is not None:
+            await self.shared.set(url, entry.encode())
+
+    async def aclose(self) -> None:
+        """Close the shared cache, if any."""
+        if self.shared is not None:
+            await self.shared.aclose()
+
+    def _insert(self, url: str, entry: CachedImage) -> None:
+        """Keep an image in process, evicting the least recently used ones beyond `max_bytes`.
+
+        Parameters
+        ----------
+        url : str
+            The URL of the image.
+        entry : CachedImage
+            The image.
+
+        """
+        self._discard(url)
+        self._entries[url] = entry
+        self._size += len(entry.body)
+        while self._size > self.max_bytes:
+            self._discard(next(iter(self._entries)))
+            self.stats.evictions += 1
+
+    def _discard(self, url: str) -> None:
+        """Remove the cached image of a URL, if any.
+
+        Parameters
+        ----------
+        url : str
+            The URL of the image.
+
+        """
+        entry = self._entries.pop(url, None)
+        if entry is not None:
+            self._size -= len(entry.body)
+
+    @staticmethod
+    def _max_age(headers: Headers) -> float | None:
+        """Compute how long a response stays fresh from its `Cache-Control` header.
+
+        Parameters
+        ----------
+        headers : Headers
+            The response headers.
+
+        Returns
+        -------
+        float | None
+            The freshness lifetime in seconds, 0 if the response must always be revalidated,
+            or None if it must not be stored.
+
+        """
+        cache_control = headers.get("Cache-Control", "").lower()
+        if "no-store" in cache_control:
+            return None
+        if "no-cache" in cache_control:
+            return 0
+
+        match = _MAX_AGE.search(cache_control)
+        return float(match.group(1)) if match else 0
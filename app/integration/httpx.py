@@ -1,34 +1,154 @@
 """HTTPX-based image fetching and decoding service.
 
-This module provides an implementation of the `ImageService` interface using the `httpx` library
-to fetch image content from URLs and decode it into base64-encoded strings.
+This module provides an implementation of the `AsyncImageService` interface
+using the `httpx` library to fetch image content from URLs and decode it into base64-encoded strings.
 """
 
-import base64
+import asyncio
+import binascii
+from collections.abc import Buffer
 from typing import override
 
-from httpx import Client, Headers, Response
+from httpx import AsyncClient, Headers, Limits, Timeout, codes
 
-from app.exceptions.image import ImageTooLargeError
-from app.interfaces.image import ImageService
+from app.exceptions.image import ImageFetchError, ImageTooLargeError
+from app.integration.http_cache import HTTPCache
+from app.interfaces.cache import CacheStats
+from app.interfaces.image import MAX_IMAGE_SIZE, AsyncImageService
 
+_DEFAULT_LIMITS = Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0)
+_DEFAULT_TIMEOUT = Timeout(15.0, connect=5.0)
 
-class HTTPXService(ImageService):
-    """Service for fetching and decoding images using HTTPX.
+
+class _SizeLimitedBuffer:
+    """Accumulate a streamed response body while enforcing a maximum size.
+
+    The buffer is pre-sized from the advertised `Content-Length` (capped at `max_size`)
+    so that well-behaved responses are written in place without reallocations. The
+    header is only used as a hint: the running total is checked on every chunk, so a
+    missing or wrong `Content-Length` cannot be used to push an oversized body into memory.
+
+    Attributes
+    ----------
+    max_size : int
+        The maximum allowed body size in bytes.
+    size : int
+        The number of bytes received so far.
+
+    """
+
+    def __init__(self, max_size: int, headers: Headers) -> None:
+        """Initialize the buffer and reject bodies that advertise an oversized length.
+
+        Parameters
+        ----------
+        max_size : int
+            The maximum allowed body size in bytes.
+        headers : Headers
+            The response headers, used to pre-size the buffer.
+
+        Raises
+        ------
+        ImageTooLargeError
+            If the advertised `Content-Length` exceeds `max_size`.
+
+        """
+        self.max_size: int = max_size
+        self.size: int = 0
+
+        length: str = headers.get("Content-Length", "")
+        content_length = int(length) if length.isdigit() else 0
+        if content_length > max_size:
+            raise ImageTooLargeError(max_size, content_length)
+
+        self._buffer: bytearray = bytearray(content_length)
+
+    def write(self, chunk: bytes) -> None:
+        """Append a chunk to the buffer.
+
+        Parameters
+        ----------
+        chunk : bytes
+            The next chunk of the response body.
+
+        Raises
+        ------
+        ImageTooLargeError
+            As soon as the running total exceeds `max_size`.
+
+        """
+        end = self.size + len(chunk)
+        if end > self.max_size:
+            raise ImageTooLargeError(self.max_size, end)
+
+        self._buffer[self.size : end] = chunk
+        self.size = end
+
+    def getvalue(self) -> memoryview:
+        """Return the received body without copying it.
+
+        The buffer cannot be written to afterwards.
+
+        Returns
+        -------
+        memoryview
+            A read-only view of the body, trimmed to the number of bytes actually received.
+
+        """
+        del self._buffer[self.size :]
+        return memoryview(self._buffer).toreadonly()
+
+
+class AsyncHTTPXService(AsyncImageService):
+    """Service for fetching and decoding images using a shared `httpx.AsyncClient`.
+
+    A single client is kept for the lifetime of the service so that connections to image
+    hosts are pooled and reused across requests instead of being re-established each time.
 
     Attributes
     ----------
     method : str
         The encoding method used for decoding image bytes into strings. Defaults to "utf-8".
+    max_size : int
+        The maximum allowed image size in bytes.
+    client : AsyncClient
+        The shared HTTP client used for all image downloads.
+    cache : HTTPCache | None
+        The cache of downloaded images, or None to always download.
 
     """
 
-    def __init__(self) -> None:
-        """Initialize the HTTPXService with default encoding method."""
+    def __init__(
+        self,
+        cache: HTTPCache | None = None,
+        limits: Limits = _DEFAULT_LIMITS,
+        timeout: Timeout = _DEFAULT_TIMEOUT,
+    ) -> None:
+        """Initialize the AsyncHTTPXService and its connection pool.
+
+        Parameters
+        ----------
+        cache : HTTPCache | None
+            The cache of downloaded images, or None to always download.
+        limits : Limits
+            The connection pool limits: at most 100 connections, 20 of them kept alive
+            for 30 seconds when idle by default.
+        timeout : Timeout
+            The request timeouts: 5 seconds to connect and 15 seconds between received
+            chunks by default.
+
+        """
         self.method: str = "utf-8"
+        self.max_size: int = MAX_IMAGE_SIZE
+        self.cache: HTTPCache | None = cache
+        self.client: AsyncClient = AsyncClient(
+            limits=limits,
+            timeout=timeout,
+            follow_redirects=True,
+        )
 
     @override
-    def fetch_img_content(self, url: str) -> bytes:
+    async def fetch_img_content(self, url: str) -> memoryview:
         """Fetch raw image content from a given URL.
 
         Parameters
@@ -38,45 +158,87 @@ class HTTPXService(ImageService):
 
         Returns
         -------
-        bytes
-            The raw image content as bytes.
+        memoryview
+            A read-only view of the raw image content.
 
         Raises
         ------
         ImageTooLargeError
-            If the image size exceeds the maximum allowed size (5MB).
+            If the image size exceeds the maximum allowed size (4MB).
+        ImageFetchError
+            If the image host answers with a client error.
         httpx.HTTPError
             If there's an error during the HTTP request.
 
         """
-        max_size: int = 4 * 1024 * 1024  # 4MB
+        if self.cache is None:
+            return await self._download(url, {})
+
+        self.cache.raise_if_failed(url)
+        cached = await self.cache.load(url)
+        if cached is not None and cached.is_fresh:
+            self.cache.stats.hits += 1
+            return cached.body
+
+        try:
+            return await self._download(url, cached.conditional_headers() if cached is not None else {})
+        except (ImageFetchError, ImageTooLargeError) as e:
+            self.cache.fail(url, e)
+            raise
+
+    async def _download(self, url: str, headers: dict[str, str]) -> memoryview:
+        """Download an image, revalidating the cached copy when validators are given.
+
+        Parameters
+        ----------
+        url : str
+            The URL of the image to fetch.
+        headers : dict[str, str]
+            The conditional request headers of the cached copy, if any.
+
+        Returns
+        -------
+        memoryview
+            A read-only view of the raw image content.
 
-        with Client() as client:
-            head_response: Response = client.head(url)
-            headers: Headers = head_response.headers
-            length: str = headers.get("Content-Length", 0)
-            content_length = int(length)
+        """
+        async with self.client.stream("GET", url, headers=headers) as response:
+            if self.cache is not None and response.status_code == codes.NOT_MODIFIED:
+                cached = self.cache.get(url)
+                if cached is None:
+                    # The cached copy was evicted while revalidating it.
+                    return await self._download(url, {})
 
-            if content_length > max_size:
-                raise ImageTooLargeError(max_size, content_length)
+                await self.cache.revalidated(url, response.headers)
+                self.cache.stats.hits += 1
+                return cached.body
 
-            response = client.get(url)
+            if response.is_client_error:
+                raise ImageFetchError(url, response.status_code)
             _ = response.raise_for_status()
 
-            content = response.content
-            if len(content) > max_size:
-                raise ImageTooLargeError(max_size, len(content))
+            buffer = _SizeLimitedBuffer(self.max_size, response.headers)
+            async for chunk in response.aiter_bytes():
+                buffer.write(chunk)
+            content = buffer.getvalue()
 
-            return content
+        if self.cache is not None:
+            self.cache.stats.misses += 1
+            await self.cache.store(url, content, response.headers)
+        return content
 
     @override
-    def decode_img_bytes(self, content: bytes) -> str:
+    async def decode_img_bytes(self, content: Buffer) -> str:
         """Decode raw image bytes into a base64-encoded string.
 
+        The content is encoded straight from the buffer, without first being copied into a
+        `bytes` object, in a worker thread so that encoding a large image does not block the
+        event loop. The encoded bytes are then decoded into the returned string.
+
         Parameters
         ----------
-        content : bytes
-            The raw image content as bytes.
+        content : Buffer
+            The raw image content, as bytes or any other buffer.
 
         Returns
         -------
@@ -84,4 +246,42 @@ class HTTPXService(ImageService):
             The base64-encoded string representation of the image.
 
         """
-        return base64.standard_b64encode(content).decode(self.method)
+        return await asyncio.to_thread(self._encode, content, self.method)
+
+    @staticmethod
+    def _encode(content: Buffer, method: str) -> str:
+        """Encode raw image bytes into a base64-encoded string. Runs in a worker thread.
+
+        Parameters
+        ----------
+        content : Buffer
+            The raw image content.
+        method : str
+            The encoding of the returned string.
+
+        Returns
+        -------
+        str
+            The base64-encoded string representation of the image.
+
+        """
+        return binascii.b2a_base64(content, newline=False).decode(method)
+
+    @override
+    def cache_stats(self) -> CacheStats | None:
+        """Return the counters of the download cache.
+
+        Returns
+        -------
+        CacheStats | None
+            The hit, miss and eviction counters of `cache`, or None without cache.
+
+        """
+        return self.cache.stats if self.cache is not None else None
+
+    @override
+    async def aclose(self) -> None:
+        """Close the shared HTTP client, its pooled connections and the download cache."""
+        await self.client.aclose()
+        if self.cache is not None:
+            await self.cache.aclose()
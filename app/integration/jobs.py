@@ -0,0 +1,357 @@
+"""Job store implementations.
+
+This module provides `SQLiteJobStore`, an implementation of the `JobStore` interface backed
+by a local SQLite database, so job results survive application restarts. The database is
+opened in WAL mode with a busy timeout, so the worker processes of a host can share it.
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, override
+
+from app.interfaces.jobs import Job, JobStatus, JobStore, StoredEvent
+
+
+class SQLiteJobStore(JobStore):
+    """Job store backed by a SQLite database.
+
+    Database access runs in worker threads so the event loop is never blocked on disk I/O.
+    The events of a running job are written in batches, and the remaining ones together with
+    its final state in a single transaction when the job completes.
+
+    Attributes
+    ----------
+    path : Path
+        The location of the SQLite database file.
+
+    """
+
+    def __init__(self, path: Path, busy_timeout: float = 5.0) -> None:
+        """Open the database and create the job tables if needed.
+
+        Parameters
+        ----------
+        path : Path
+            The location of the SQLite database file.
+        busy_timeout : float
+            The number of seconds a write waits for the writers of other processes.
+
+        """
+        self.path: Path = path
+        self._lock: threading.Lock = threading.Lock()
+        self._conn: sqlite3.Connection = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False)
+        _ = self._conn.execute("PRAGMA journal_mode = WAL")
+        _ = self._conn.execute("PRAGMA synchronous = NORMAL")
+        _ = self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                mode TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                finished_at REAL,
+                owner TEXT,
+                lease_until REAL,
+                output TEXT NOT NULL DEFAULT 'text',
+                tier TEXT
+            );
+            CREATE INDEX IF NOT EXISTS jobs_finished_at ON jobs (finished_at);
+            CREATE TABLE IF NOT EXISTS job_events (
+                job_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                event TEXT NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (job_id, seq)
+            ) WITHOUT ROWID;
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (
+            ("owner", "TEXT"),
+            ("lease_until", "REAL"),
+            ("output", "TEXT NOT NULL DEFAULT 'text'"),
+            ("tier", "TEXT"),
+        ):
+            if column not in columns:
+                # Databases created before jobs were leased and kept their options.
+                _ = self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._conn.commit()
+
+    @override
+    async def create(self, job: Job, owner: str, lease_until: float) -> None:
+        """Record a new job, leased by the process that will run it.
+
+        Parameters
+        ----------
+        job : Job
+            The submitted job.
+        owner : str
+            The identifier of the process running the job.
+        lease_until : float
+            The UNIX time until which the job is leased, unless the lease is renewed.
+
+        """
+        await asyncio.to_thread(
+            self._execute,
+            """
+            INSERT INTO jobs (id, url, mode, status, created_at, output, tier, owner, lease_until)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (job.id, job.url, job.mode, job.status, job.created_at, job.output, job.tier, owner, lease_until),
+        )
+
+    @override
+    async def get(self, job_id: str) -> Job | None:
+        """Return a job.
+
+        Parameters
+        ----------
+        job_id : str
+            The identifier of the job.
+
+        Returns
+        -------
+        Job | None
+            The job, or None if it is unknown or was purged.
+
+        """
+        rows = await asyncio.to_thread(
+            self._fetch,
+            "SELECT id, url, mode, status, created_at, output, tier FROM jobs WHERE id = ?",
+            (job_id,),
+        )
+        return Job(*rows[0]) if rows else None
+
+    @override
+    async def set_status(self, job_id: str, status: JobStatus) -> None:
+        """Update the state of an unfinished job.
+
+        Parameters
+        ----------
+        job_id : str
+            The identifier of the job.
+        status : JobStatus
+            The new state of the job.
+
+        """
+        await asyncio.to_thread(self._execute, "UPDATE jobs SET status = ? WHERE id = ?", (status, job_id))
+
+    @override
+    async def append(self, job_id: str, after: int, events: list[StoredEvent]) -> None:
+        """Store the next events of a running job.
+
+        Parameters
+        ----------
+        job_id : str
+            The identifier of the job.
+        after : int
+            The number of events of the job already stored.
+        events : list[StoredEvent]
+            The events following them, in order.
+
+        """
+        await asyncio.to_thread(self._append, job_id, after, events)
+
+    @override
+    async def complete(self, job_id: str, status: JobStatus, events: list[StoredEvent]) -> None:
+        """Store the result of a job and mark it as finished, atomically.
+
+        Parameters
+        ----------
+        job_id : str
+            The identifier of the job.
+        status : JobStatus
+            The final state of the job: "succeeded" or "failed".
+        events : list[StoredEvent]
+            The events of the result, in order.
+
+        """
+        await asyncio.to_thread(self._complete, job_id, status, events)
+
+    @override
+    async def events(self, job_id: str, after: int) -> list[StoredEvent]:
+        """Return the stored events of a job, running or finished.
+
+        Parameters
+        ----------
+        job_id : str
+            The identifier of the job.
+        after : int
+            The number of events to skip, as the id of the last event already received.
+
+        Returns
+        -------
+        list[StoredEvent]
+            The events following `after`, in order.
+
+        """
+        return await asyncio.to_thread(
+            self._fetch, "SELECT event, data FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq", (job_id, after)
+        )
+
+    @override
+    async def renew(self, owner: str, lease_until: float) -> None:
+        """Extend the lease of every unfinished job of a process.
+
+        Parameters
+        ----------
+        owner : str
+            The identifier of the process running the jobs.
+        lease_until : float
+            The UNIX time until which the jobs are leased.
+
+        """
+        await asyncio.to_thread(
+            self._execute,
+            "UPDATE jobs SET lease_until = ? WHERE owner = ? AND finished_at IS NULL",
+            (lease_until, owner),
+        )
+
+    @override
+    async def expired(self, now: float) -> list[Job]:
+        """Return the unfinished jobs whose lease expired, because their process stopped.
+
+        Jobs created before leases were recorded have none, and are considered expired.
+
+        Parameters
+        ----------
+        now : float
+            The current UNIX time.
+
+        Returns
+        -------
+        list[Job]
+            The abandoned jobs, oldest first.
+
+        """
+        rows = await asyncio.to_thread(
+            self._fetch,
+            """
+            SELECT id, url, mode, status, created_at, output, tier FROM jobs
+            WHERE finished_at IS NULL AND (lease_until IS NULL OR lease_until < ?)
+            ORDER BY created_at
+            """,
+            (now,),
+        )
+        return [Job(*row) for row in rows]
+
+    @override
+    async def purge(self, before: float) -> int:
+        """Delete the jobs that finished before a given time, with their results.
+
+        Parameters
+        ----------
+        before : float
+            The UNIX time before which finished jobs are deleted.
+
+        Returns
+        -------
+        int
+            The number of deleted jobs.
+
+        """
+        return await asyncio.to_thread(self._purge, before)
+
+    @override
+    async def aclose(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def _execute(self, sql: str, parameters: tuple[object, ...]) -> None:
+        """Run a statement in its own transaction.
+
+        Parameters
+        ----------
+        sql : str
+            The statement.
+        parameters : tuple[object, ...]
+            The values bound to the statement.
+
+        """
+        with self._lock, self._conn:
+            _ = self._conn.execute(sql, parameters)
+
+    def _fetch(self, sql: str, parameters: tuple[object, ...]) -> list[tuple[Any, ...]]:
+        """Run a query and return every row.
+
+        Parameters
+        ----------
+        sql : str
+            The query.
+        parameters : tuple[object, ...]
+            The values bound to the query.
+
+        Returns
+        -------
+        list[tuple[Any, ...]]
+            The rows of the result.
+
+        """
+        with self._lock:
+            return self._conn.execute(sql, parameters).fetchall()
+
+    def _append(self, job_id: str, after: int, events: list[StoredEvent]) -> None:
+        """Write the next events of a running job.
+
+        Parameters
+        ----------
+        job_id : str
+            The identifier of the job.
+        after : int
+            The number of events of the job already stored.
+        events : list[StoredEvent]
+            The events following them, in order.
+
+        """
+        with self._lock, self._conn:
+            _ = self._conn.executemany(
+                "INSERT OR REPLACE INTO job_events (job_id, seq, event, data) VALUES (?, ?, ?, ?)",
+                [(job_id, seq, event, data) for seq, (event, data) in enumerate(events, start=after + 1)],
+            )
+
+    def _complete(self, job_id: str, status: JobStatus, events: list[StoredEvent]) -> None:
+        """Write the events of a result and the final state of its job.
+
+        Parameters
+        ----------
+        job_id : str
+            The identifier of the job.
+        status : JobStatus
+            The final state of the job.
+        events : list[StoredEvent]
+            The events of the result, in order.
+
+        """
+        with self._lock, self._conn:
+            _ = self._conn.executemany(
+                "INSERT OR REPLACE INTO job_events (job_id, seq, event, data) VALUES (?, ?, ?, ?)",
+                [(job_id, seq, event, data) for seq, (event, data) in enumerate(events, start=1)],
+            )
+            _ = self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ?", (status, time.time(), job_id)
+            )
+
+    def _purge(self, before: float) -> int:
+        """Delete the jobs that finished before a given time, with their results.
+
+        Parameters
+        ----------
+        before : float
+            The UNIX time before which finished jobs are deleted.
+
+        Returns
+        -------
+        int
+            The number of deleted jobs.
+
+        """
+        with self._lock, self._conn:
+            _ = self._conn.execute(
+                "DELETE FROM job_events WHERE job_id IN (SELECT id FROM jobs WHERE finished_at < ?)", (before,)
+            )
+            return self._conn.execute("DELETE FROM jobs WHERE finished_at < ?", (before,)).rowcount
@@ -0,0 +1,83 @@
+"""Cache backend interface module.
+
+This module defines the abstract base class `CacheBackend`, which provides the interface
+for storing and retrieving binary values by key, and the `CacheStats` counters shared by
+every implementation. Implementations decide where values live and how they are evicted.
+"""
+
+from abc import ABC, abstractmethod
+
+
+class CacheStats:
+    """Counters describing the effectiveness of a cache.
+
+    Attributes
+    ----------
+    hits : int
+        The number of lookups that returned a value.
+    misses : int
+        The number of lookups that found no usable value.
+    evictions : int
+        The number of entries removed to respect size limits or because they expired.
+
+    """
+
+    def __init__(self) -> None:
+        """Initialize all counters to zero."""
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of lookups that were hits, or 0.0 before the first lookup."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class CacheBackend(ABC):
+    """Abstract base class for key-value cache backends.
+
+    Attributes
+    ----------
+    stats : CacheStats
+        The hit, miss and eviction counters of the backend.
+
+    """
+
+    stats: CacheStats
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None:
+        """Return the value stored under a key.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+
+        Returns
+        -------
+        bytes | None
+            The stored value, or None if the key is missing or expired.
+
+        """
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        """Store a value under a key.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+        value : bytes
+            The value to store.
+        ttl : float | None
+            The number of seconds the value stays valid, or None to use the backend default.
+
+        """
+
+    @abstractmethod
+    async def aclose(self) -> None:
+        """Release any resources held by the backend."""
@@ -0,0 +1,209 @@
+"""Diet log store interface module.
+
+This module defines the abstract base class `DietLogStore`, which persists the analyses
+of a user's meals, and the `LogEntry` and `Rollup` records shared by every implementation.
+Stores maintain daily and weekly score aggregates as entries are added, so reading the
+aggregates of a period never scans the entries of that period.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Literal
+
+type RollupPeriod = Literal["day", "week"]
+"""The periods scores are aggregated over. Weeks start on Monday."""
+
+
+class LogEntry:
+    """An analysed meal in a user's diet log.
+
+    Attributes
+    ----------
+    id : int | None
+        The identifier of the entry, or None before it is stored.
+    user : str
+        The key of the user the meal belongs to.
+    image_hash : str
+        The SHA-256 digest of the analysed image, or of the digests of every photo of a meal.
+    description : str
+        The description of the meal.
+    feedback : str
+        The complete nutritional feedback.
+    score : float | None
+        The health score parsed from the feedback, or None when it has none.
+    created_at : float
+        The UNIX time at which the analysis completed.
+
+    """
+
+    def __init__(  # noqa: PLR0913, PLR0917 - one argument per stored column
+        self,
+        entry_id: int | None,
+        user: str,
+        image_hash: str,
+        description: str,
+        feedback: str,
+        score: float | None,
+        created_at: float,
+    ) -> None:
+        """Initialize the entry.
+
+        Parameters
+        ----------
+        entry_id : int | None
+            The identifier of the entry, or None before it is stored.
+        user : str
+            The key of the user the meal belongs to.
+        image_hash : str
+            The SHA-256 digest of the analysed image, or of the digests of every photo of a meal.
+        description : str
+            The description of the meal.
+        feedback : str
+            The complete nutritional feedback.
+        score : float | None
+            The health score parsed from the feedback, or None when it has none.
+        created_at : float
+            The UNIX time at which the analysis completed.
+
+        """
+        self.id: int | None = entry_id
+        self.user: str = user
+        self.image_hash: str = image_hash
+        self.description: str = description
+        self.feedback: str = feedback
+        self.score: float | None = score
+        self.created_at: float = created_at
+
+
+class Rollup:
+    """The aggregated scores of a user over a day or a week.
+
+    Attributes
+    ----------
+    period : RollupPeriod
+        The length of the period.
+    start : str
+        The first day of the period, as an ISO date in UTC.
+    entries : int
+        The number of entries logged during the period.
+    scored : int
+        The number of those entries with a score.
+    score_sum : float
+        The sum of the scores.
+    score_min : float | None
+        The lowest score, or None when no entry has a score.
+    score_max : float | None
+        The highest score, or None when no entry has a score.
+
+    """
+
+    def __init__(  # noqa: PLR0913, PLR0917 - one argument per stored column
+        self,
+        period: RollupPeriod,
+        start: str,
+        entries: int,
+        scored: int,
+        score_sum: float,
+        score_min: float | None,
+        score_max: float | None,
+    ) -> None:
+        """Initialize the rollup.
+
+        Parameters
+        ----------
+        period : RollupPeriod
+            The length of the period.
+        start : str
+            The first day of the period, as an ISO date in UTC.
+        entries : int
+            The number of entries logged during the period.
+        scored : int
+            The number of those entries with a score.
+        score_sum : float
+            The sum of the scores.
+        score_min : float | None
+            The lowest score, or None when no entry has a score.
+        score_max : float | None
+            The highest score, or None when no entry has a score.
+
+        """
+        self.period: RollupPeriod = period
+        self.start: str = start
+        self.entries: int = entries
+        self.scored: int = scored
+        self.score_sum: float = score_sum
+        self.score_min: float | None = score_min
+        self.score_max: float | None = score_max
+
+    @property
+    def mean_score(self) -> float | None:
+        """The average score of the period, or None when no entry has a score."""
+        return self.score_sum / self.scored if self.scored else None
+
+
+class DietLogStore(ABC):
+    """Abstract base class for persistent diet logs."""
+
+    @abstractmethod
+    async def add(self, entry: LogEntry) -> LogEntry:
+        """Store an entry and update the rollups of its day and week.
+
+        Parameters
+        ----------
+        entry : LogEntry
+            The entry to store, without identifier.
+
+        Returns
+        -------
+        LogEntry
+            The stored entry, with its identifier.
+
+        """
+
+    @abstractmethod
+    async def history(self, user: str, *, before: float | None = None, limit: int = 50) -> list[LogEntry]:
+        """Return the latest entries of a user.
+
+        Parameters
+        ----------
+        user : str
+            The key of the user.
+        before : float | None
+            Only return entries created before this UNIX time, to page through the history,
+            or None to start from the latest entry.
+        limit : int
+            The maximum number of entries returned.
+
+        Returns
+        -------
+        list[LogEntry]
+            The entries, newest first.
+
+        """
+
+    @abstractmethod
+    async def rollups(
+        self, user: str, period: RollupPeriod, *, since: str | None = None, until: str | None = None
+    ) -> list[Rollup]:
+        """Return the score aggregates of a user.
+
+        Parameters
+        ----------
+        user : str
+            The key of the user.
+        period : RollupPeriod
+            The length of the periods.
+        since : str | None
+            The ISO date of the earliest period start returned, or None for no lower bound.
+        until : str | None
+            The ISO date of the latest period start returned, or None for no upper bound.
+
+        Returns
+        -------
+        list[Rollup]
+            The aggregates of every period with entries, oldest first.
+
+        """
+
+    @abstractmethod
+    async def aclose(self) -> None:
+        """Release any resources held by the store."""
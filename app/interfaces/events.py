@@ -0,0 +1,95 @@
+"""Server-sent event type module.
+
+This module defines the `ServerSentEvent` class, the typed events sent to clients, and
+their encoding in the `text/event-stream` format. It is shared by the LLM services, the
+feedback parser and the routes, while the `EventStream` framing them into responses lives
+in `app.services.sse`.
+
+Events are one of "status" (the pipeline stage that started), "delta" (a chunk of text),
+"done" (the stream completed) and "error" (the stream failed). Streams parsed into sections
+replace "delta" with "section_start", "section_delta", "section_end" and "score". Their
+data is JSON.
+"""
+
+import json
+from typing import Any, Literal
+
+type EventType = Literal["status", "delta", "section_start", "section_delta", "section_end", "score", "done", "error"]
+"""The types of events sent to clients."""
+
+
+class ServerSentEvent:
+    """A typed event sent to clients.
+
+    Attributes
+    ----------
+    event : EventType
+        The type of the event.
+    data : dict[str, Any]
+        The payload of the event, sent as JSON.
+
+    """
+
+    def __init__(self, event: EventType, data: dict[str, Any] | None = None) -> None:
+        """Initialize the event.
+
+        Parameters
+        ----------
+        event : EventType
+            The type of the event.
+        data : dict[str, Any] | None
+            The payload of the event, sent as JSON. Defaults to an empty object.
+
+        """
+        self.event: EventType = event
+        self.data: dict[str, Any] = data if data is not None else {}
+
+    @classmethod
+    def status(cls, stage: str) -> "ServerSentEvent":
+        """Build an event announcing a pipeline stage.
+
+        Parameters
+        ----------
+        stage : str
+            The stage that started.
+
+        Returns
+        -------
+        ServerSentEvent
+            A "status" event.
+
+        """
+        return cls("status", {"stage": stage})
+
+    @classmethod
+    def delta(cls, text: str) -> "ServerSentEvent":
+        """Build an event carrying a chunk of text.
+
+        Parameters
+        ----------
+        text : str
+            The chunk of text.
+
+        Returns
+        -------
+        ServerSentEvent
+            A "delta" event.
+
+        """
+        return cls("delta", {"text": text})
+
+    def encode(self, event_id: int) -> str:
+        """Encode the event in the `text/event-stream` format.
+
+        Parameters
+        ----------
+        event_id : int
+            The position of the event in its stream.
+
+        Returns
+        -------
+        str
+            The framed event, terminated by a blank line.
+
+        """
+        return f"id: {event_id}\nevent: {self.event}\ndata: {json.dumps(self.data)}\n\n"
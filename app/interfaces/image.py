@@ -1,22 +1,38 @@
 """Image service interface module.
 
-This module defines the abstract base class `ImageService`, which provides the interface
-for fetching and decoding image content. Implementations of this class are responsible
+This module defines the abstract base class `AsyncImageService`, which provides the interface
+for fetching and decoding image content, and the `ImageMediaType` of supported images. Implementations of this class are responsible
 for handling specific logic for retrieving and processing images.
+
+Image content moves through the services as buffers: fetched images are returned as a
+read-only `memoryview` of the buffer they were received into, and encoders accept any
+object supporting the buffer protocol, so the payload is never copied between stages.
 """
 
 from abc import ABC, abstractmethod
+from collections.abc import Buffer
+from typing import Literal
+
+from app.interfaces.cache import CacheStats
+
+type ImageMediaType = Literal["image/jpeg", "image/png", "image/gif", "image/webp"]
+"""The media types of the image formats accepted by the LLM services."""
 
+MAX_IMAGE_SIZE = 4 * 1024 * 1024
+"""The maximum size of an image in bytes, whether fetched or uploaded."""
 
-class ImageService(ABC):
-    """Abstract base class for image services.
 
-    This class defines the interface for fetching image content from a URL and decoding
-    raw image bytes into a usable format, such as a base64-encoded string.
+class AsyncImageService(ABC):
+    """Abstract base class for asynchronous image services.
+
+    This class defines the interface for fetching image content from a URL without
+    blocking the event loop, and decoding raw image bytes into a usable format, such as a
+    base64-encoded string. Implementations usually hold long-lived resources,
+    such as connection pools, which must be released through `aclose`.
     """
 
     @abstractmethod
-    def fetch_img_content(self, url: str) -> bytes:
+    async def fetch_img_content(self, url: str) -> memoryview:
         """Fetch raw image content from a given URL.
 
         Parameters
@@ -26,19 +42,19 @@ class ImageService(ABC):
 
         Returns
         -------
-        bytes
-            The raw image content as bytes.
+        memoryview
+            A read-only view of the raw image content.
 
         """
 
     @abstractmethod
-    def decode_img_bytes(self, content: bytes) -> str:
+    async def decode_img_bytes(self, content: Buffer) -> str:
         """Decode raw image bytes into a usable format.
 
         Parameters
         ----------
-        content : bytes
-            The raw image content as bytes.
+        content : Buffer
+            The raw image content, as bytes or any other buffer.
 
         Returns
         -------
@@ -46,3 +62,18 @@ class ImageService(ABC):
             The decoded image content, typically as a base64-encoded string.
 
         """
+
+    def cache_stats(self) -> CacheStats | None:
+        """Return the counters of the cache of fetched images.
+
+        Returns
+        -------
+        CacheStats | None
+            The hit, miss and eviction counters, or None when the service caches nothing.
+
+        """
+        return None
+
+    @abstractmethod
+    async def aclose(self) -> None:
+        """Release any resources held by the service."""
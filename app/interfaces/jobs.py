@@ -0,0 +1,230 @@
+"""Job store interface module.
+
+This module defines the abstract base class `JobStore`, which persists analysis jobs and
+the events of their results, and the `Job` record shared by every implementation. Events
+are stored while a job runs and its result once it completes, so clients connected to any
+worker process can follow it, and reconnecting clients can replay it without running the
+analysis again. Every job is leased by the process running it, which renews the lease
+while it is alive, so the jobs of a process that stopped can be told apart from the jobs
+other processes are still running.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Literal
+
+type JobStatus = Literal["queued", "running", "succeeded", "failed"]
+"""The states of a job, from submission to completion."""
+
+type StoredEvent = tuple[str, str]
+"""An event of a job result: its type and its JSON payload."""
+
+
+class Job:
+    """An analysis job.
+
+    Attributes
+    ----------
+    id : str
+        The unique identifier of the job.
+    url : str
+        The URL of the image to analyse.
+    mode : str
+        The pipeline mode used for the analysis.
+    status : JobStatus
+        The current state of the job.
+    created_at : float
+        The UNIX time at which the job was submitted.
+    output : str
+        The output format of the result events.
+    tier : str | None
+        The latency tier of the LLM calls, or None for the default tiers.
+
+    """
+
+    def __init__(  # noqa: PLR0913, PLR0917 - the fields of the job
+        self,
+        job_id: str,
+        url: str,
+        mode: str,
+        status: JobStatus,
+        created_at: float,
+        output: str = "text",
+        tier: str | None = None,
+    ) -> None:
+        """Initialize the job.
+
+        Parameters
+        ----------
+        job_id : str
+            The unique identifier of the job.
+        url : str
+            The URL of the image to analyse.
+        mode : str
+            The pipeline mode used for the analysis.
+        status : JobStatus
+            The current state of the job.
+        created_at : float
+            The UNIX time at which the job was submitted.
+        output : str
+            The output format of the result events.
+        tier : str | None
+            The latency tier of the LLM calls, or None for the default tiers.
+
+        """
+        self.id: str = job_id
+        self.url: str = url
+        self.mode: str = mode
+        self.status: JobStatus = status
+        self.created_at: float = created_at
+        self.output: str = output
+        self.tier: str | None = tier
+
+    @property
+    def finished(self) -> bool:
+        """Whether the job has completed, successfully or not."""
+        return self.status in {"succeeded", "failed"}
+
+
+class JobStore(ABC):
+    """Abstract base class for persistent job stores."""
+
+    @abstractmethod
+    async def create(self, job: Job, owner: str, lease_until: float) -> None:
+        """Record a new job, leased by the process that will run it.
+
+        Parameters
+        ----------
+        job : Job
+            The submitted job.
+        owner : str
+            The identifier of the process running the job.
+        lease_until : float
+            The UNIX time until which the job is leased, unless the lease is renewed.
+
+        """
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Job | None:
+        """Return a job.
+
+        Parameters
+        ----------
+        job_id : str
+            The identifier of the job.
+
+        Returns
+        -------
+        Job | None
+            The job, or None if it is unknown or was purged.
+
+        """
+
+    @abstractmethod
+    async def set_status(self, job_id: str, status: JobStatus) -> None:
+        """Update the state of an unfinished job.
+
+        Parameters
+        ----------
+        job_id : str
+            The identifier of the job.
+        status : JobStatus
+            The new state of the job.
+
+        """
+
+    @abstractmethod
+    async def append(self, job_id: str, after: int, events: list[StoredEvent]) -> None:
+        """Store the next events of a running job.
+
+        Parameters
+        ----------
+        job_id : str
+            The identifier of the job.
+        after : int
+            The number of events of the job already stored.
+        events : list[StoredEvent]
+            The events following them, in order.
+
+        """
+
+    @abstractmethod
+    async def complete(self, job_id: str, status: JobStatus, events: list[StoredEvent]) -> None:
+        """Store the result of a job and mark it as finished, atomically.
+
+        Parameters
+        ----------
+        job_id : str
+            The identifier of the job.
+        status : JobStatus
+            The final state of the job: "succeeded" or "failed".
+        events : list[StoredEvent]
+            The events of the result, in order.
+
+        """
+
+    @abstractmethod
+    async def events(self, job_id: str, after: int) -> list[StoredEvent]:
+        """Return the stored events of a job, running or finished.
+
+        Parameters
+        ----------
+        job_id : str
+            The identifier of the job.
+        after : int
+            The number of events to skip, as the id of the last event already received.
+
+        Returns
+        -------
+        list[StoredEvent]
+            The events following `after`, in order.
+
+        """
+
+    @abstractmethod
+    async def renew(self, owner: str, lease_until: float) -> None:
+        """Extend the lease of every unfinished job of a process.
+
+        Parameters
+        ----------
+        owner : str
+            The identifier of the process running the jobs.
+        lease_until : float
+            The UNIX time until which the jobs are leased.
+
+        """
+
+    @abstractmethod
+    async def expired(self, now: float) -> list[Job]:
+        """Return the unfinished jobs whose lease expired, because their process stopped.
+
+        Parameters
+        ----------
+        now : float
+            The current UNIX time.
+
+        Returns
+        -------
+        list[Job]
+            The abandoned jobs, oldest first.
+
+        """
+
+    @abstractmethod
+    async def purge(self, before: float) -> int:
+        """Delete the jobs that finished before a given time, with their results.
+
+        Parameters
+        ----------
+        before : float
+            The UNIX time before which finished jobs are deleted.
+
+        Returns
+        -------
+        int
+            The number of deleted jobs.
+
+        """
+
+    @abstractmethod
+    async def aclose(self) -> None:
+        """Release any resources held by the store."""
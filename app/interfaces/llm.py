@@ -1,13 +1,65 @@
 """LLM (Large Language Model) service interface module.
 
 This module defines the abstract base class `LLMService`, which provides the interface
-for interacting with large language models. Implementations of this class are responsible
-for handling specific logic for generating image descriptions and streaming nutritional feedback.
+for interacting with large language models, and the `TokenUsage` counters it reports.
+Implementations of this class are responsible for handling specific logic for generating
+image descriptions and streaming nutritional feedback.
 """
 
 from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
 
-from fastapi.responses import StreamingResponse
+from app.interfaces.image import ImageMediaType
+
+
+class TokenUsage:
+    """Cumulative token counters reported by an LLM provider.
+
+    Attributes
+    ----------
+    requests : int
+        The number of completed LLM requests.
+    input_tokens : int
+        The number of uncached input tokens.
+    output_tokens : int
+        The number of generated tokens.
+    cache_creation_input_tokens : int
+        The number of input tokens written to the provider's prompt cache.
+    cache_read_input_tokens : int
+        The number of input tokens read from the provider's prompt cache.
+
+    """
+
+    def __init__(self) -> None:
+        """Initialize all counters to zero."""
+        self.requests: int = 0
+        self.input_tokens: int = 0
+        self.output_tokens: int = 0
+        self.cache_creation_input_tokens: int = 0
+        self.cache_read_input_tokens: int = 0
+
+    def add(
+        self, input_tokens: int, output_tokens: int, cache_creation_input_tokens: int, cache_read_input_tokens: int
+    ) -> None:
+        """Add the usage of one completed request.
+
+        Parameters
+        ----------
+        input_tokens : int
+            The number of uncached input tokens.
+        output_tokens : int
+            The number of generated tokens.
+        cache_creation_input_tokens : int
+            The number of input tokens written to the prompt cache.
+        cache_read_input_tokens : int
+            The number of input tokens read from the prompt cache.
+
+        """
+        self.requests += 1
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        self.cache_creation_input_tokens += cache_creation_input_tokens
+        self.cache_read_input_tokens += cache_read_input_tokens
 
 
 class LLMService(ABC):
@@ -15,16 +67,69 @@ class LLMService(ABC):
 
     This class defines the interface for generating image descriptions and streaming
     nutritional feedback using large language models.
+
+    Attributes
+    ----------
+    usage : TokenUsage
+        The token counters of every request made by the service.
+
     """
 
+    usage: TokenUsage
+
+    @property
     @abstractmethod
-    async def get_image_description(self, image_data: str) -> str:
+    def description_fingerprint(self) -> str:
+        """Identify the model and prompt used by `get_image_description`.
+
+        Cached descriptions are only reused while this value stays the same, so it must
+        change whenever the default model or the description prompt changes. Callers
+        selecting another model add it to the fingerprint.
+        """
+
+    @property
+    @abstractmethod
+    def fused_fingerprint(self) -> str:
+        """Identify the model and prompt used by `iter_fused_analysis`.
+
+        Cached fused analyses are only reused while this value stays the same. Callers
+        selecting another model add it to the fingerprint.
+        """
+
+    @abstractmethod
+    def feedback_fingerprint(self, img_description: str) -> str:
+        """Identify the request made by `iter_nutritional_feedback` for a description.
+
+        Cached feedback is only reused for requests with the same fingerprint, so it must
+        include the fully rendered prompt and the default model. Callers selecting another
+        model add it to the fingerprint.
+
+        Parameters
+        ----------
+        img_description : str
+            The description of the food to analyse.
+
+        Returns
+        -------
+        str
+            The fingerprint of the feedback request.
+
+        """
+
+    @abstractmethod
+    async def get_image_description(
+        self, image_data: str, media_type: ImageMediaType = "image/jpeg", model: str | None = None
+    ) -> str:
         """Generate a description for an image using a large language model.
 
         Parameters
         ----------
         image_data : str
             The base64-encoded string representation of the image.
+        media_type : ImageMediaType
+            The media type of the image, such as "image/jpeg" or "image/png".
+        model : str | None
+            The model generating the description, or None for the default model of the service.
 
         Returns
         -------
@@ -34,17 +139,48 @@ class LLMService(ABC):
         """
 
     @abstractmethod
-    async def stream_nutritional_feedback(self, img_description: str) -> StreamingResponse:
-        """Stream nutritional feedback based on a user prompt using a large language model.
+    def iter_nutritional_feedback(self, img_description: str, model: str | None = None) -> AsyncIterator[str]:
+        """Generate nutritional feedback as a stream of text chunks.
 
         Parameters
         ----------
         img_description : str
-            The user's input prompt, typically related to nutritional information or queries.
+            The description of the food to analyse.
+        model : str | None
+            The model generating the feedback, or None for the default model of the service.
 
         Returns
         -------
-        StreamingResponse
-            A streaming response containing the LLM-generated feedback in real-time.
+        AsyncIterator[str]
+            The chunks of the LLM-generated feedback, as soon as they are produced.
 
         """
+
+    @abstractmethod
+    def iter_fused_analysis(
+        self, image_data: str, media_type: ImageMediaType = "image/jpeg", model: str | None = None
+    ) -> AsyncIterator[str]:
+        """Describe an image and generate nutritional feedback in a single streamed call.
+
+        Unlike chaining `get_image_description` and `iter_nutritional_feedback`, the first
+        chunks are produced without waiting for a complete description.
+
+        Parameters
+        ----------
+        image_data : str
+            The base64-encoded string representation of the image.
+        media_type : ImageMediaType
+            The media type of the image, such as "image/jpeg" or "image/png".
+        model : str | None
+            The model generating the analysis, or None for the default model of the service.
+
+        Returns
+        -------
+        AsyncIterator[str]
+            The chunks of the combined description and feedback, as soon as they are produced.
+
+        """
+
+    @abstractmethod
+    async def aclose(self) -> None:
+        """Release any resources held by the service."""
@@ -1,9 +1,11 @@
 """DietLogApp API entry point.
 
 This module initializes and configures the FastAPI application for the DietLogApp.
-It sets up environment variables, API routes, and static file serving.
+It sets up environment variables, the application lifespan, API routes, and static file serving.
 """
 
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -11,14 +13,18 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
-from .api.diet import diet_router
+from .api.diet import diet_router, run_job
+from .api.log import log_router
+from .api.metrics import metrics_router
+from .config import Settings
+from .providers.registry import ServiceRegistry
 
 
 class DietLogApp:
     """Main application class for DietLogApp.
 
     This class handles the initialization and configuration of the FastAPI application,
-    including environment setup, route configuration, and static file serving.
+    including environment setup, lifespan management, route configuration, and static file serving.
 
     Attributes
     ----------
@@ -45,13 +51,44 @@ class DietLogApp:
         """
         _ = load_dotenv()
 
+    @asynccontextmanager
+    async def _lifespan(self, app: FastAPI) -> AsyncIterator[None]:
+        """Manage long-lived resources for the lifetime of the application.
+
+        Builds the `ServiceRegistry` from the current settings on startup, with background
+        jobs run by the `/diet/process` pipeline, exposes it through `app.state.registry`,
+        and closes every registered service on shutdown.
+
+        Parameters
+        ----------
+        app : FastAPI
+            The FastAPI application instance being started.
+
+        """
+        registry = ServiceRegistry(Settings(), job_handler=run_job)
+        try:
+            await registry.startup()
+            app.state.registry = registry
+            yield
+        finally:
+            await registry.shutdown()
+
+    def _setup_lifespan(self) -> None:
+        """Configure the application lifespan.
+
+        Registers `_lifespan` as the lifespan handler of the FastAPI application.
+        """
+        self.app.router.lifespan_context = self._lifespan
+
     def _setup_routes(self) -> None:
         """Configure API routes.
 
         Registers all API routers with the FastAPI application.
-        Currently includes the diet-related routes.
+        Currently includes the diet-related routes, the diet log and the metrics endpoint.
         """
         self.app.include_router(diet_router)
+        self.app.include_router(log_router)
+        self.app.include_router(metrics_router)
 
     def _setup_static_files(self) -> None:
         """Configure static file serving.
@@ -67,6 +104,7 @@ class DietLogApp:
 
         Performs all necessary setup steps including:
         - Loading environment variables
+        - Setting up the application lifespan
         - Setting up API routes
         - Configuring static file serving
 
@@ -77,6 +115,7 @@ class DietLogApp:
 
         """
         self._load_env()
+        self._setup_lifespan()
         self._setup_routes()
         self._setup_static_files()
 
@@ -84,7 +123,7 @@ class DietLogApp:
             CORSMiddleware,
             allow_origins=["*"],
             allow_credentials=True,
-            allow_methods=["POST", "OPTIONS"],
+            allow_methods=["GET", "POST", "OPTIONS"],
             allow_headers=["*"],
         )
 
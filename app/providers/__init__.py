@@ -2,5 +2,6 @@
 
 This package contains factory classes that provide instances of various services,
 including image processing and LLM services. The providers handle the creation
-and configuration of service instances based on the application's needs.
+and configuration of service instances based on the application's settings, and the
+service registry keeps those instances alive for the lifetime of the application.
 """
@@ -0,0 +1,131 @@
+"""Cache provider module.
+
+This module provides a factory class for creating the pipeline caches. It selects the
+cache backend, such as MemoryCache, SQLiteCache or SharedCache, based on the application
+settings.
+"""
+
+from pathlib import Path
+
+from app.config import Settings
+from app.integration.cache import MemoryCache, SharedCache, SQLiteCache
+from app.interfaces.cache import CacheBackend
+from app.services.description_cache import DescriptionCache
+from app.services.feedback_cache import FeedbackCache
+
+
+class CacheProvider:
+    """Factory class for providing cache instances.
+
+    Attributes
+    ----------
+    settings : Settings
+        The application settings used to select and configure the backends.
+
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        """Initialize the CacheProvider with the application settings.
+
+        Parameters
+        ----------
+        settings : Settings
+            The application settings used to select and configure the backends.
+
+        """
+        self.settings: Settings = settings
+
+    def description_cache(self) -> DescriptionCache | None:
+        """Create and return the configured description cache.
+
+        Returns
+        -------
+        DescriptionCache | None
+            The description cache, or None when caching is disabled.
+
+        Raises
+        ------
+        ValueError
+            If the configured backend name is unknown.
+
+        """
+        settings = self.settings
+        backend = self._backend(
+            settings.description_cache,
+            settings.description_cache_path,
+            "descriptions",
+            settings.description_cache_ttl,
+            settings.description_cache_max_entries,
+            settings.description_cache_max_bytes,
+        )
+        return DescriptionCache(backend) if backend is not None else None
+
+    def feedback_cache(self) -> FeedbackCache | None:
+        """Create and return the configured feedback cache.
+
+        Returns
+        -------
+        FeedbackCache | None
+            The feedback cache, or None when caching is disabled.
+
+        Raises
+        ------
+        ValueError
+            If the configured backend name is unknown.
+
+        """
+        settings = self.settings
+        backend = self._backend(
+            settings.feedback_cache,
+            settings.feedback_cache_path,
+            "feedback",
+            settings.feedback_cache_ttl,
+            settings.feedback_cache_max_entries,
+            settings.feedback_cache_max_bytes,
+        )
+        return FeedbackCache(backend, paced=settings.feedback_cache_paced) if backend is not None else None
+
+    @staticmethod
+    def _backend(  # noqa: PLR0913, PLR0917 - mirrors the per-cache settings
+        kind: str, path: str, table: str, ttl: float, max_entries: int, max_bytes: int
+    ) -> CacheBackend | None:
+        """Create a cache backend.
+
+        Parameters
+        ----------
+        kind : str
+            The backend name: "memory", "sqlite", "shared" or "none".
+        path : str
+            The SQLite database file used by the "sqlite" and "shared" backends.
+        table : str
+            The SQLite table used by the "sqlite" and "shared" backends.
+        ttl : float
+            The number of seconds an entry stays valid, or 0 for no expiry.
+        max_entries : int
+            The maximum number of entries.
+        max_bytes : int
+            The maximum total size of the entries in bytes.
+
+        Returns
+        -------
+        CacheBackend | None
+            The backend, or None when the cache is disabled.
+
+        Raises
+        ------
+        ValueError
+            If the backend name is unknown.
+
+        """
+        match kind:
+            case "none":
+                return None
+            case "memory":
+                return MemoryCache(max_entries, max_bytes, ttl or None)
+            case "sqlite":
+                return SQLiteCache(Path(path), table, max_entries, max_bytes, ttl or None)
+            case "shared":
+                return SharedCache(Path(path), table, max_entries, max_bytes, ttl or None)
+            case _:
+                msg = f"Unknown cache backend: {kind!r}. Available backends: none, memory, sqlite, shared"
+                raise ValueError(msg)
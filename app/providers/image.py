@@ -1,27 +1,96 @@
 """Image provider module.
 
 This module provides a factory class for creating instances of image services.
-It abstracts the creation of specific image service implementations, such as HTTPXService.
+It abstracts the creation of specific image service implementations, such as AsyncHTTPXService,
+and selects one of them based on the application settings.
 """
 
-from app.integration.httpx import HTTPXService
-from app.interfaces.image import ImageService
+from collections.abc import Callable
+from pathlib import Path
+from typing import ClassVar
+
+from app.config import Settings
+from app.integration.cache import SharedCache
+from app.integration.http_cache import HTTPCache
+from app.integration.httpx import AsyncHTTPXService
+from app.interfaces.image import AsyncImageService
+
+
+def _httpx(settings: Settings) -> AsyncImageService:
+    """Create an AsyncHTTPXService configured from the settings.
+
+    Parameters
+    ----------
+    settings : Settings
+        The application settings.
+
+    Returns
+    -------
+    AsyncImageService
+        The HTTPX image service, with a download cache unless it is disabled.
+
+    """
+    cache = None
+    if settings.fetch_cache_max_bytes > 0:
+        shared = None
+        if settings.fetch_cache_shared_max_bytes > 0:
+            shared = SharedCache(
+                Path(settings.fetch_cache_shared_path),
+                "images",
+                settings.fetch_cache_shared_max_entries,
+                settings.fetch_cache_shared_max_bytes,
+            )
+        cache = HTTPCache(settings.fetch_cache_max_bytes, settings.fetch_cache_negative_ttl, shared)
+    return AsyncHTTPXService(cache=cache)
 
 
 class ImageProvider:
     """Factory class for providing image service instances.
 
     This class is responsible for creating and returning instances of image services,
-    such as HTTPXService, which implement the `ImageService` interface.
+    such as AsyncHTTPXService, which implement the `AsyncImageService` interface.
+
+    Attributes
+    ----------
+    implementations : dict[str, Callable[[Settings], AsyncImageService]]
+        The factories of the available image service implementations, keyed by their configuration name.
+    settings : Settings
+        The application settings used to select the implementation.
+
     """
 
-    def img(self) -> ImageService:
-        """Create and return an instance of an image service.
+    implementations: ClassVar[dict[str, Callable[[Settings], AsyncImageService]]] = {
+        "httpx": _httpx,
+    }
+
+    def __init__(self, settings: Settings) -> None:
+        """Initialize the ImageProvider with the application settings.
+
+        Parameters
+        ----------
+        settings : Settings
+            The application settings used to select the implementation.
+
+        """
+        self.settings: Settings = settings
+
+    def img(self) -> AsyncImageService:
+        """Create and return an instance of the configured image service.
 
         Returns
         -------
-        ImageService
-            An instance of an image service, specifically HTTPXService.
+        AsyncImageService
+            An instance of the image service selected by `Settings.image_provider`.
+
+        Raises
+        ------
+        ValueError
+            If the configured provider name is unknown.
 
         """
-        return HTTPXService()
+        name = self.settings.image_provider
+        if name not in self.implementations:
+            msg = f"Unknown image provider: {name!r}. Available providers: {', '.join(self.implementations)}"
+            raise ValueError(msg)
+
+        return self.implementations[name](self.settings)
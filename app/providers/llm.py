@@ -1,11 +1,17 @@
 """LLM (Large Language Model) provider module.
 
 This module provides a factory class for creating instances of LLM services.
-It abstracts the creation of specific LLM service implementations, such as AnthropicService.
+It abstracts the creation of specific LLM service implementations, such as AnthropicService,
+and selects one of them based on the application settings.
 """
 
+from collections.abc import Callable
+from typing import ClassVar
+
+from app.config import Settings
 from app.integration.anthropic import AnthropicService
 from app.interfaces.llm import LLMService
+from app.services.scheduler import LLMScheduler
 
 
 class LLMProvider:
@@ -13,15 +19,73 @@ class LLMProvider:
 
     This class is responsible for creating and returning instances of LLM services,
     such as AnthropicService, which implement the `LLMService` interface.
+
+    Attributes
+    ----------
+    implementations : dict[str, Callable[[LLMScheduler | None, float, str], LLMService]]
+        The available LLM service implementations, keyed by their configuration name. Each
+        one accepts the scheduler admitting its calls, the timeout of a call in seconds and
+        the model used by calls that do not select one.
+    settings : Settings
+        The application settings used to select the implementation.
+
     """
 
-    def llm(self) -> LLMService:
-        """Create and return an instance of an LLM service.
+    implementations: ClassVar[dict[str, Callable[[LLMScheduler | None, float, str], LLMService]]] = {
+        "anthropic": AnthropicService,
+    }
+
+    def __init__(self, settings: Settings) -> None:
+        """Initialize the LLMProvider with the application settings.
+
+        Parameters
+        ----------
+        settings : Settings
+            The application settings used to select the implementation.
+
+        """
+        self.settings: Settings = settings
+
+    def scheduler(self) -> LLMScheduler:
+        """Create the scheduler admitting the calls of the LLM service.
+
+        Returns
+        -------
+        LLMScheduler
+            A scheduler configured by the `llm_*` settings.
+
+        """
+        settings = self.settings
+        return LLMScheduler(
+            max_concurrency=settings.llm_max_concurrency,
+            requests_per_minute=settings.llm_requests_per_minute,
+            tokens_per_minute=settings.llm_tokens_per_minute,
+            max_queue=settings.llm_queue_size,
+            max_wait=settings.llm_queue_timeout,
+        )
+
+    def llm(self, scheduler: LLMScheduler | None = None) -> LLMService:
+        """Create and return an instance of the configured LLM service.
+
+        Parameters
+        ----------
+        scheduler : LLMScheduler | None
+            The scheduler admitting the calls of the service, or None for no admission control.
 
         Returns
         -------
         LLMService
-            An instance of an LLM service, specifically AnthropicService.
+            An instance of the LLM service selected by `Settings.llm_provider`.
+
+        Raises
+        ------
+        ValueError
+            If the configured provider name is unknown.
 
         """
-        return AnthropicService()
+        name = self.settings.llm_provider
+        if name not in self.implementations:
+            msg = f"Unknown LLM provider: {name!r}. Available providers: {', '.join(self.implementations)}"
+            raise ValueError(msg)
+
+        return self.implementations[name](scheduler, self.settings.llm_timeout, self.settings.llm_model)
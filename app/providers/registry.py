@@ -0,0 +1,247 @@
+"""Service registry module.
+
+This module provides the `ServiceRegistry` class, which owns the process-wide service
+instances. Services are created once when the application starts, shared by every
+request, and closed when the application shuts down.
+"""
+
+from contextlib import AsyncExitStack
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from app.config import Settings
+from app.integration.diet_log import SQLiteDietLogStore
+from app.integration.jobs import SQLiteJobStore
+from app.interfaces.diet_log import DietLogStore
+from app.interfaces.image import AsyncImageService
+from app.interfaces.llm import LLMService
+from app.providers.cache import CacheProvider
+from app.providers.image import ImageProvider
+from app.providers.llm import LLMProvider
+from app.services.budget import ByteBudget
+from app.services.jobs import JobRunner
+from app.services.metrics import PipelineMetrics
+from app.services.near_duplicates import NearDuplicateIndex
+from app.services.pipeline import DietPipeline
+from app.services.preprocessing import ImagePreprocessor
+from app.services.routing import ModelRouter
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Callable
+
+    from app.interfaces.events import ServerSentEvent
+    from app.interfaces.jobs import Job
+    from app.services.description_cache import DescriptionCache
+    from app.services.feedback_cache import FeedbackCache
+    from app.services.scheduler import LLMScheduler
+
+
+class ServiceRegistry:
+    """Registry holding the long-lived service instances of the application.
+
+    Attributes
+    ----------
+    settings : Settings
+        The application settings used to build the services.
+    scheduler : LLMScheduler | None
+        The scheduler admitting every LLM call.
+    metrics : PipelineMetrics
+        The latency and size instruments of the pipeline, kept across restarts of the registry.
+    description_cache : DescriptionCache | None
+        The shared image description cache, or None when caching is disabled.
+    feedback_cache : FeedbackCache | None
+        The shared feedback stream cache, or None when caching is disabled.
+    job_handler : Callable[[DietPipeline, Job], AsyncIterator[ServerSentEvent]] | None
+        The function running a background job with the pipeline, or None to disable jobs.
+
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        job_handler: "Callable[[DietPipeline, Job], AsyncIterator[ServerSentEvent]] | None" = None,
+    ) -> None:
+        """Initialize an empty registry.
+
+        Parameters
+        ----------
+        settings : Settings
+            The application settings used to build the services.
+        job_handler : Callable[[DietPipeline, Job], AsyncIterator[ServerSentEvent]] | None
+            The function running a background job with the pipeline, or None to disable jobs.
+
+        """
+        self.settings: Settings = settings
+        self.job_handler: Callable[[DietPipeline, Job], AsyncIterator[ServerSentEvent]] | None = job_handler
+        self.scheduler: LLMScheduler | None = None
+        self.metrics: PipelineMetrics = PipelineMetrics()
+        self._llm: LLMService | None = None
+        self._img: AsyncImageService | None = None
+        self.description_cache: DescriptionCache | None = None
+        self.feedback_cache: FeedbackCache | None = None
+        self._pipeline: DietPipeline | None = None
+        self._jobs: JobRunner | None = None
+        self._diet_log: DietLogStore | None = None
+        self._resources: AsyncExitStack = AsyncExitStack()
+
+    @property
+    def llm(self) -> LLMService:
+        """The shared LLM service.
+
+        Raises
+        ------
+        RuntimeError
+            If the registry has not been started.
+
+        """
+        if self._llm is None:
+            msg = "Service registry has not been started"
+            raise RuntimeError(msg)
+        return self._llm
+
+    @property
+    def img(self) -> AsyncImageService:
+        """The shared image service.
+
+        Raises
+        ------
+        RuntimeError
+            If the registry has not been started.
+
+        """
+        if self._img is None:
+            msg = "Service registry has not been started"
+            raise RuntimeError(msg)
+        return self._img
+
+    @property
+    def pipeline(self) -> DietPipeline:
+        """The shared diet analysis pipeline.
+
+        Raises
+        ------
+        RuntimeError
+            If the registry has not been started.
+
+        """
+        if self._pipeline is None:
+            msg = "Service registry has not been started"
+            raise RuntimeError(msg)
+        return self._pipeline
+
+    @property
+    def jobs(self) -> JobRunner:
+        """The runner of background analysis jobs.
+
+        Raises
+        ------
+        RuntimeError
+            If the registry has not been started, or was created without a job handler.
+
+        """
+        if self._jobs is None:
+            msg = "Background jobs are not running"
+            raise RuntimeError(msg)
+        return self._jobs
+
+    @property
+    def diet_log(self) -> DietLogStore:
+        """The persistent log of the analysed meals of every user.
+
+        Raises
+        ------
+        RuntimeError
+            If the registry has not been started.
+
+        """
+        if self._diet_log is None:
+            msg = "Service registry has not been started"
+            raise RuntimeError(msg)
+        return self._diet_log
+
+    async def startup(self) -> None:
+        """Create the configured services.
+
+        Every service is registered for closing as soon as it is created, so a failure
+        halfway through startup still releases the services created before it.
+        """
+        cache_provider = CacheProvider(self.settings)
+        resources = self._resources
+
+        llm_provider = LLMProvider(self.settings)
+        self.scheduler = llm_provider.scheduler()
+        self._llm = llm_provider.llm(self.scheduler)
+        resources.push_async_callback(self._llm.aclose)
+        self._img = ImageProvider(self.settings).img()
+        resources.push_async_callback(self._img.aclose)
+
+        self.description_cache = cache_provider.description_cache()
+        if self.description_cache is not None:
+            resources.push_async_callback(self.description_cache.aclose)
+        self.feedback_cache = cache_provider.feedback_cache()
+        if self.feedback_cache is not None:
+            resources.push_async_callback(self.feedback_cache.aclose)
+
+        settings = self.settings
+        preprocessor = ImagePreprocessor(
+            settings.image_max_edge, settings.image_format, settings.image_quality, settings.image_workers
+        )
+        resources.push_async_callback(preprocessor.aclose)
+
+        self._pipeline = DietPipeline(
+            self._img,
+            self._llm,
+            preprocessor=preprocessor,
+            description_cache=self.description_cache,
+            feedback_cache=self.feedback_cache,
+            default_mode=settings.pipeline_mode,
+            metrics=self.metrics,
+            budget=ByteBudget(settings.inflight_image_bytes),
+            router=ModelRouter(
+                {"fast": settings.llm_fast_model, "quality": settings.llm_model},
+                {
+                    "description": settings.llm_description_tier,
+                    "feedback": settings.llm_feedback_tier,
+                    "fused": settings.llm_fused_tier,
+                },
+                fast_max_image_bytes=settings.llm_fast_max_image_bytes,
+                metrics=self.metrics,
+                retries=settings.llm_retries,
+                hedge_quantile=settings.llm_hedge_quantile,
+            ),
+            near_duplicates=(
+                NearDuplicateIndex(settings.near_duplicate_distance, settings.near_duplicate_max_entries)
+                if settings.near_duplicate_max_entries > 0
+                else None
+            ),
+        )
+
+        self._diet_log = SQLiteDietLogStore(Path(settings.diet_log_path))
+        resources.push_async_callback(self._diet_log.aclose)
+
+        if self.job_handler is not None:
+            store = SQLiteJobStore(Path(settings.job_store_path))
+            resources.push_async_callback(store.aclose)
+            jobs = JobRunner(
+                store,
+                partial(self.job_handler, self._pipeline),
+                workers=settings.job_workers,
+                max_pending=settings.job_queue_size,
+                ttl=settings.job_ttl,
+            )
+            await jobs.start()
+            resources.push_async_callback(jobs.aclose)
+            self._jobs = jobs
+
+    async def shutdown(self) -> None:
+        """Close every service created by `startup`, in reverse order of creation."""
+        self._jobs = None
+        self._diet_log = None
+        self._pipeline = None
+        self._llm = None
+        self.scheduler = None
+        self._img = None
+        self.description_cache = None
+        self.feedback_cache = None
+        await self._resources.aclose()
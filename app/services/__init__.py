@@ -0,0 +1,6 @@
+"""Service layer package for DietLogApp.
+
+This package contains application-level services that sit between the API routes and
+the integrations, such as the diet analysis pipeline, caching of expensive pipeline
+results, and coalescing of concurrent identical requests.
+"""
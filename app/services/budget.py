@@ -0,0 +1,167 @@
+"""Memory budget for images held by requests.
+
+This module provides the `ByteBudget` class, which bounds the total size of the raw images
+held in memory by in-flight requests. A request reserves the maximum image size before
+loading its image, shrinks the reservation to the real size once the image is loaded, and
+releases it as soon as the raw image is no longer needed. Requests whose reservation would
+exceed the budget wait, in arrival order, until enough bytes are released, so a burst of
+large uploads queues instead of driving the process out of memory.
+"""
+
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+
+class Reservation:
+    """A number of bytes held against a `ByteBudget`.
+
+    Attributes
+    ----------
+    size : int
+        The number of bytes currently held, 0 once released.
+
+    """
+
+    def __init__(self, budget: "ByteBudget", size: int) -> None:
+        """Initialize a granted reservation.
+
+        Parameters
+        ----------
+        budget : ByteBudget
+            The budget the bytes are held against.
+        size : int
+            The number of bytes held.
+
+        """
+        self.size: int = size
+        self._budget: ByteBudget = budget
+
+    def shrink(self, size: int) -> None:
+        """Reduce the reservation, returning the difference to the budget.
+
+        Parameters
+        ----------
+        size : int
+            The new size of the reservation. Sizes above the current one are ignored.
+
+        """
+        if size < self.size:
+            self._budget.release(self.size - size)
+            self.size = size
+
+    def release(self) -> None:
+        """Return every byte of the reservation to the budget. Releasing twice is a no-op."""
+        self.shrink(0)
+
+
+class ByteBudget:
+    """A pool of bytes shared by the requests, granted in arrival order.
+
+    Attributes
+    ----------
+    max_bytes : int
+        The total number of bytes that can be reserved at the same time.
+    in_use : int
+        The number of bytes currently reserved.
+
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        """Initialize an empty budget.
+
+        Parameters
+        ----------
+        max_bytes : int
+            The total number of bytes that can be reserved at the same time.
+
+        """
+        self.max_bytes: int = max_bytes
+        self.in_use: int = 0
+        self._waiters: deque[tuple[int, asyncio.Future[None]]] = deque()
+
+    @property
+    def waiting(self) -> int:
+        """The number of reservations waiting for bytes to be released."""
+        return len(self._waiters)
+
+    async def acquire(self, size: int) -> Reservation:
+        """Reserve bytes, waiting until they are available.
+
+        Sizes above `max_bytes` are capped to it, so a single large reservation waits for an
+        idle budget instead of waiting forever.
+
+        Parameters
+        ----------
+        size : int
+            The number of bytes to reserve.
+
+        Returns
+        -------
+        Reservation
+            The granted reservation, to be released once the bytes are no longer held.
+
+        """
+        size = min(size, self.max_bytes)
+        if not self._waiters and self.in_use + size <= self.max_bytes:
+            self.in_use += size
+            return Reservation(self, size)
+
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (size, waiter)
+        self._waiters.append(entry)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The bytes were granted just before the cancellation.
+                self.release(size)
+            else:
+                self._waiters.remove(entry)
+                self._wake()
+            raise
+        return Reservation(self, size)
+
+    @asynccontextmanager
+    async def reserve(self, size: int) -> AsyncIterator[Reservation]:
+        """Hold a reservation for the duration of a block.
+
+        Parameters
+        ----------
+        size : int
+            The number of bytes to reserve.
+
+        Yields
+        ------
+        Reservation
+            The granted reservation, which may be shrunk or released early.
+
+        """
+        reservation = await self.acquire(size)
+        try:
+            yield reservation
+        finally:
+            reservation.release()
+
+    def release(self, size: int) -> None:
+        """Return bytes to the budget and grant the waiting reservations that now fit.
+
+        Parameters
+        ----------
+        size : int
+            The number of bytes returned.
+
+        """
+        self.in_use -= size
+        self._wake()
+
+    def _wake(self) -> None:
+        """Grant the waiting reservations in order, stopping at the first one that does not fit."""
+        while self._waiters:
+            size, waiter = self._waiters[0]
+            if self.in_use + size > self.max_bytes:
+                return
+            _ = self._waiters.popleft()
+            self.in_use += size
+            waiter.set_result(None)
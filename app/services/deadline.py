@@ -0,0 +1,200 @@
+"""End-to-end deadlines of requests.
+
+This module provides the `Deadline` class, the time budget of one request. The budget is
+split across the stages the client waits for before the first byte of feedback: loading
+the image, describing it and waiting for the first token. Each stage may use a share of
+the budget still remaining when it starts, so a fast stage leaves more time to the next
+ones, and a stage overrunning its share fails with `DeadlineExceededError` instead of
+holding a worker while the client has given up. Once the first token is received, the
+stream is no longer bounded, since the client is receiving data.
+
+The deadline of the running request is also available through `current_deadline`, so the
+LLM layer can bound its calls and only retry when the remaining budget allows it. Work
+shared by concurrent requests runs under its own deadline, created by `shared` and
+extended by `extend` as requests join, rather than under the deadline of whichever request
+started it.
+"""
+
+import asyncio
+import math
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+from app.exceptions.deadline import DeadlineExceededError
+
+STAGE_SHARES: dict[str, float] = {
+    "fetch": 1 / 3,
+    "upload": 1 / 3,
+    "prepare": 1 / 2,
+    "description": 1 / 2,
+    "first_token": 1.0,
+}
+"""The share of the remaining budget every stage may use when it starts."""
+
+_current: ContextVar["Deadline | None"] = ContextVar("deadline", default=None)
+
+
+def current_deadline() -> "Deadline | None":
+    """Return the deadline of the running request.
+
+    Returns
+    -------
+    Deadline | None
+        The deadline activated by the request, or None outside of requests with a deadline.
+
+    """
+    return _current.get()
+
+
+class Deadline:
+    """The time budget of one request.
+
+    Attributes
+    ----------
+    budget : float | None
+        The total budget in seconds, or None for no deadline.
+    expires_at : float
+        The `time.monotonic` time at which the budget is exhausted, or infinity.
+
+    """
+
+    def __init__(self, budget: float | None) -> None:
+        """Start the budget of a request.
+
+        Parameters
+        ----------
+        budget : float | None
+            The total budget in seconds, or None for no deadline.
+
+        """
+        self.budget: float | None = budget
+        self.expires_at: float = time.monotonic() + budget if budget is not None else math.inf
+
+    def remaining(self) -> float:
+        """Return the time left before the deadline.
+
+        Returns
+        -------
+        float
+            The remaining budget in seconds, never negative, or infinity without deadline.
+
+        """
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def timeout(self, stage: str) -> float | None:
+        """Return the time a stage may use.
+
+        Parameters
+        ----------
+        stage : str
+            The name of the stage, a key of `STAGE_SHARES`.
+
+        Returns
+        -------
+        float | None
+            The share of the remaining budget allotted to the stage, or None without deadline.
+
+        """
+        if self.budget is None:
+            return None
+        return self.remaining() * STAGE_SHARES[stage]
+
+    @classmethod
+    def shared(cls, first: "Deadline | None") -> "Deadline":
+        """Create the deadline of work shared by concurrent requests.
+
+        Parameters
+        ----------
+        first : Deadline | None
+            The deadline of the request starting the work, or None if it has none.
+
+        Returns
+        -------
+        Deadline
+            A deadline expiring with `first`, to be extended by the requests joining the work.
+
+        """
+        deadline = cls(None)
+        if first is not None and first.budget is not None:
+            deadline.budget = first.budget
+            deadline.expires_at = first.expires_at
+        return deadline
+
+    def extend(self, other: "Deadline | None") -> None:
+        """Push the expiry back to the deadline of another request waiting for the same work.
+
+        Parameters
+        ----------
+        other : Deadline | None
+            The deadline of the other request. A request without deadline lifts this one.
+
+        """
+        if other is None or other.budget is None:
+            self.budget = None
+            self.expires_at = math.inf
+        elif other.expires_at > self.expires_at:
+            self.budget = other.budget
+            self.expires_at = other.expires_at
+
+    def activate(self) -> None:
+        """Make this deadline the deadline of the running request and of the tasks it starts."""
+        _ = _current.set(self)
+
+    @asynccontextmanager
+    async def stage(self, name: str) -> AsyncIterator[None]:
+        """Bound a stage by its share of the remaining budget.
+
+        Parameters
+        ----------
+        name : str
+            The name of the stage, a key of `STAGE_SHARES`.
+
+        Yields
+        ------
+        None
+            Control while the stage runs.
+
+        Raises
+        ------
+        DeadlineExceededError
+            If the stage does not complete within its share of the budget.
+
+        """
+        timeout = asyncio.timeout(self.timeout(name))
+        try:
+            async with timeout:
+                yield
+        except TimeoutError as e:
+            if not timeout.expired():
+                raise
+            raise DeadlineExceededError(name, self.budget or 0.0) from e
+
+    async def first(self, source: AsyncIterator[str]) -> AsyncIterator[str]:
+        """Pass a stream through, bounding the wait for its first chunk.
+
+        Parameters
+        ----------
+        source : AsyncIterator[str]
+            The stream.
+
+        Yields
+        ------
+        str
+            The chunks of the stream.
+
+        Raises
+        ------
+        DeadlineExceededError
+            If the first chunk is not received within the "first_token" share of the budget.
+
+        """
+        async with self.stage("first_token"):
+            try:
+                first = await anext(source)
+            except StopAsyncIteration:
+                return
+        yield first
+        async for chunk in source:
+            yield chunk
@@ -0,0 +1,112 @@
+"""Content-addressed cache for image descriptions.
+
+This module provides the `DescriptionCache` class, which stores image descriptions keyed
+by a hash of the image bytes together with the fingerprint of the LLM configuration that
+produced them, so that resubmitting the same photo skips the vision call entirely. Keys
+can also be looked up directly, such as the key of a near-duplicate image.
+"""
+
+import hashlib
+
+from app.interfaces.cache import CacheBackend, CacheStats
+
+
+class DescriptionCache:
+    """Cache of image descriptions addressed by image content.
+
+    Attributes
+    ----------
+    backend : CacheBackend
+        The backend storing the cached descriptions.
+
+    """
+
+    def __init__(self, backend: CacheBackend) -> None:
+        """Initialize the DescriptionCache with a storage backend.
+
+        Parameters
+        ----------
+        backend : CacheBackend
+            The backend storing the cached descriptions.
+
+        """
+        self.backend: CacheBackend = backend
+
+    @property
+    def stats(self) -> CacheStats:
+        """The hit, miss and eviction counters of the backend."""
+        return self.backend.stats
+
+    @staticmethod
+    def key(content: memoryview, fingerprint: str) -> str:
+        """Build the cache key for an image.
+
+        Parameters
+        ----------
+        content : memoryview
+            The raw image content.
+        fingerprint : str
+            The fingerprint of the model and prompt used to describe the image.
+
+        Returns
+        -------
+        str
+            A key that changes whenever the image, the model or the prompt changes.
+
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        return f"description:{fingerprint}:{digest}"
+
+    async def get(self, content: memoryview, fingerprint: str) -> str | None:
+        """Return the cached description of an image.
+
+        Parameters
+        ----------
+        content : memoryview
+            The raw image content.
+        fingerprint : str
+            The fingerprint of the model and prompt used to describe the image.
+
+        Returns
+        -------
+        str | None
+            The cached description, or None on a cache miss.
+
+        """
+        return await self.load(self.key(content, fingerprint))
+
+    async def load(self, key: str) -> str | None:
+        """Return the cached description stored under a key built by `key`.
+
+        Parameters
+        ----------
+        key : str
+            The cache key of the image.
+
+        Returns
+        -------
+        str | None
+            The cached description, or None on a cache miss.
+
+        """
+        value = await self.backend.get(key)
+        return value.decode() if value is not None else None
+
+    async def set(self, content: memoryview, fingerprint: str, description: str) -> None:
+        """Store the description of an image.
+
+        Parameters
+        ----------
+        content : memoryview
+            The raw image content.
+        fingerprint : str
+            The fingerprint of the model and prompt used to describe the image.
+        description : str
+            The description to cache.
+
+        """
+        await self.backend.set(self.key(content, fingerprint), description.encode())
+
+    async def aclose(self) -> None:
+        """Close the underlying backend."""
+        await self.backend.aclose()
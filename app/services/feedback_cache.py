@@ -0,0 +1,141 @@
+"""Replayable cache for nutritional feedback streams.
+
+This module provides the `FeedbackCache` class, which stores completed feedback streams as
+lists of chunks keyed by a hash of the rendered feedback prompt. A cache hit is replayed
+chunk by chunk, optionally with the pacing of the original stream, so clients consume it
+exactly like a live stream.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from collections.abc import AsyncIterator
+
+from app.interfaces.cache import CacheBackend, CacheStats
+
+
+class FeedbackCache:
+    """Cache of completed feedback streams.
+
+    Attributes
+    ----------
+    backend : CacheBackend
+        The backend storing the cached streams.
+    paced : bool
+        Whether replays reproduce the delays between the chunks of the original stream.
+
+    """
+
+    def __init__(self, backend: CacheBackend, *, paced: bool = False) -> None:
+        """Initialize the FeedbackCache with a storage backend.
+
+        Parameters
+        ----------
+        backend : CacheBackend
+            The backend storing the cached streams.
+        paced : bool
+            Whether replays reproduce the delays between the chunks of the original stream.
+
+        """
+        self.backend: CacheBackend = backend
+        self.paced: bool = paced
+
+    @property
+    def stats(self) -> CacheStats:
+        """The hit, miss and eviction counters of the backend."""
+        return self.backend.stats
+
+    @staticmethod
+    def key(fingerprint: str) -> str:
+        """Build the cache key of a feedback stream.
+
+        Parameters
+        ----------
+        fingerprint : str
+            The rendered prompt and model identifying the feedback request.
+
+        Returns
+        -------
+        str
+            A key that changes whenever the prompt or the model changes.
+
+        """
+        digest = hashlib.sha256(fingerprint.encode()).hexdigest()
+        return f"feedback:{digest}"
+
+    async def get(self, fingerprint: str) -> AsyncIterator[str] | None:
+        """Return a replay of the cached stream for a feedback request.
+
+        Parameters
+        ----------
+        fingerprint : str
+            The rendered prompt and model identifying the feedback request.
+
+        Returns
+        -------
+        AsyncIterator[str] | None
+            The replayed chunks, or None on a cache miss.
+
+        """
+        value = await self.backend.get(self.key(fingerprint))
+        if value is None:
+            return None
+
+        chunks: list[tuple[float, str]] = [(offset, chunk) for offset, chunk in json.loads(value)]
+        return self._replay(chunks)
+
+    async def record(self, fingerprint: str, source: AsyncIterator[str]) -> AsyncIterator[str]:
+        """Pass a live stream through and cache it once it completes.
+
+        The stream is only stored when the source is exhausted normally, so streams that
+        fail or are cancelled before the end are never cached. Sources raise when their
+        response is truncated by its token limit, so truncated streams are never cached
+        either.
+
+        Parameters
+        ----------
+        fingerprint : str
+            The rendered prompt and model identifying the feedback request.
+        source : AsyncIterator[str]
+            The live feedback stream.
+
+        Yields
+        ------
+        str
+            The chunks of the live stream.
+
+        """
+        started = time.monotonic()
+        chunks: list[tuple[float, str]] = []
+        async for chunk in source:
+            chunks.append((time.monotonic() - started, chunk))
+            yield chunk
+
+        await self.backend.set(self.key(fingerprint), json.dumps(chunks).encode())
+
+    async def aclose(self) -> None:
+        """Close the underlying backend."""
+        await self.backend.aclose()
+
+    async def _replay(self, chunks: list[tuple[float, str]]) -> AsyncIterator[str]:
+        """Yield cached chunks, waiting between them when pacing is enabled.
+
+        Parameters
+        ----------
+        chunks : list[tuple[float, str]]
+            The cached chunks, with their offsets from the start of the original stream.
+
+        Yields
+        ------
+        str
+            The cached chunks.
+
+        """
+        started = time.monotonic()
+        for offset, chunk in chunks:
+            if self.paced:
+                delay = offset - (time.monotonic() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            yield chunk
@@ -0,0 +1,356 @@
+"""Background analysis jobs.
+
+This module provides the `JobRunner` class, which decouples analyses from the requests
+that start them. Submitted jobs wait in a bounded queue and are run by a fixed pool of
+worker tasks; their events are kept in memory while they run, so followers connected to
+the same process receive them live. They are also written to the `JobStore` in batches
+while the job runs, so followers connected to other worker processes poll them from there,
+and in full when the job completes, so clients that reconnect later replay the result
+instead of recomputing it. A follower can resume after the last event it received, whether
+the job is still running or already finished.
+
+Every runner leases the jobs submitted to it and renews the leases while it runs. Jobs
+whose lease expired, because the process running them stopped, are marked as failed by
+the runners still running, since the live part of their result was lost. Jobs leased by
+other processes are left alone.
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from collections.abc import AsyncIterator, Callable
+from typing import cast
+
+from app.exceptions.llm import LLMUnavailableError
+from app.interfaces.events import EventType, ServerSentEvent
+from app.interfaces.jobs import Job, JobStatus, JobStore
+
+type JobHandler = Callable[[Job], AsyncIterator[ServerSentEvent]]
+"""The function running a job, yielding the events of its result."""
+
+_RETRY_AFTER = 5.0
+"""The number of seconds clients are asked to wait when the job queue is full."""
+
+_LEASE = 30.0
+"""The number of seconds a job stays leased by its runner without renewal."""
+
+_RENEW_INTERVAL = 10.0
+"""The number of seconds between two renewals of the leases of a runner."""
+
+_FLUSH_INTERVAL = 0.5
+"""The minimum number of seconds between two writes of the events of a running job."""
+
+_POLL_INTERVAL = 0.5
+"""The number of seconds between two reads of a job running in another process."""
+
+_INTERRUPTED = ServerSentEvent(
+    "error", {"status_code": 503, "detail": "Service temporarily unavailable: the job was interrupted by a restart"}
+)
+
+
+class _LiveJob:
+    """The events of a running job, shared with its followers."""
+
+    def __init__(self) -> None:
+        """Initialize an empty result."""
+        self.events: list[ServerSentEvent] = []
+        self.done: bool = False
+        self._changed: asyncio.Event = asyncio.Event()
+
+    def append(self, event: ServerSentEvent) -> None:
+        """Add an event and wake the followers.
+
+        Parameters
+        ----------
+        event : ServerSentEvent
+            The next event of the result.
+
+        """
+        self.events.append(event)
+        self._notify()
+
+    def finish(self) -> None:
+        """Mark the result as complete and wake the followers."""
+        self.done = True
+        self._notify()
+
+    async def wait(self) -> None:
+        """Wait for the next event or the end of the result."""
+        await self._changed.wait()
+
+    def _notify(self) -> None:
+        """Wake the current waiters, and make later waiters wait for the next change."""
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+
+class JobRunner:
+    """A bounded queue of analysis jobs and the workers running them.
+
+    Attributes
+    ----------
+    store : JobStore
+        The store persisting the jobs and their results.
+    handler : JobHandler
+        The function running a job.
+    workers : int
+        The number of jobs run at the same time.
+    max_pending : int
+        The maximum number of jobs waiting for a worker.
+    ttl : float
+        The number of seconds finished jobs are kept.
+    owner : str
+        The identifier of the runner leasing its jobs in the store.
+
+    """
+
+    def __init__(self, store: JobStore, handler: JobHandler, *, workers: int, max_pending: int, ttl: float) -> None:
+        """Initialize the runner. Workers start with `start`.
+
+        Parameters
+        ----------
+        store : JobStore
+            The store persisting the jobs and their results.
+        handler : JobHandler
+            The function running a job.
+        workers : int
+            The number of jobs run at the same time.
+        max_pending : int
+            The maximum number of jobs waiting for a worker.
+        ttl : float
+            The number of seconds finished jobs are kept.
+
+        """
+        self.store: JobStore = store
+        self.handler: JobHandler = handler
+        self.workers: int = workers
+        self.max_pending: int = max_pending
+        self.ttl: float = ttl
+        self.owner: str = uuid.uuid4().hex
+        self._queue: asyncio.Queue[Job] = asyncio.Queue()
+        self._pending: int = 0
+        self._live: dict[str, _LiveJob] = {}
+        self._tasks: list[asyncio.Task[None]] = []
+
+    async def start(self) -> None:
+        """Fail the jobs of stopped processes, purge old jobs and start the workers."""
+        await self._expire()
+        _ = await self.store.purge(time.time() - self.ttl)
+        self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.ensure_future(self._keep_leases()))
+
+    async def submit(self, url: str, mode: str, output: str = "text", tier: str | None = None) -> Job:
+        """Queue a new job.
+
+        Parameters
+        ----------
+        url : str
+            The URL of the image to analyse.
+        mode : str
+            The pipeline mode used for the analysis.
+        output : str
+            The output format of the result events.
+        tier : str | None
+            The latency tier of the LLM calls, or None for the default tiers.
+
+        Returns
+        -------
+        Job
+            The queued job.
+
+        Raises
+        ------
+        LLMUnavailableError
+            If the queue is full.
+
+        """
+        if self._pending >= self.max_pending:
+            raise LLMUnavailableError(_RETRY_AFTER, "too many jobs waiting")
+
+        job = Job(uuid.uuid4().hex, url, mode, "queued", time.time(), output, tier)
+        self._pending += 1
+        try:
+            await self.store.create(job, self.owner, time.time() + _LEASE)
+        except BaseException:
+            self._pending -= 1
+            raise
+        self._live[job.id] = _LiveJob()
+        self._queue.put_nowait(job)
+        return job
+
+    async def get(self, job_id: str) -> Job | None:
+        """Return a job.
+
+        Parameters
+        ----------
+        job_id : str
+            The identifier of the job.
+
+        Returns
+        -------
+        Job | None
+            The job, or None if it is unknown or was purged.
+
+        """
+        return await self.store.get(job_id)
+
+    async def follow(self, job_id: str, after: int = 0) -> AsyncIterator[ServerSentEvent]:
+        """Stream the events of a job, live while it runs here and from the store otherwise.
+
+        Jobs run by other processes are polled from the store until they finish.
+
+        Parameters
+        ----------
+        job_id : str
+            The identifier of the job.
+        after : int
+            The id of the last event already received, 0 to start from the beginning.
+
+        Yields
+        ------
+        ServerSentEvent
+            The events following `after`, until the end of the result.
+
+        """
+        live = self._live.get(job_id)
+        if live is None:
+            index = after
+            while True:
+                # The state is read first: the events of a finished job are all stored with it.
+                job = await self.store.get(job_id)
+                for event, data in await self.store.events(job_id, index):
+                    index += 1
+                    yield ServerSentEvent(cast("EventType", event), json.loads(data))
+                if job is None or job.finished:
+                    return
+                await asyncio.sleep(_POLL_INTERVAL)
+
+        index = after
+        while True:
+            while index < len(live.events):
+                yield live.events[index]
+                index += 1
+            if live.done:
+                return
+            await live.wait()
+
+    async def aclose(self) -> None:
+        """Stop the workers and fail the jobs of this runner that did not complete."""
+        for task in self._tasks:
+            _ = task.cancel()
+        _ = await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.store.renew(self.owner, 0.0)
+        await self._expire()
+
+    async def _work(self) -> None:
+        """Run queued jobs one at a time, forever.
+
+        A job whose status or result cannot be stored is reported to the event loop's
+        exception handler, and the worker moves on to the next job.
+        """
+        while True:
+            job = await self._queue.get()
+            self._pending -= 1
+            try:
+                await self._run(job)
+            except Exception as e:  # noqa: BLE001 - one failing job must not stop the worker
+                asyncio.get_running_loop().call_exception_handler(
+                    {"message": f"Job {job.id} could not be stored", "exception": e}
+                )
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        """Run a job, then store its result and release its live events.
+
+        The job is marked as failed when it cannot be marked as running or when its result
+        cannot be stored, and its followers are released in any case.
+
+        Parameters
+        ----------
+        job : Job
+            The job to run.
+
+        """
+        live = self._live[job.id]
+        status: JobStatus = "succeeded"
+        try:
+            try:
+                await self.store.set_status(job.id, "running")
+                stored = 0
+                flushed_at = time.monotonic()
+                async for event in self.handler(job):
+                    live.append(event)
+                    if event.event == "error":
+                        status = "failed"
+                    if time.monotonic() - flushed_at >= _FLUSH_INTERVAL:
+                        await self.store.append(job.id, stored, [self._stored(e) for e in live.events[stored:]])
+                        stored = len(live.events)
+                        flushed_at = time.monotonic()
+            except Exception as e:  # noqa: BLE001 - the failure is recorded in the result
+                live.append(self._failure(e))
+                status = "failed"
+
+            try:
+                await self.store.complete(job.id, status, [self._stored(event) for event in live.events])
+            except Exception as e:  # noqa: BLE001 - a smaller result marking the failure may still be stored
+                failure = self._failure(e)
+                live.append(failure)
+                await self.store.complete(job.id, "failed", [self._stored(failure)])
+        finally:
+            live.finish()
+            del self._live[job.id]
+        _ = await self.store.purge(time.time() - self.ttl)
+
+    async def _expire(self) -> None:
+        """Fail the jobs whose lease expired, because the process running them stopped."""
+        for job in await self.store.expired(time.time()):
+            await self.store.complete(job.id, "failed", [self._stored(_INTERRUPTED)])
+
+    async def _keep_leases(self) -> None:
+        """Renew the leases of the jobs of this runner and fail expired jobs, forever."""
+        while True:
+            await asyncio.sleep(_RENEW_INTERVAL)
+            try:
+                await self.store.renew(self.owner, time.time() + _LEASE)
+                await self._expire()
+            except Exception as e:  # noqa: BLE001 - the leases are renewed again on the next round
+                asyncio.get_running_loop().call_exception_handler(
+                    {"message": "Job leases could not be renewed", "exception": e}
+                )
+
+    @staticmethod
+    def _failure(error: Exception) -> ServerSentEvent:
+        """Report an unexpected error of a job as an "error" event.
+
+        Parameters
+        ----------
+        error : Exception
+            The error that interrupted the job.
+
+        Returns
+        -------
+        ServerSentEvent
+            An "error" event with status code 500.
+
+        """
+        return ServerSentEvent("error", {"status_code": 500, "detail": f"Internal server error occurred: {error!s}"})
+
+    @staticmethod
+    def _stored(event: ServerSentEvent) -> tuple[str, str]:
+        """Serialize an event for the store.
+
+        Parameters
+        ----------
+        event : ServerSentEvent
+            The event.
+
+        Returns
+        -------
+        tuple[str, str]
+            The type of the event and its JSON payload.
+
+        """
+        return event.event, json.dumps(event.data)
@@ -0,0 +1,380 @@
+"""In-process metrics for the diet analysis pipeline.
+
+This module provides fixed-bucket `Histogram` and `Counter` instruments rendered in the
+Prometheus text exposition format, the `PipelineMetrics` collection recording the latency
+of every pipeline stage and the size of images and streams, and the `ServerTiming` helper
+building the `Server-Timing` header of a single response.
+
+Recording an observation is a bucket lookup and two additions on the event loop thread,
+with no locks and no allocation, so the instruments can stay enabled at full load.
+"""
+
+import bisect
+import time
+from collections.abc import AsyncIterator, Iterator, Mapping
+from contextlib import contextmanager
+
+LATENCY_BUCKETS: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+"""The upper bounds in seconds of the latency histogram buckets."""
+
+SIZE_BUCKETS: tuple[float, ...] = tuple(float(1024 * 4**power) for power in range(8))
+"""The upper bounds in bytes of the size histogram buckets, from 1 KiB to 16 MiB."""
+
+DISTANCE_BUCKETS: tuple[float, ...] = (0, 1, 2, 3, 4, 6, 8, 12, 16)
+"""The upper bounds in bits of the perceptual hash distance histogram buckets."""
+
+
+def _labels(name: str | None, value: str, extra: str = "") -> str:
+    """Format the label set of a sample.
+
+    Parameters
+    ----------
+    name : str | None
+        The label name, or None for an unlabelled instrument.
+    value : str
+        The label value.
+    extra : str
+        An additional, already formatted label such as `le="0.5"`.
+
+    Returns
+    -------
+    str
+        The label set in braces, or an empty string when there is no label.
+
+    """
+    parts = [f'{name}="{value}"'] if name is not None else []
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    """A histogram with fixed buckets and an optional label.
+
+    Attributes
+    ----------
+    name : str
+        The metric name.
+    description : str
+        The description of the metric, sent as its HELP line.
+    buckets : tuple[float, ...]
+        The upper bounds of the buckets, in increasing order.
+    label : str | None
+        The name of the label distinguishing series, or None for a single series.
+
+    """
+
+    def __init__(self, name: str, description: str, buckets: tuple[float, ...], label: str | None = None) -> None:
+        """Initialize an empty histogram.
+
+        Parameters
+        ----------
+        name : str
+            The metric name.
+        description : str
+            The description of the metric, sent as its HELP line.
+        buckets : tuple[float, ...]
+            The upper bounds of the buckets, in increasing order.
+        label : str | None
+            The name of the label distinguishing series, or None for a single series.
+
+        """
+        self.name: str = name
+        self.description: str = description
+        self.buckets: tuple[float, ...] = buckets
+        self.label: str | None = label
+        self._counts: dict[str, list[int]] = {}
+        self._sums: dict[str, float] = {}
+
+    def observe(self, value: float, label: str = "") -> None:
+        """Record an observation.
+
+        Parameters
+        ----------
+        value : float
+            The observed value.
+        label : str
+            The value of the label of the series.
+
+        """
+        counts = self._counts.get(label)
+        if counts is None:
+            counts = self._counts[label] = [0] * (len(self.buckets) + 1)
+            self._sums[label] = 0.0
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[label] += value
+
+    def render(self) -> list[str]:
+        """Render the histogram in the Prometheus text format.
+
+        Returns
+        -------
+        list[str]
+            The lines of the histogram, with cumulative bucket counts.
+
+        """
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for label, counts in self._counts.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts, strict=True):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.label, label, f'le="{bound}"')} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label, label)} {self._sums[label]}")
+            lines.append(f"{self.name}_count{_labels(self.label, label)} {cumulative}")
+        return lines
+
+
+class Counter:
+    """A monotonically increasing counter with an optional label.
+
+    Attributes
+    ----------
+    name : str
+        The metric name, ending with `_total`.
+    description : str
+        The description of the metric, sent as its HELP line.
+    label : str | None
+        The name of the label distinguishing series, or None for a single series.
+
+    """
+
+    def __init__(self, name: str, description: str, label: str | None = None) -> None:
+        """Initialize the counter.
+
+        Parameters
+        ----------
+        name : str
+            The metric name, ending with `_total`.
+        description : str
+            The description of the metric, sent as its HELP line.
+        label : str | None
+            The name of the label distinguishing series, or None for a single series.
+
+        """
+        self.name: str = name
+        self.description: str = description
+        self.label: str | None = label
+        self.values: dict[str, float] = {}
+
+    def inc(self, amount: float = 1, label: str = "") -> None:
+        """Increase the counter.
+
+        Parameters
+        ----------
+        amount : float
+            The increment.
+        label : str
+            The value of the label of the series.
+
+        """
+        self.values[label] = self.values.get(label, 0) + amount
+
+    @classmethod
+    def snapshot(cls, name: str, description: str, label: str, values: Mapping[str, float]) -> "Counter":
+        """Build a counter from values maintained elsewhere, for rendering.
+
+        Parameters
+        ----------
+        name : str
+            The metric name, ending with `_total`.
+        description : str
+            The description of the metric, sent as its HELP line.
+        label : str
+            The name of the label distinguishing series.
+        values : Mapping[str, float]
+            The current value of every series.
+
+        Returns
+        -------
+        Counter
+            A counter holding the given values.
+
+        """
+        counter = cls(name, description, label)
+        counter.values.update(values)
+        return counter
+
+    def render(self) -> list[str]:
+        """Render the counter in the Prometheus text format.
+
+        Returns
+        -------
+        list[str]
+            The lines of the counter.
+
+        """
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        lines.extend(f"{self.name}{_labels(self.label, label)} {value}" for label, value in self.values.items())
+        return lines
+
+
+class PipelineMetrics:
+    """Latency and size instruments of the pipeline stages.
+
+    Stages are recorded once per upstream execution, so requests coalesced onto the same
+    download or LLM call, and replays from cache, do not add observations.
+
+    Attributes
+    ----------
+    stage_seconds : Histogram
+        The duration of every stage: "fetch", "phash", "preprocess", "encode", "description",
+        and the time to first token and full duration of the "feedback" and "fused" streams.
+    image_bytes : Histogram
+        The size of "fetched" images and of the "prepared" images sent to the LLM.
+    stream_bytes : Histogram
+        The size of the complete "feedback" and "fused" streams.
+    model_seconds : Histogram
+        The duration of the LLM calls by stage and model, such as "description/<model>",
+        and the time to first token and full duration of streams, such as
+        "feedback_first_token/<model>" and "feedback_stream/<model>".
+    fallbacks : Counter
+        The LLM calls retried with the fallback model or the same one, by stage and failed
+        model.
+    hedges : Counter
+        The hedged LLM calls, by stage, model and outcome: "started" when an identical call
+        was started because the first one was slow, "won" when it finished first.
+    near_duplicates : Counter
+        The near-duplicate lookups of images missing from the description cache, by
+        result: "hit" when a neighbour's description was reused, "miss" when no neighbour
+        was within the distance threshold, and "evicted" when the descriptions of every
+        neighbour had left the cache.
+    near_duplicate_distance : Histogram
+        The number of bits between the perceptual hashes of images and the neighbour whose
+        description was reused.
+
+    """
+
+    def __init__(self) -> None:
+        """Initialize empty instruments."""
+        self.stage_seconds: Histogram = Histogram(
+            "dietlog_stage_duration_seconds", "Duration of the pipeline stages.", LATENCY_BUCKETS, "stage"
+        )
+        self.image_bytes: Histogram = Histogram("dietlog_image_bytes", "Size of the images.", SIZE_BUCKETS, "kind")
+        self.stream_bytes: Histogram = Histogram(
+            "dietlog_stream_bytes", "Size of the LLM streams.", SIZE_BUCKETS, "stream"
+        )
+        self.model_seconds: Histogram = Histogram(
+            "dietlog_llm_model_duration_seconds",
+            "Duration of the LLM calls by stage and model.",
+            LATENCY_BUCKETS,
+            "route",
+        )
+        self.fallbacks: Counter = Counter(
+            "dietlog_llm_fallbacks_total", "LLM calls retried with the fallback model or the same one.", "route"
+        )
+        self.hedges: Counter = Counter("dietlog_llm_hedges_total", "Hedged LLM calls by outcome.", "route")
+        self.near_duplicates: Counter = Counter(
+            "dietlog_near_duplicate_lookups_total", "Near-duplicate image lookups.", "result"
+        )
+        self.near_duplicate_distance: Histogram = Histogram(
+            "dietlog_near_duplicate_distance_bits",
+            "Perceptual hash distance to the near-duplicate images whose description was reused.",
+            DISTANCE_BUCKETS,
+        )
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Record the duration of a stage that completes without error.
+
+        Parameters
+        ----------
+        name : str
+            The name of the stage.
+
+        Yields
+        ------
+        None
+            Control while the stage runs.
+
+        """
+        started = time.perf_counter()
+        yield
+        self.stage_seconds.observe(time.perf_counter() - started, name)
+
+    async def stream(self, name: str, source: AsyncIterator[str]) -> AsyncIterator[str]:
+        """Pass a live LLM stream through, recording its latency and size.
+
+        Parameters
+        ----------
+        name : str
+            The name of the stream, used as the prefix of its stages.
+        source : AsyncIterator[str]
+            The live stream.
+
+        Yields
+        ------
+        str
+            The chunks of the stream.
+
+        """
+        started = time.perf_counter()
+        first = True
+        size = 0
+        async for chunk in source:
+            if first:
+                self.stage_seconds.observe(time.perf_counter() - started, f"{name}_first_token")
+                first = False
+            size += len(chunk.encode())
+            yield chunk
+        self.stage_seconds.observe(time.perf_counter() - started, f"{name}_stream")
+        self.stream_bytes.observe(size, name)
+
+    def render(self) -> list[str]:
+        """Render every instrument in the Prometheus text format.
+
+        Returns
+        -------
+        list[str]
+            The lines of the instruments.
+
+        """
+        return [
+            *self.stage_seconds.render(),
+            *self.image_bytes.render(),
+            *self.stream_bytes.render(),
+            *self.model_seconds.render(),
+            *self.fallbacks.render(),
+            *self.hedges.render(),
+            *self.near_duplicates.render(),
+            *self.near_duplicate_distance.render(),
+        ]
+
+
+class ServerTiming:
+    """The durations of the stages of one request, for the `Server-Timing` header."""
+
+    def __init__(self) -> None:
+        """Initialize an empty set of durations."""
+        self._durations: list[tuple[str, float]] = []
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        """Measure the duration of a stage of the request.
+
+        Parameters
+        ----------
+        name : str
+            The name of the stage.
+
+        Yields
+        ------
+        None
+            Control while the stage runs.
+
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._durations.append((name, time.perf_counter() - started))
+
+    def header(self) -> str:
+        """Build the value of the `Server-Timing` header.
+
+        Returns
+        -------
+        str
+            The measured stages with their durations in milliseconds.
+
+        """
+        return ", ".join(f"{name};dur={duration * 1000:.1f}" for name, duration in self._durations)
@@ -0,0 +1,178 @@
+"""Near-duplicate detection of images by perceptual hash.
+
+This module provides the `BKTree` class, a metric tree answering Hamming-distance range
+queries over 64-bit perceptual hashes without comparing every stored hash, and the
+`NearDuplicateIndex` class, which maps the perceptual hashes of described images to the
+keys of their cached descriptions. Re-compressed, resized or lightly cropped copies of an
+image have different bytes but perceptual hashes within a few bits of each other, so the
+index finds the description of the original and the vision call is skipped.
+"""
+
+from collections import deque
+
+
+class _Node[T]:
+    """A node of a `BKTree`, holding the values stored under one hash."""
+
+    __slots__ = ("children", "key", "values")
+
+    def __init__(self, key: int, value: T) -> None:
+        """Initialize a leaf.
+
+        Parameters
+        ----------
+        key : int
+            The hash of the node.
+        value : T
+            The first value stored under the hash.
+
+        """
+        self.key: int = key
+        self.values: list[T] = [value]
+        self.children: dict[int, _Node[T]] = {}
+
+
+class BKTree[T]:
+    """A Burkhard-Keller tree of values indexed by 64-bit hashes under the Hamming distance.
+
+    Every child of a node sits at a distinct distance from it, so a range query only
+    descends into the children whose distance to the node is within the radius of the
+    distance between the node and the query, by the triangle inequality.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty tree."""
+        self._root: _Node[T] | None = None
+        self._size: int = 0
+
+    def __len__(self) -> int:
+        """Return the number of stored values."""
+        return self._size
+
+    def add(self, key: int, value: T) -> None:
+        """Store a value under a hash.
+
+        Parameters
+        ----------
+        key : int
+            The hash.
+        value : T
+            The value.
+
+        """
+        self._size += 1
+        if self._root is None:
+            self._root = _Node(key, value)
+            return
+
+        node = self._root
+        while True:
+            distance = (node.key ^ key).bit_count()
+            if distance == 0:
+                node.values.append(value)
+                return
+            child = node.children.get(distance)
+            if child is None:
+                node.children[distance] = _Node(key, value)
+                return
+            node = child
+
+    def search(self, key: int, radius: int) -> list[tuple[int, T]]:
+        """Find the values stored under hashes close to a hash.
+
+        Parameters
+        ----------
+        key : int
+            The hash looked up.
+        radius : int
+            The maximum number of differing bits.
+
+        Returns
+        -------
+        list[tuple[int, T]]
+            The distance and value of every match, nearest first.
+
+        """
+        matches: list[tuple[int, T]] = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = (node.key ^ key).bit_count()
+            if distance <= radius:
+                matches.extend((distance, value) for value in node.values)
+            stack.extend(child for gap, child in node.children.items() if distance - radius <= gap <= distance + radius)
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+
+class NearDuplicateIndex:
+    """Bounded index from perceptual hashes to the cache keys of image descriptions.
+
+    When the index is full, the oldest quarter of the entries is dropped and the tree is
+    rebuilt, since a BK-tree does not support removing single entries.
+
+    Attributes
+    ----------
+    max_distance : int
+        The maximum number of differing bits between the hashes of near-duplicate images.
+    max_entries : int
+        The maximum number of indexed images.
+
+    """
+
+    def __init__(self, max_distance: int, max_entries: int) -> None:
+        """Initialize an empty index.
+
+        Parameters
+        ----------
+        max_distance : int
+            The maximum number of differing bits between the hashes of near-duplicate images.
+        max_entries : int
+            The maximum number of indexed images.
+
+        """
+        self.max_distance: int = max_distance
+        self.max_entries: int = max_entries
+        self._entries: deque[tuple[int, str]] = deque()
+        self._tree: BKTree[str] = BKTree()
+
+    def __len__(self) -> int:
+        """Return the number of indexed images."""
+        return len(self._entries)
+
+    def add(self, phash: int, key: str) -> None:
+        """Index the description of an image.
+
+        Parameters
+        ----------
+        phash : int
+            The perceptual hash of the image.
+        key : str
+            The key of the cached description of the image.
+
+        """
+        self._entries.append((phash, key))
+        self._tree.add(phash, key)
+        if len(self._entries) > self.max_entries:
+            for _ in range(max(1, self.max_entries // 4)):
+                _ = self._entries.popleft()
+            self._tree = BKTree()
+            for entry_hash, entry_key in self._entries:
+                self._tree.add(entry_hash, entry_key)
+
+    def neighbours(self, phash: int) -> list[tuple[int, str]]:
+        """Find the descriptions of the images close to an image.
+
+        Parameters
+        ----------
+        phash : int
+            The perceptual hash of the image.
+
+        Returns
+        -------
+        list[tuple[int, str]]
+            The distance and description key of every indexed image within `max_distance`,
+            nearest first.
+
+        """
+        return self._tree.search(phash, self.max_distance)
@@ -0,0 +1,479 @@
+"""Diet analysis pipeline.
+
+This module provides the `DietPipeline` class, which chains the image and LLM services
+into the fetch → preprocess → describe → feedback stages used by the API routes. Concurrent identical
+requests are coalesced at every stage: downloads are shared per URL, descriptions per
+image content, and feedback streams per rendered prompt, with late joiners receiving the
+chunks already produced before following the live stream. Completed feedback streams are
+cached and replayed for later identical requests. The latency and size of every upstream
+stage are recorded in `PipelineMetrics`.
+
+Raw images are passed between the stages as views of the buffer they were received into
+and count against a shared `ByteBudget` while they are held, so the memory used by images
+stays bounded however many requests are in flight.
+
+Images missing from the description cache are looked up by perceptual hash in a
+`NearDuplicateIndex`, so re-compressed, resized or lightly cropped copies of an image
+already described reuse its cached description instead of calling the vision model again.
+
+The pipeline runs in one of two modes. In "two_phase" mode the image is described first
+and the feedback is streamed from the description. In "fused" mode a single streamed LLM
+call describes the image and produces the feedback, so the first chunks reach the client
+without waiting for a complete description. Every LLM call goes through a `ModelRouter`,
+which picks its model from the latency tier of the stage and falls back to the larger
+model when a faster one fails.
+"""
+
+import asyncio
+import hashlib
+from collections.abc import AsyncIterator, Callable
+from typing import Literal, cast, get_args
+
+from app.interfaces.image import MAX_IMAGE_SIZE, AsyncImageService, ImageMediaType
+from app.interfaces.llm import LLMService
+from app.services.budget import ByteBudget
+from app.services.description_cache import DescriptionCache
+from app.services.feedback_cache import FeedbackCache
+from app.services.metrics import PipelineMetrics
+from app.services.near_duplicates import NearDuplicateIndex
+from app.services.preprocessing import ImagePreprocessor
+from app.services.routing import LatencyTier, ModelRouter
+from app.services.singleflight import SingleFlight, StreamFlight
+
+type PipelineMode = Literal["two_phase", "fused"]
+"""The ways the pipeline can turn an image into feedback."""
+
+
+class DietPipeline:
+    """Orchestrates the stages that turn an image URL into nutritional feedback.
+
+    Attributes
+    ----------
+    img : AsyncImageService
+        The service used to fetch and encode images.
+    llm : LLMService
+        The service used to describe images and generate feedback.
+    preprocessor : ImagePreprocessor
+        The preprocessor downsizing and re-encoding images before they are described.
+    description_cache : DescriptionCache | None
+        The cache of image descriptions, or None when caching is disabled.
+    feedback_cache : FeedbackCache | None
+        The cache of completed feedback streams, or None when caching is disabled.
+    default_mode : PipelineMode
+        The mode used by requests that do not select one.
+    metrics : PipelineMetrics
+        The latency and size instruments of the stages.
+    budget : ByteBudget
+        The budget of raw image bytes held by in-flight requests.
+    near_duplicates : NearDuplicateIndex | None
+        The index of the perceptual hashes of described images, or None when near-duplicate
+        detection is disabled. It is only used with the description cache.
+    router : ModelRouter
+        The router picking the model of every LLM call.
+
+    """
+
+    def __init__(  # noqa: PLR0913 - the pipeline wires every stage together
+        self,
+        img: AsyncImageService,
+        llm: LLMService,
+        *,
+        preprocessor: ImagePreprocessor,
+        description_cache: DescriptionCache | None,
+        feedback_cache: FeedbackCache | None,
+        default_mode: str,
+        metrics: PipelineMetrics,
+        budget: ByteBudget,
+        router: ModelRouter,
+        near_duplicates: NearDuplicateIndex | None = None,
+    ) -> None:
+        """Initialize the pipeline with its services.
+
+        Parameters
+        ----------
+        img : AsyncImageService
+            The service used to fetch and encode images.
+        llm : LLMService
+            The service used to describe images and generate feedback.
+        preprocessor : ImagePreprocessor
+            The preprocessor downsizing and re-encoding images before they are described.
+        description_cache : DescriptionCache | None
+            The cache of image descriptions, or None when caching is disabled.
+        feedback_cache : FeedbackCache | None
+            The cache of completed feedback streams, or None when caching is disabled.
+        default_mode : str
+            The mode used by requests that do not select one: "two_phase" or "fused".
+        metrics : PipelineMetrics
+            The latency and size instruments of the stages.
+        budget : ByteBudget
+            The budget of raw image bytes held by in-flight requests.
+        router : ModelRouter
+            The router picking the model of every LLM call.
+        near_duplicates : NearDuplicateIndex | None
+            The index of the perceptual hashes of described images, or None when
+            near-duplicate detection is disabled. It is only used with the description cache.
+
+        Raises
+        ------
+        ValueError
+            If the default mode is unknown.
+
+        """
+        modes = get_args(PipelineMode.__value__)
+        if default_mode not in modes:
+            msg = f"Unknown pipeline mode: {default_mode!r}. Available modes: {', '.join(modes)}"
+            raise ValueError(msg)
+
+        self.img: AsyncImageService = img
+        self.llm: LLMService = llm
+        self.preprocessor: ImagePreprocessor = preprocessor
+        self.description_cache: DescriptionCache | None = description_cache
+        self.feedback_cache: FeedbackCache | None = feedback_cache
+        self.default_mode: PipelineMode = cast("PipelineMode", default_mode)
+        self.metrics: PipelineMetrics = metrics
+        self.budget: ByteBudget = budget
+        self.near_duplicates: NearDuplicateIndex | None = near_duplicates
+        self.router: ModelRouter = router
+        self._fetches: SingleFlight[str, memoryview] = SingleFlight()
+        self._descriptions: SingleFlight[str, str] = SingleFlight()
+        self._feedback: StreamFlight[str] = StreamFlight()
+        self._fused: StreamFlight[str] = StreamFlight()
+
+    async def fetch(self, url: str) -> memoryview:
+        """Fetch an image, sharing the download with concurrent requests for the same URL.
+
+        Parameters
+        ----------
+        url : str
+            The URL of the image.
+
+        Returns
+        -------
+        memoryview
+            A read-only view of the raw image content.
+
+        """
+
+        async def run() -> memoryview:
+            with self.metrics.stage("fetch"):
+                content = await self.img.fetch_img_content(url)
+            self.metrics.image_bytes.observe(len(content), "fetched")
+            return content
+
+        return await self._fetches.do(url, run)
+
+    async def describe(self, content: memoryview, tier: LatencyTier | None = None) -> str:
+        """Describe an image, using the cache and sharing the LLM call with identical images.
+
+        Parameters
+        ----------
+        content : memoryview
+            The raw image content.
+        tier : LatencyTier | None
+            The latency tier selected by the request, or None for the default tier.
+
+        Returns
+        -------
+        str
+            The description of the image.
+
+        """
+        models = self.router.route("description", tier, len(content))
+        fingerprint = self._description_fingerprint(models[0])
+        key = DescriptionCache.key(content, fingerprint)
+
+        async def run() -> str:
+            phash = None
+            if self.description_cache is not None:
+                cached = await self.description_cache.get(content, fingerprint)
+                if cached is not None:
+                    return cached
+                if self.near_duplicates is not None:
+                    with self.metrics.stage("phash"):
+                        phash = await self.preprocessor.perceptual_hash(content)
+                    # Only reuse descriptions produced with the same fingerprint.
+                    scope = key[: key.rindex(":") + 1]
+                    cached = await self._near_duplicate(self.description_cache, self.near_duplicates, phash, scope)
+                    if cached is not None:
+                        await self.description_cache.set(content, fingerprint, cached)
+                        return cached
+
+            encoded, media_type = await self._prepare(content)
+            with self.metrics.stage("description"):
+                description, model = await self.router.call(
+                    "description",
+                    models,
+                    lambda model: self.llm.get_image_description(encoded, media_type, model),
+                )
+            if self.description_cache is not None and description:
+                # A fallback's description is cached for its own model, not for the one routed first.
+                answered = fingerprint if model == models[0] else self._description_fingerprint(model)
+                await self.description_cache.set(content, answered, description)
+                if self.near_duplicates is not None and phash is not None:
+                    self.near_duplicates.add(phash, DescriptionCache.key(content, answered))
+            return description
+
+        return await self._descriptions.do(key, run)
+
+    async def describe_meal(
+        self, contents: list[memoryview], tier: LatencyTier | None = None, concurrency: int = 4
+    ) -> str:
+        """Describe the photos of a meal concurrently and merge their descriptions.
+
+        If one photo cannot be described, the others are cancelled.
+
+        Parameters
+        ----------
+        contents : list[memoryview]
+            The raw content of every photo of the meal.
+        tier : LatencyTier | None
+            The latency tier selected by the request, or None for the default tier.
+        concurrency : int
+            The maximum number of photos described at the same time.
+
+        Returns
+        -------
+        str
+            The description of a single photo as is, or the descriptions of several photos
+            under numbered headings, so a single feedback call covers the whole meal.
+
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def describe(content: memoryview) -> str:
+            async with semaphore:
+                return await self.describe(content, tier)
+
+        try:
+            async with asyncio.TaskGroup() as group:
+                tasks = [group.create_task(describe(content)) for content in contents]
+        except ExceptionGroup as errors:
+            raise errors.exceptions[0] from None
+
+        descriptions = [task.result() for task in tasks]
+        if len(descriptions) == 1:
+            return descriptions[0]
+        return "\n\n".join(
+            f"Photo {index} of {len(descriptions)}:\n{description}"
+            for index, description in enumerate(descriptions, start=1)
+        )
+
+    async def analyse(self, url: str, tier: LatencyTier | None = None) -> tuple[str, str]:
+        """Run the whole pipeline for an image and collect the complete feedback.
+
+        Parameters
+        ----------
+        url : str
+            The URL of the image.
+        tier : LatencyTier | None
+            The latency tier selected by the request, or None for the default tiers.
+
+        Returns
+        -------
+        tuple[str, str]
+            The description of the image and the complete nutritional feedback.
+
+        """
+        async with self.budget.reserve(MAX_IMAGE_SIZE) as reservation:
+            content = await self.fetch(url)
+            reservation.shrink(len(content))
+            description = await self.describe(content, tier)
+            del content
+        feedback = "".join([chunk async for chunk in self.feedback(description, tier)])
+        return description, feedback
+
+    def feedback(self, description: str, tier: LatencyTier | None = None) -> AsyncIterator[str]:
+        """Stream nutritional feedback, sharing the stream with identical requests.
+
+        Parameters
+        ----------
+        description : str
+            The description of the image.
+        tier : LatencyTier | None
+            The latency tier selected by the request, or None for the default tier.
+
+        Returns
+        -------
+        AsyncIterator[str]
+            The chunks of the feedback, replayed from the first one for late joiners.
+
+        """
+        models = self.router.route("feedback", tier)
+        fingerprint = f"{models[0]}\n{self.llm.feedback_fingerprint(description)}"
+        key = hashlib.sha256(fingerprint.encode()).hexdigest()
+        return self._feedback.stream(
+            key,
+            lambda: self._cached_stream(
+                fingerprint,
+                lambda: self.metrics.stream(
+                    "feedback",
+                    self.router.stream(
+                        "feedback", models, lambda model: self.llm.iter_nutritional_feedback(description, model)
+                    ),
+                ),
+            ),
+        )
+
+    async def fused(self, content: memoryview, tier: LatencyTier | None = None) -> AsyncIterator[str]:
+        """Stream the description and feedback of an image from a single LLM call.
+
+        The image is preprocessed before this method returns, so image errors are raised
+        here rather than in the middle of the stream.
+
+        Parameters
+        ----------
+        content : memoryview
+            The raw image content.
+        tier : LatencyTier | None
+            The latency tier selected by the request, or None for the default tier.
+
+        Returns
+        -------
+        AsyncIterator[str]
+            The chunks of the combined description and feedback, shared with concurrent
+            requests for the same image and replayed from cache when available.
+
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        models = self.router.route("fused", tier, len(content))
+        fingerprint = f"{self.llm.fused_fingerprint}:{models[0]}:{self.preprocessor.fingerprint}:{digest}"
+        key = hashlib.sha256(fingerprint.encode()).hexdigest()
+
+        joined = self._fused.join(key)
+        if joined is not None:
+            return joined
+        if self.feedback_cache is not None:
+            cached = await self.feedback_cache.get(fingerprint)
+            if cached is not None:
+                return cached
+
+        encoded, media_type = await self._prepare(content)
+        return self._fused.stream(
+            key,
+            lambda: self._record(
+                fingerprint,
+                self.metrics.stream(
+                    "fused",
+                    self.router.stream(
+                        "fused", models, lambda model: self.llm.iter_fused_analysis(encoded, media_type, model)
+                    ),
+                ),
+            ),
+        )
+
+    async def _near_duplicate(
+        self, cache: DescriptionCache, index: NearDuplicateIndex, phash: int, scope: str
+    ) -> str | None:
+        """Find the cached description of the nearest near-duplicate of an image.
+
+        Parameters
+        ----------
+        cache : DescriptionCache
+            The cache holding the descriptions.
+        index : NearDuplicateIndex
+            The index of the perceptual hashes of described images.
+        phash : int
+            The perceptual hash of the image.
+        scope : str
+            The prefix of the cache keys of the descriptions that may be reused.
+
+        Returns
+        -------
+        str | None
+            The description of the nearest indexed image still in the cache, or None.
+
+        """
+        neighbours = [(distance, key) for distance, key in index.neighbours(phash) if key.startswith(scope)]
+        for distance, key in neighbours:
+            description = await cache.load(key)
+            if description is not None:
+                self.metrics.near_duplicates.inc(label="hit")
+                self.metrics.near_duplicate_distance.observe(distance)
+                return description
+        self.metrics.near_duplicates.inc(label="evicted" if neighbours else "miss")
+        return None
+
+    def _description_fingerprint(self, model: str) -> str:
+        """Identify the prompt, model and preprocessing producing a description.
+
+        Parameters
+        ----------
+        model : str
+            The model describing the image.
+
+        Returns
+        -------
+        str
+            The fingerprint keying the descriptions of that model in the cache.
+
+        """
+        return f"{self.llm.description_fingerprint}:{model}:{self.preprocessor.fingerprint}"
+
+    async def _prepare(self, content: memoryview) -> tuple[str, ImageMediaType]:
+        """Preprocess and encode an image for the LLM.
+
+        Parameters
+        ----------
+        content : memoryview
+            The raw image content.
+
+        Returns
+        -------
+        tuple[str, ImageMediaType]
+            The base64-encoded prepared image and its media type.
+
+        """
+        with self.metrics.stage("preprocess"):
+            prepared = await self.preprocessor.prepare(content)
+        self.metrics.image_bytes.observe(len(prepared.data), "prepared")
+        with self.metrics.stage("encode"):
+            encoded = await self.img.decode_img_bytes(prepared.data)
+        return encoded, prepared.media_type
+
+    async def _cached_stream(
+        self, fingerprint: str, open_stream: Callable[[], AsyncIterator[str]]
+    ) -> AsyncIterator[str]:
+        """Replay a cached stream, or open it and cache it once complete.
+
+        Parameters
+        ----------
+        fingerprint : str
+            The fingerprint of the LLM request producing the stream.
+        open_stream : Callable[[], AsyncIterator[str]]
+            The function opening the live stream on a cache miss.
+
+        Yields
+        ------
+        str
+            The chunks of the stream.
+
+        """
+        if self.feedback_cache is not None:
+            cached = await self.feedback_cache.get(fingerprint)
+            if cached is not None:
+                async for chunk in cached:
+                    yield chunk
+                return
+
+        async for chunk in self._record(fingerprint, open_stream()):
+            yield chunk
+
+    def _record(self, fingerprint: str, source: AsyncIterator[str]) -> AsyncIterator[str]:
+        """Cache a live stream once it completes, when the feedback cache is enabled.
+
+        Parameters
+        ----------
+        fingerprint : str
+            The fingerprint of the LLM request producing the stream.
+        source : AsyncIterator[str]
+            The live stream.
+
+        Returns
+        -------
+        AsyncIterator[str]
+            The chunks of the live stream.
+
+        """
+        if self.feedback_cache is None:
+            return source
+        return self.feedback_cache.record(fingerprint, source)
@@ -0,0 +1,383 @@
+"""Image preprocessing before the vision call.
+
+This module provides the `ImagePreprocessor` class, which prepares fetched images for the
+LLM: it detects the real format from the file signature, applies and then strips EXIF
+metadata, and downsizes and re-encodes large images. Smaller payloads mean less data to
+upload, fewer input tokens and faster vision responses. The CPU-bound work runs in a
+thread pool so that it never blocks the event loop.
+
+Images are read by Pillow straight from the buffer they were received into, and
+re-encoded images are returned as a view of the encoder's output, so neither the raw nor
+the prepared image is copied.
+
+The preprocessor also computes the perceptual hash of images, a 64-bit difference hash
+(dHash) of a small grayscale thumbnail that changes by a few bits at most when an image is
+re-compressed, resized or lightly cropped, so near-duplicate images can be recognised.
+"""
+
+import asyncio
+import io
+from collections.abc import Buffer
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import BinaryIO, override
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from app.exceptions.image import UnsupportedImageError
+from app.interfaces.image import ImageMediaType
+
+_SIGNATURES: tuple[tuple[int, bytes, ImageMediaType], ...] = (
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+    (8, b"WEBP", "image/webp"),
+)
+_OUTPUT_FORMATS: dict[str, ImageMediaType] = {"jpeg": "image/jpeg", "webp": "image/webp"}
+_HASH_SIZE = 8
+"""The side of the grid of brightness gradients making the perceptual hash, 64 bits."""
+
+
+def sniff_media_type(content: bytes | memoryview) -> ImageMediaType | None:
+    """Detect the media type of an image from its file signature.
+
+    Parameters
+    ----------
+    content : bytes | memoryview
+        The raw image content.
+
+    Returns
+    -------
+    ImageMediaType | None
+        The media type of a JPEG, PNG, GIF or WebP image, or None for any other content.
+
+    """
+    for offset, signature, media_type in _SIGNATURES:
+        if content[offset : offset + len(signature)] == signature:
+            if media_type == "image/webp" and content[:4] != b"RIFF":
+                continue
+            return media_type
+    return None
+
+
+class _BufferReader(io.BufferedIOBase, BinaryIO):
+    """A seekable binary file reading from a buffer without copying it.
+
+    `BytesIO` copies any buffer other than `bytes` it is created from, which would double
+    the memory held by a large image while Pillow decodes it. The reader derives from
+    `BinaryIO` as well so that type checkers accept it where `IO[bytes]` is expected.
+    """
+
+    def __init__(self, content: memoryview) -> None:
+        """Initialize the reader at the start of the buffer.
+
+        Parameters
+        ----------
+        content : memoryview
+            The buffer to read.
+
+        """
+        super().__init__()
+        self._content: memoryview = content
+        self._position: int = 0
+
+    @override
+    def readable(self) -> bool:
+        """Whether the file can be read, always True."""
+        return True
+
+    @override
+    def seekable(self) -> bool:
+        """Whether the file supports random access, always True."""
+        return True
+
+    @override
+    def read(self, size: int | None = -1, /) -> bytes:
+        """Return the next `size` bytes, or the rest of the buffer if `size` is negative."""
+        end = len(self._content) if size is None or size < 0 else self._position + size
+        chunk = self._content[self._position : end].tobytes()
+        self._position += len(chunk)
+        return chunk
+
+    @override
+    def read1(self, size: int | None = -1, /) -> bytes:
+        """Return the next `size` bytes, the same as `read` since nothing is buffered."""
+        return self.read(size)
+
+    @override
+    def readinto(self, buffer: Buffer, /) -> int:
+        """Copy the next bytes into `buffer` and return their number, 0 at the end."""
+        view = memoryview(buffer).cast("B")
+        chunk = self._content[self._position : self._position + len(view)]
+        view[: len(chunk)] = chunk
+        self._position += len(chunk)
+        return len(chunk)
+
+    @override
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        """Move to a position relative to the start, the current position or the end."""
+        origin = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: len(self._content)}[whence]
+        self._position = max(0, origin + offset)
+        return self._position
+
+    @override
+    def tell(self) -> int:
+        """Return the current position."""
+        return self._position
+
+
+class PreparedImage:
+    """An image ready to be sent to the LLM.
+
+    Attributes
+    ----------
+    data : memoryview
+        The encoded image.
+    media_type : ImageMediaType
+        The media type of `data`.
+
+    """
+
+    def __init__(self, data: memoryview, media_type: ImageMediaType) -> None:
+        """Initialize the prepared image.
+
+        Parameters
+        ----------
+        data : memoryview
+            The encoded image.
+        media_type : ImageMediaType
+            The media type of `data`.
+
+        """
+        self.data: memoryview = data
+        self.media_type: ImageMediaType = media_type
+
+
+class ImagePreprocessor:
+    """Downsizes, re-encodes and strips metadata from images before the vision call.
+
+    Images that already fit within `max_edge` and carry no EXIF metadata are passed through
+    untouched, so small images are never degraded by a second lossy encoding.
+
+    Attributes
+    ----------
+    max_edge : int
+        The maximum length in pixels of the longest edge of the prepared image.
+    output_format : str
+        The format used when an image is re-encoded: "jpeg" or "webp".
+    quality : int
+        The encoder quality used when an image is re-encoded, between 1 and 100.
+
+    """
+
+    def __init__(self, max_edge: int, output_format: str, quality: int, workers: int) -> None:
+        """Initialize the preprocessor and its thread pool.
+
+        Parameters
+        ----------
+        max_edge : int
+            The maximum length in pixels of the longest edge of the prepared image.
+        output_format : str
+            The format used when an image is re-encoded: "jpeg" or "webp".
+        quality : int
+            The encoder quality used when an image is re-encoded, between 1 and 100.
+        workers : int
+            The number of threads used to process images.
+
+        Raises
+        ------
+        ValueError
+            If the output format is not supported.
+
+        """
+        if output_format not in _OUTPUT_FORMATS:
+            msg = f"Unknown image output format: {output_format!r}. Available formats: {', '.join(_OUTPUT_FORMATS)}"
+            raise ValueError(msg)
+
+        self.max_edge: int = max_edge
+        self.output_format: str = output_format
+        self.quality: int = quality
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="preprocess")
+
+    @property
+    def fingerprint(self) -> str:
+        """Identify the preprocessing settings, which change what the LLM sees."""
+        return f"{self.max_edge}:{self.output_format}:{self.quality}"
+
+    async def prepare(self, content: memoryview) -> PreparedImage:
+        """Prepare an image for the LLM.
+
+        Parameters
+        ----------
+        content : memoryview
+            The raw image content.
+
+        Returns
+        -------
+        PreparedImage
+            The image to send, either the original content or a downsized re-encoding.
+
+        Raises
+        ------
+        UnsupportedImageError
+            If the content is not a JPEG, PNG, GIF or WebP image, or cannot be decoded.
+
+        """
+        media_type = self._sniff(content)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._prepare, content, media_type)
+
+    async def perceptual_hash(self, content: memoryview) -> int:
+        """Compute the perceptual hash of an image.
+
+        Parameters
+        ----------
+        content : memoryview
+            The raw image content.
+
+        Returns
+        -------
+        int
+            The 64-bit difference hash of the image. The hashes of near-duplicate images
+            differ by few bits.
+
+        Raises
+        ------
+        UnsupportedImageError
+            If the content is not a JPEG, PNG, GIF or WebP image, or cannot be decoded.
+
+        """
+        _ = self._sniff(content)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._perceptual_hash, content)
+
+    async def aclose(self) -> None:
+        """Stop the thread pool, dropping images that are still queued."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _sniff(content: memoryview) -> ImageMediaType:
+        """Detect the media type of an image, rejecting unsupported content.
+
+        Parameters
+        ----------
+        content : memoryview
+            The raw image content.
+
+        Returns
+        -------
+        ImageMediaType
+            The media type detected from the file signature.
+
+        Raises
+        ------
+        UnsupportedImageError
+            If the content is not a JPEG, PNG, GIF or WebP image.
+
+        """
+        media_type = sniff_media_type(content)
+        if media_type is None:
+            msg = "the content is not a JPEG, PNG, GIF or WebP image"
+            raise UnsupportedImageError(msg)
+        return media_type
+
+    def _prepare(self, content: memoryview, media_type: ImageMediaType) -> PreparedImage:
+        """Downsize and re-encode an image when needed. Runs in the thread pool.
+
+        Parameters
+        ----------
+        content : memoryview
+            The raw image content.
+        media_type : ImageMediaType
+            The media type detected from the file signature.
+
+        Returns
+        -------
+        PreparedImage
+            The image to send to the LLM.
+
+        Raises
+        ------
+        UnsupportedImageError
+            If the image cannot be decoded.
+
+        """
+        try:
+            with Image.open(_BufferReader(content)) as image:
+                if max(image.size) <= self.max_edge and not image.getexif():
+                    return PreparedImage(content, media_type)
+
+                image.draft("RGB", (self.max_edge, self.max_edge))
+                prepared = ImageOps.exif_transpose(image)
+                prepared.thumbnail((self.max_edge, self.max_edge), Image.Resampling.LANCZOS)
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+            raise UnsupportedImageError(str(e)) from e
+
+        if self.output_format == "jpeg" and prepared.mode != "RGB":
+            prepared = self._flatten(prepared)
+
+        output = BytesIO()
+        prepared.save(output, format=self.output_format, quality=self.quality)
+        return PreparedImage(output.getbuffer().toreadonly(), _OUTPUT_FORMATS[self.output_format])
+
+    @staticmethod
+    def _perceptual_hash(content: memoryview) -> int:
+        """Compute the difference hash of an image. Runs in the thread pool.
+
+        The image is reduced to a grayscale grid one column wider than high, and every bit
+        of the hash tells whether a cell is darker than its right neighbour.
+
+        Parameters
+        ----------
+        content : memoryview
+            The raw image content.
+
+        Returns
+        -------
+        int
+            The 64-bit difference hash.
+
+        Raises
+        ------
+        UnsupportedImageError
+            If the image cannot be decoded.
+
+        """
+        try:
+            with Image.open(_BufferReader(content)) as image:
+                image.draft("L", (_HASH_SIZE * 16, _HASH_SIZE * 16))
+                grid = (
+                    ImageOps.exif_transpose(image)
+                    .convert("L")
+                    .resize((_HASH_SIZE + 1, _HASH_SIZE), Image.Resampling.BOX)
+                )
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+            raise UnsupportedImageError(str(e)) from e
+
+        pixels = grid.tobytes()
+        phash = 0
+        for row in range(_HASH_SIZE):
+            for column in range(row * (_HASH_SIZE + 1), (row + 1) * (_HASH_SIZE + 1) - 1):
+                phash = (phash << 1) | (pixels[column] < pixels[column + 1])
+        return phash
+
+    @staticmethod
+    def _flatten(image: Image.Image) -> Image.Image:
+        """Convert an image to RGB, compositing any transparency over a white background.
+
+        Parameters
+        ----------
+        image : Image.Image
+            The image to convert.
+
+        Returns
+        -------
+        Image.Image
+            The RGB image.
+
+        """
+        rgba = image.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
@@ -0,0 +1,373 @@
+"""Model routing for the LLM stages of the pipeline.
+
+This module provides the `ModelRouter` class, which picks the model used by each LLM
+stage. Every stage has a default latency tier: "fast" routes it to a smaller, faster
+model, "quality" to the larger one. Requests can override the tier, and images larger than
+a configured size are always routed to the larger model. Calls on the fast model fall back
+to the larger one when they fail or produce nothing, and the latency of every call is
+recorded by stage and model, so the routing can be tuned from real traffic.
+
+Failed calls are retried with the larger model a configured number of times, but only
+while the deadline of the request leaves enough time for the median call of that model.
+Non-streamed calls can also be hedged: when a call outlasts a high quantile of its recent
+latencies, an identical call is started and the first result is kept, which cuts the tail
+latency at the cost of a few extra calls.
+"""
+
+import asyncio
+import statistics
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import Literal, cast, get_args
+
+from app.exceptions.deadline import DeadlineExceededError
+from app.exceptions.llm import LLMRateLimitError, LLMUnavailableError
+from app.services.deadline import current_deadline
+from app.services.metrics import PipelineMetrics
+
+type LatencyTier = Literal["fast", "quality"]
+"""The latency tiers models are grouped in."""
+
+type RoutedStage = Literal["description", "feedback", "fused"]
+"""The pipeline stages making LLM calls."""
+
+_WINDOW = 256
+_HEDGE_MIN_SAMPLES = 20
+
+
+class _LatencyWindow:
+    """The latencies of the latest calls of a route."""
+
+    def __init__(self) -> None:
+        """Initialize an empty window."""
+        self._samples: deque[float] = deque(maxlen=_WINDOW)
+
+    def __len__(self) -> int:
+        """Return the number of latencies in the window."""
+        return len(self._samples)
+
+    def observe(self, seconds: float) -> None:
+        """Record the latency of a call.
+
+        Parameters
+        ----------
+        seconds : float
+            The duration of the call.
+
+        """
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile of the latencies.
+
+        Parameters
+        ----------
+        q : float
+            The quantile, between 0 and 1.
+
+        Returns
+        -------
+        float
+            The estimated latency in seconds, or 0 when the window is empty.
+
+        """
+        if not self._samples:
+            return 0.0
+        if len(self._samples) == 1:
+            return self._samples[0]
+        cuts = statistics.quantiles(self._samples, n=100, method="inclusive")
+        return cuts[min(98, max(0, round(q * 100) - 1))]
+
+
+class ModelRouter:
+    """Picks the model of every LLM call and falls back to the larger model on failure.
+
+    Attributes
+    ----------
+    models : dict[LatencyTier, str]
+        The model of every latency tier.
+    stage_tiers : dict[RoutedStage, LatencyTier]
+        The tier used by every stage when the request does not select one.
+    fast_max_image_bytes : int
+        The size in bytes of the largest raw image sent to the fast model, or 0 for no limit.
+    metrics : PipelineMetrics
+        The instruments recording the latency of every model and the fallbacks.
+    retries : int
+        The number of times a failed call is retried with the "quality" model after the
+        fallbacks, when the deadline of the request allows it.
+    hedge_quantile : float
+        The quantile of the recent latencies of a route after which a non-streamed call is
+        hedged with an identical one, or 0 to never hedge.
+
+    """
+
+    def __init__(  # noqa: PLR0913 - the routing configuration
+        self,
+        models: dict[LatencyTier, str],
+        stage_tiers: dict[RoutedStage, str],
+        *,
+        fast_max_image_bytes: int,
+        metrics: PipelineMetrics,
+        retries: int = 0,
+        hedge_quantile: float = 0.0,
+    ) -> None:
+        """Initialize the router.
+
+        Parameters
+        ----------
+        models : dict[LatencyTier, str]
+            The model of every latency tier.
+        stage_tiers : dict[RoutedStage, str]
+            The tier used by every stage when the request does not select one: "fast" or
+            "quality".
+        fast_max_image_bytes : int
+            The size in bytes of the largest raw image sent to the fast model, or 0 for no limit.
+        metrics : PipelineMetrics
+            The instruments recording the latency of every model and the fallbacks.
+        retries : int
+            The number of times a failed call is retried with the "quality" model after the
+            fallbacks, when the deadline of the request allows it.
+        hedge_quantile : float
+            The quantile of the recent latencies of a route after which a non-streamed call
+            is hedged with an identical one, or 0 to never hedge.
+
+        Raises
+        ------
+        ValueError
+            If the tier of a stage is unknown.
+
+        """
+        tiers = get_args(LatencyTier.__value__)
+        for stage, tier in stage_tiers.items():
+            if tier not in tiers:
+                msg = f"Unknown latency tier for the {stage} stage: {tier!r}. Available tiers: {', '.join(tiers)}"
+                raise ValueError(msg)
+
+        self.models: dict[LatencyTier, str] = models
+        self.stage_tiers: dict[RoutedStage, LatencyTier] = cast("dict[RoutedStage, LatencyTier]", stage_tiers)
+        self.fast_max_image_bytes: int = fast_max_image_bytes
+        self.metrics: PipelineMetrics = metrics
+        self.retries: int = retries
+        self.hedge_quantile: float = hedge_quantile
+        self._latencies: dict[str, _LatencyWindow] = {}
+
+    def route(self, stage: RoutedStage, tier: LatencyTier | None = None, image_bytes: int = 0) -> list[str]:
+        """Pick the models of a call, in the order they are tried.
+
+        Parameters
+        ----------
+        stage : RoutedStage
+            The stage making the call.
+        tier : LatencyTier | None
+            The tier selected by the request, or None for the default tier of the stage.
+        image_bytes : int
+            The size of the raw image of the request, or 0 when the call has no image.
+
+        Returns
+        -------
+        list[str]
+            The model of the selected tier, followed by the "quality" model as a fallback
+            when they differ.
+
+        """
+        tier = tier or self.stage_tiers[stage]
+        if tier == "fast" and 0 < self.fast_max_image_bytes < image_bytes:
+            tier = "quality"
+        primary, fallback = self.models[tier], self.models["quality"]
+        return [primary] if primary == fallback else [primary, fallback]
+
+    async def call(self, stage: RoutedStage, models: list[str], fn: Callable[[str], Awaitable[str]]) -> tuple[str, str]:
+        """Make a call, falling back to the next model on errors or an empty result.
+
+        Parameters
+        ----------
+        stage : RoutedStage
+            The stage making the call.
+        models : list[str]
+            The models to try, in order, as returned by `route`.
+        fn : Callable[[str], Awaitable[str]]
+            The function making the call with a model.
+
+        Returns
+        -------
+        tuple[str, str]
+            The result of the first model producing one, or the empty result of the last
+            attempt, and the model that produced it.
+
+        """
+        attempts = self._attempts(models)
+        for index, model in enumerate(attempts):
+            route = f"{stage}/{model}"
+            started = time.perf_counter()
+            try:
+                result = await self._hedged(route, lambda model=model: fn(model))
+            except Exception as e:
+                if not self._retry(e, attempts, index, stage):
+                    raise
+                self.metrics.fallbacks.inc(label=route)
+                continue
+            self._observe(route, time.perf_counter() - started)
+            if result or not self._retry(None, attempts, index, stage):
+                return result, model
+            self.metrics.fallbacks.inc(label=route)
+        return "", attempts[-1]
+
+    async def stream(
+        self, stage: RoutedStage, models: list[str], open_stream: Callable[[str], AsyncIterator[str]]
+    ) -> AsyncIterator[str]:
+        """Stream a call, falling back to the next model if it fails before its first chunk.
+
+        Errors raised after the first chunk are propagated, since the chunks already sent
+        cannot be taken back.
+
+        Parameters
+        ----------
+        stage : RoutedStage
+            The stage making the call.
+        models : list[str]
+            The models to try, in order, as returned by `route`.
+        open_stream : Callable[[str], AsyncIterator[str]]
+            The function opening the stream with a model.
+
+        Yields
+        ------
+        str
+            The chunks of the first model producing any.
+
+        """
+        attempts = self._attempts(models)
+        for index, model in enumerate(attempts):
+            started = time.perf_counter()
+            source = open_stream(model)
+            try:
+                first = await anext(source)
+            except StopAsyncIteration:
+                if not self._retry(None, attempts, index, f"{stage}_first_token"):
+                    return
+                self.metrics.fallbacks.inc(label=f"{stage}/{model}")
+                continue
+            except Exception as e:
+                if not self._retry(e, attempts, index, f"{stage}_first_token"):
+                    raise
+                self.metrics.fallbacks.inc(label=f"{stage}/{model}")
+                continue
+
+            self._observe(f"{stage}_first_token/{model}", time.perf_counter() - started)
+            yield first
+            async for chunk in source:
+                yield chunk
+            self.metrics.model_seconds.observe(time.perf_counter() - started, f"{stage}_stream/{model}")
+            return
+
+    def _attempts(self, models: list[str]) -> list[str]:
+        """List the models of the successive attempts of a call.
+
+        Parameters
+        ----------
+        models : list[str]
+            The models returned by `route`.
+
+        Returns
+        -------
+        list[str]
+            The models, followed by the last one repeated `retries` times.
+
+        """
+        return models + models[-1:] * self.retries
+
+    def _retry(self, error: Exception | None, attempts: list[str], index: int, prefix: str) -> bool:
+        """Decide whether a failed attempt is followed by the next one.
+
+        Rejections by the scheduler or the provider are only retried with another model,
+        since retrying the same model right away would be rejected again. No attempt is
+        started when the remaining budget of the request is shorter than the median latency
+        of the next model.
+
+        Parameters
+        ----------
+        error : Exception | None
+            The error of the attempt, or None if it produced nothing.
+        attempts : list[str]
+            The models of the attempts, as returned by `_attempts`.
+        index : int
+            The position of the failed attempt.
+        prefix : str
+            The prefix of the routes of the attempts, such as "description".
+
+        Returns
+        -------
+        bool
+            Whether to make the next attempt.
+
+        """
+        if index + 1 >= len(attempts) or isinstance(error, DeadlineExceededError):
+            return False
+        following = attempts[index + 1]
+        if isinstance(error, LLMRateLimitError | LLMUnavailableError) and following == attempts[index]:
+            return False
+        deadline = current_deadline()
+        window = self._latencies.get(f"{prefix}/{following}")
+        return deadline is None or window is None or deadline.remaining() >= window.quantile(0.5)
+
+    def _observe(self, route: str, seconds: float) -> None:
+        """Record the latency of a successful call.
+
+        Parameters
+        ----------
+        route : str
+            The stage and model of the call, such as "description/<model>".
+        seconds : float
+            The duration of the call.
+
+        """
+        self.metrics.model_seconds.observe(seconds, route)
+        window = self._latencies.get(route)
+        if window is None:
+            window = self._latencies[route] = _LatencyWindow()
+        window.observe(seconds)
+
+    async def _hedged(self, route: str, fn: Callable[[], Awaitable[str]]) -> str:
+        """Make a call, hedging it with an identical call when it is slow.
+
+        The hedge is started once the call outlasts the `hedge_quantile` of the recent
+        latencies of its route, and the first successful result is kept.
+
+        Parameters
+        ----------
+        route : str
+            The stage and model of the call, such as "description/<model>".
+        fn : Callable[[], Awaitable[str]]
+            The function making the call.
+
+        Returns
+        -------
+        str
+            The result of the first call to succeed.
+
+        """
+        window = self._latencies.get(route)
+        if not self.hedge_quantile or window is None or len(window) < _HEDGE_MIN_SAMPLES:
+            return await fn()
+
+        calls = [asyncio.ensure_future(fn())]
+        try:
+            done, _ = await asyncio.wait(calls, timeout=window.quantile(self.hedge_quantile))
+            if done:
+                return calls[0].result()
+            self.metrics.hedges.inc(label=f"{route}/started")
+            calls.append(asyncio.ensure_future(fn()))
+            pending = set(calls)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for call in done:
+                    if not call.cancelled() and call.exception() is None:
+                        if call is calls[1]:
+                            self.metrics.hedges.inc(label=f"{route}/won")
+                        return call.result()
+            # Every call failed: report the first error, or the cancellation if both were cancelled.
+            failed = [call for call in calls if not call.cancelled()]
+            return (failed or calls)[0].result()
+        finally:
+            for call in calls:
+                _ = call.cancel()
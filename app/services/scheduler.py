@@ -0,0 +1,300 @@
+"""Admission control for LLM calls.
+
+This module provides the `LLMScheduler` class, which sits in front of the LLM provider and
+decides when each call may start. Calls run under a global concurrency cap and draw from
+token buckets for requests and estimated tokens per minute. Calls that cannot start right
+away wait in a bounded FIFO queue for at most a fixed deadline; when the queue is full, or
+when the wait would exceed the deadline, the call is rejected immediately so that clients
+get a fast 429 or 503 with `Retry-After` instead of a timeout.
+
+The limits adapt to the provider: integrations report the limits and remaining budget
+returned in rate-limit response headers with `observe`, and pause the scheduler with
+`pause` when the provider rejects a call.
+"""
+
+import asyncio
+import math
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from app.exceptions.llm import LLMRateLimitError, LLMUnavailableError
+
+
+class _TokenBucket:
+    """A token bucket refilled continuously at a per-minute rate.
+
+    A rate of 0 disables the bucket until the provider reports a limit.
+    """
+
+    def __init__(self, per_minute: int) -> None:
+        """Initialize a full bucket.
+
+        Parameters
+        ----------
+        per_minute : int
+            The configured refill rate, or 0 to only use the limit reported by the provider.
+
+        """
+        self.configured: int = per_minute
+        self.per_minute: int = per_minute
+        self.level: float = per_minute
+        self.updated: float = time.monotonic()
+
+    def _refill(self) -> None:
+        """Add the tokens accumulated since the last update."""
+        now = time.monotonic()
+        self.level = min(self.per_minute, self.level + (now - self.updated) * self.per_minute / 60)
+        self.updated = now
+
+    def delay(self, amount: int) -> float:
+        """Compute how long to wait until `amount` tokens are available.
+
+        Parameters
+        ----------
+        amount : int
+            The number of tokens needed. Amounts above the capacity wait for a full bucket.
+
+        Returns
+        -------
+        float
+            The number of seconds to wait, 0 if the tokens are available now.
+
+        """
+        if self.per_minute <= 0:
+            return 0
+        self._refill()
+        missing = min(amount, self.per_minute) - self.level
+        return max(0, missing * 60 / self.per_minute)
+
+    def take(self, amount: int) -> None:
+        """Consume tokens, letting the level go negative for amounts above the capacity.
+
+        Parameters
+        ----------
+        amount : int
+            The number of tokens consumed.
+
+        """
+        if self.per_minute > 0:
+            self._refill()
+            self.level -= amount
+
+    def sync(self, limit: int | None, remaining: int | None) -> None:
+        """Align the bucket with the limit and remaining budget reported by the provider.
+
+        Parameters
+        ----------
+        limit : int | None
+            The per-minute limit reported by the provider, if any.
+        remaining : int | None
+            The budget left in the current window, if reported.
+
+        """
+        if limit is not None and limit > 0:
+            self._refill()
+            if self.per_minute <= 0:
+                self.level = limit
+            self.per_minute = min(self.configured, limit) if self.configured > 0 else limit
+            self.level = min(self.level, self.per_minute)
+        if remaining is not None and self.per_minute > 0:
+            self._refill()
+            self.level = min(self.level, remaining)
+
+
+class LLMScheduler:
+    """Concurrency cap, rate limits and bounded queue in front of the LLM.
+
+    Attributes
+    ----------
+    max_concurrency : int
+        The maximum number of LLM calls running at the same time.
+    max_queue : int
+        The maximum number of calls waiting to start.
+    max_wait : float
+        The maximum number of seconds a call waits to start before it is shed.
+
+    """
+
+    def __init__(
+        self,
+        *,
+        max_concurrency: int,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        max_queue: int,
+        max_wait: float,
+    ) -> None:
+        """Initialize the scheduler.
+
+        Parameters
+        ----------
+        max_concurrency : int
+            The maximum number of LLM calls running at the same time.
+        requests_per_minute : int
+            The maximum number of calls started per minute, or 0 to only use the limit
+            reported by the provider.
+        tokens_per_minute : int
+            The maximum number of estimated tokens per minute, or 0 to only use the limit
+            reported by the provider.
+        max_queue : int
+            The maximum number of calls waiting to start.
+        max_wait : float
+            The maximum number of seconds a call waits to start before it is shed.
+
+        """
+        self.max_concurrency: int = max_concurrency
+        self.max_queue: int = max_queue
+        self.max_wait: float = max_wait
+        self._requests: _TokenBucket = _TokenBucket(requests_per_minute)
+        self._tokens: _TokenBucket = _TokenBucket(tokens_per_minute)
+        self._running: asyncio.Semaphore = asyncio.Semaphore(max_concurrency)
+        self._turn: asyncio.Lock = asyncio.Lock()
+        self._waiting: int = 0
+        self._paused_until: float = 0
+
+    def check(self) -> None:
+        """Reject a new call right away if it would certainly be shed.
+
+        This lets routes answer with an HTTP error before they start streaming.
+
+        Raises
+        ------
+        LLMUnavailableError
+            If the wait queue is full.
+        LLMRateLimitError
+            If the provider asked to pause for longer than `max_wait`.
+
+        """
+        if self._waiting >= self.max_queue:
+            raise LLMUnavailableError(self._retry_after(), "too many requests waiting for the LLM")
+        pause = self._paused_until - time.monotonic()
+        if pause > self.max_wait:
+            raise LLMRateLimitError(pause, "the LLM provider asked to slow down")
+
+    @asynccontextmanager
+    async def slot(self, tokens: int) -> AsyncIterator[None]:
+        """Wait for the right to run one LLM call, and hold it until the call completes.
+
+        Parameters
+        ----------
+        tokens : int
+            The estimated number of tokens of the call, input and output.
+
+        Yields
+        ------
+        None
+            Control while the call runs.
+
+        Raises
+        ------
+        LLMUnavailableError
+            If the wait queue is full or no concurrency slot frees up within `max_wait`.
+        LLMRateLimitError
+            If the rate limits would delay the call beyond `max_wait`.
+
+        """
+        await self._admit(tokens)
+        try:
+            yield
+        finally:
+            self._running.release()
+
+    def observe(
+        self,
+        *,
+        requests_limit: int | None = None,
+        requests_remaining: int | None = None,
+        tokens_limit: int | None = None,
+        tokens_remaining: int | None = None,
+    ) -> None:
+        """Adapt the rate limits to the values reported by the provider.
+
+        Parameters
+        ----------
+        requests_limit : int | None
+            The requests per minute allowed by the provider.
+        requests_remaining : int | None
+            The requests left in the current window.
+        tokens_limit : int | None
+            The tokens per minute allowed by the provider.
+        tokens_remaining : int | None
+            The tokens left in the current window.
+
+        """
+        self._requests.sync(requests_limit, requests_remaining)
+        self._tokens.sync(tokens_limit, tokens_remaining)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every new call for a while after the provider rejected one.
+
+        Parameters
+        ----------
+        seconds : float
+            The delay requested by the provider.
+
+        """
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def _admit(self, tokens: int) -> None:
+        """Wait in the queue until a call may start, or reject it.
+
+        Parameters
+        ----------
+        tokens : int
+            The estimated number of tokens of the call.
+
+        Raises
+        ------
+        LLMUnavailableError
+            If the wait queue is full or no concurrency slot frees up in time.
+        LLMRateLimitError
+            If the rate limits would delay the call beyond the deadline.
+
+        """
+        if self._waiting >= self.max_queue:
+            raise LLMUnavailableError(self._retry_after(), "too many requests waiting for the LLM")
+
+        deadline = time.monotonic() + self.max_wait
+        self._waiting += 1
+        try:
+            async with asyncio.timeout(self.max_wait), self._turn:
+                delay = self._delay(tokens)
+                if time.monotonic() + delay > deadline:
+                    raise LLMRateLimitError(delay, "the request or token rate limit is exhausted")
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await self._running.acquire()
+                self._requests.take(1)
+                self._tokens.take(tokens)
+        except TimeoutError:
+            raise LLMUnavailableError(self._retry_after(), "no LLM capacity freed up in time") from None
+        finally:
+            self._waiting -= 1
+
+    def _delay(self, tokens: int) -> float:
+        """Compute how long a call must wait for the pause and the rate limits.
+
+        Parameters
+        ----------
+        tokens : int
+            The estimated number of tokens of the call.
+
+        Returns
+        -------
+        float
+            The number of seconds to wait.
+
+        """
+        return max(self._paused_until - time.monotonic(), self._requests.delay(1), self._tokens.delay(tokens), 0)
+
+    def _retry_after(self) -> float:
+        """Estimate when a rejected call is worth retrying.
+
+        Returns
+        -------
+        float
+            The number of seconds, at least one.
+
+        """
+        return max(1.0, math.ceil(self._paused_until - time.monotonic()), self._requests.delay(self._waiting))
@@ -0,0 +1,242 @@
+"""Coalescing of concurrent identical work.
+
+This module provides `SingleFlight`, which lets concurrent callers asking for the same key
+share a single execution of a coroutine, and `StreamFlight`, which does the same for
+streams: every concurrent subscriber receives the same chunks, and late joiners first get
+the chunks produced so far replayed from a buffer.
+
+Shared work runs under its own `Deadline`, extended to the latest deadline of the requests
+waiting for it, so that a joining request neither inherits the budget of the request that
+started the work nor has its own budget ignored.
+"""
+
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable, Hashable
+
+from app.services.deadline import Deadline, current_deadline
+
+
+class SingleFlight[K: Hashable, V]:
+    """Share one in-flight execution per key between concurrent callers.
+
+    The work runs in its own task, so a caller that is cancelled does not cancel the work
+    for the callers still waiting on it.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty group of in-flight calls."""
+        self._calls: dict[K, tuple[asyncio.Task[V], Deadline]] = {}
+
+    async def do(self, key: K, fn: Callable[[], Awaitable[V]]) -> V:
+        """Run `fn` for a key, or join the execution already in flight for it.
+
+        Parameters
+        ----------
+        key : K
+            The key identifying identical work.
+        fn : Callable[[], Awaitable[V]]
+            The function producing the result when no call is in flight for the key.
+
+        Returns
+        -------
+        V
+            The result of the shared execution. Errors are propagated to every caller.
+
+        """
+        call = self._calls.get(key)
+        if call is not None:
+            task, deadline = call
+            deadline.extend(current_deadline())
+            return await asyncio.shield(task)
+
+        deadline = Deadline.shared(current_deadline())
+
+        async def run() -> V:
+            deadline.activate()
+            return await fn()
+
+        task = asyncio.ensure_future(run())
+        self._calls[key] = (task, deadline)
+        task.add_done_callback(lambda t: self._forget(key, t))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: K, task: asyncio.Task[V]) -> None:
+        """Remove a finished call so that the next caller starts a new one.
+
+        Parameters
+        ----------
+        key : K
+            The key of the finished call.
+        task : asyncio.Task[V]
+            The finished task. Its error is retrieved so that it is not reported as
+            unhandled when every caller went away before it finished.
+
+        """
+        call = self._calls.get(key)
+        if call is not None and call[0] is task:
+            del self._calls[key]
+        if not task.cancelled():
+            _ = task.exception()
+
+
+class _Broadcast:
+    """A stream consumed once and fanned out to any number of subscribers.
+
+    Chunks are kept for the lifetime of the broadcast so that subscribers joining late
+    receive every chunk from the start. The upstream is cancelled when the last subscriber
+    leaves before it is exhausted, and runs under a deadline extended by every subscriber.
+    """
+
+    def __init__(self, source: AsyncIterator[str], on_close: Callable[[], None]) -> None:
+        """Start consuming the source.
+
+        Parameters
+        ----------
+        source : AsyncIterator[str]
+            The upstream stream.
+        on_close : Callable[[], None]
+            Called once the broadcast stops accepting new subscribers.
+
+        """
+        self.chunks: list[str] = []
+        self.deadline: Deadline = Deadline.shared(current_deadline())
+        self.done: bool = False
+        self.error: Exception | None = None
+        self._subscribers: int = 0
+        self._changed: asyncio.Condition = asyncio.Condition()
+        self._on_close: Callable[[], None] = on_close
+        self._task: asyncio.Task[None] = asyncio.ensure_future(self._pump(source))
+
+    async def _pump(self, source: AsyncIterator[str]) -> None:
+        """Consume the source and notify subscribers of every chunk.
+
+        Parameters
+        ----------
+        source : AsyncIterator[str]
+            The upstream stream.
+
+        """
+        self.deadline.activate()
+        try:
+            async for chunk in source:
+                async with self._changed:
+                    self.chunks.append(chunk)
+                    self._changed.notify_all()
+        except Exception as e:  # noqa: BLE001 - the error is re-raised in every subscriber
+            self.error = e
+        except asyncio.CancelledError:
+            # Subscribers still attached must fail rather than see a truncated stream end.
+            self.error = RuntimeError("The shared stream was cancelled before it completed")
+            raise
+        finally:
+            self._on_close()
+            async with self._changed:
+                self.done = True
+                self._changed.notify_all()
+
+    def subscribe(self) -> AsyncIterator[str]:
+        """Subscribe to the stream, starting from the first chunk.
+
+        The subscriber is counted as soon as it is created rather than when it is first
+        iterated, so the upstream is not cancelled while it waits to be consumed. A
+        subscriber that is never iterated keeps the upstream running until it completes.
+
+        Returns
+        -------
+        AsyncIterator[str]
+            The chunks of the stream, raising the error that interrupted the upstream, if any.
+
+        """
+        self._subscribers += 1
+        if self._subscribers > 1:
+            self.deadline.extend(current_deadline())
+        return self._follow()
+
+    async def _follow(self) -> AsyncIterator[str]:
+        """Yield every chunk of the stream to a counted subscriber, starting from the first one.
+
+        Yields
+        ------
+        str
+            The chunks of the stream.
+
+        Raises
+        ------
+        Exception
+            The error that interrupted the upstream, if any, or a RuntimeError if it was
+            cancelled.
+
+        """
+        position = 0
+        try:
+            while True:
+                async with self._changed:
+                    await self._changed.wait_for(lambda seen=position: seen < len(self.chunks) or self.done)
+                    pending = self.chunks[position:]
+                    finished = self.done
+                position += len(pending)
+                for chunk in pending:
+                    yield chunk
+                if finished and position == len(self.chunks):
+                    break
+
+            if self.error is not None:
+                raise self.error
+        finally:
+            self._subscribers -= 1
+            if self._subscribers == 0 and not self._task.done():
+                self._on_close()
+                _ = self._task.cancel()
+
+
+class StreamFlight[K: Hashable]:
+    """Share one in-flight stream per key between concurrent subscribers."""
+
+    def __init__(self) -> None:
+        """Initialize an empty group of in-flight streams."""
+        self._streams: dict[K, _Broadcast] = {}
+
+    def join(self, key: K) -> AsyncIterator[str] | None:
+        """Subscribe to the stream of a key if one is in flight.
+
+        Parameters
+        ----------
+        key : K
+            The key identifying identical streams.
+
+        Returns
+        -------
+        AsyncIterator[str] | None
+            The chunks of the shared stream, replayed from the first one, or None if no
+            stream is in flight for the key.
+
+        """
+        broadcast = self._streams.get(key)
+        return broadcast.subscribe() if broadcast is not None else None
+
+    def stream(self, key: K, fn: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Subscribe to the stream of a key, starting it with `fn` if none is in flight.
+
+        Parameters
+        ----------
+        key : K
+            The key identifying identical streams.
+        fn : Callable[[], AsyncIterator[str]]
+            The function opening the upstream when no stream is in flight for the key.
+
+        Returns
+        -------
+        AsyncIterator[str]
+            The chunks of the shared stream, replayed from the first one.
+
+        """
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+
+            def close() -> None:
+                if self._streams.get(key) is broadcast:
+                    del self._streams[key]
+
+            broadcast = _Broadcast(fn(), close)
+            self._streams[key] = broadcast
+        return broadcast.subscribe()
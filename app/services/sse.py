@@ -0,0 +1,116 @@
+"""Server-sent events framing.
+
+This module provides the `EventStream` class, which turns a stream of the events defined
+in `app.interfaces.events` into the body of a streaming response. The event stream sends
+heartbeat comments while no event is ready, so proxies and mobile networks keep idle
+connections open during the description phase, and it cancels the upstream as soon as the
+client disconnects, so no tokens are generated for nobody to read.
+"""
+
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable
+
+from app.interfaces.events import ServerSentEvent
+
+HEARTBEAT = ": heartbeat\n\n"
+"""A comment line, ignored by clients but keeping the connection active."""
+
+_DISCONNECT_POLL_INTERVAL = 0.5
+
+
+class EventStream:
+    """Frames events for a client and stops the upstream when the client goes away.
+
+    Attributes
+    ----------
+    is_disconnected : Callable[[], Awaitable[bool]]
+        The function telling whether the client disconnected.
+    heartbeat_interval : float
+        The number of seconds without an event after which a heartbeat is sent.
+
+    """
+
+    def __init__(self, is_disconnected: Callable[[], Awaitable[bool]], heartbeat_interval: float) -> None:
+        """Initialize the event stream.
+
+        Parameters
+        ----------
+        is_disconnected : Callable[[], Awaitable[bool]]
+            The function telling whether the client disconnected, typically
+            `Request.is_disconnected`.
+        heartbeat_interval : float
+            The number of seconds without an event after which a heartbeat is sent.
+
+        """
+        self.is_disconnected: Callable[[], Awaitable[bool]] = is_disconnected
+        self.heartbeat_interval: float = heartbeat_interval
+
+    async def stream(self, events: AsyncIterator[ServerSentEvent], first_id: int = 1) -> AsyncIterator[str]:
+        """Encode events, interleaving heartbeats, until the events end or the client leaves.
+
+        The events are consumed in a separate task. When the client disconnects, that task
+        is cancelled, which closes the events iterator and, through it, the upstream LLM
+        stream.
+
+        Parameters
+        ----------
+        events : AsyncIterator[ServerSentEvent]
+            The events to send.
+        first_id : int
+            The id of the first event, above 1 when a client resumes a stream.
+
+        Yields
+        ------
+        str
+            The framed events and heartbeats.
+
+        """
+        queue: asyncio.Queue[ServerSentEvent | None] = asyncio.Queue()
+        pump = asyncio.ensure_future(self._pump(events, queue))
+        watch = asyncio.ensure_future(self._watch(queue))
+        event_id = first_id - 1
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), self.heartbeat_interval)
+                except TimeoutError:
+                    yield HEARTBEAT
+                    continue
+                if event is None:
+                    break
+                event_id += 1
+                yield event.encode(event_id)
+        finally:
+            _ = pump.cancel()
+            _ = watch.cancel()
+
+    @staticmethod
+    async def _pump(events: AsyncIterator[ServerSentEvent], queue: asyncio.Queue[ServerSentEvent | None]) -> None:
+        """Move events to the queue, then mark its end.
+
+        Parameters
+        ----------
+        events : AsyncIterator[ServerSentEvent]
+            The events to send.
+        queue : asyncio.Queue[ServerSentEvent | None]
+            The queue read by `stream`.
+
+        """
+        try:
+            async for event in events:
+                queue.put_nowait(event)
+        finally:
+            queue.put_nowait(None)
+
+    async def _watch(self, queue: asyncio.Queue[ServerSentEvent | None]) -> None:
+        """Mark the end of the queue as soon as the client disconnects.
+
+        Parameters
+        ----------
+        queue : asyncio.Queue[ServerSentEvent | None]
+            The queue read by `stream`.
+
+        """
+        while not await self.is_disconnected():  # noqa: ASYNC110 - the ASGI receive channel can only be polled
+            await asyncio.sleep(_DISCONNECT_POLL_INTERVAL)
+        queue.put_nowait(None)
@@ -0,0 +1,194 @@
+"""Reading of uploaded images.
+
+This module provides the `read_upload` function, which reads an image sent directly in a
+request body, either raw (`application/octet-stream` or `image/*`) or as the `image` field
+of a `multipart/form-data` body. The body is consumed as a stream and the size limit is
+enforced on every chunk, so an oversized upload is rejected as soon as it crosses the limit
+instead of being buffered or spooled to disk first. The image is returned as a view of the
+buffer it was received into, without a final copy.
+"""
+
+from collections.abc import AsyncIterator
+
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from app.exceptions.image import ImageTooLargeError, InvalidUploadError
+from app.interfaces.image import MAX_IMAGE_SIZE
+
+MAX_UPLOAD_SIZE = MAX_IMAGE_SIZE
+"""The maximum size of an uploaded image in bytes, the same as for fetched images."""
+
+_FIELD = b"image"
+
+
+class _LimitedBuffer:
+    """Accumulate an upload while enforcing a maximum size."""
+
+    def __init__(self, max_size: int) -> None:
+        """Initialize an empty buffer.
+
+        Parameters
+        ----------
+        max_size : int
+            The maximum allowed size in bytes.
+
+        """
+        self.max_size: int = max_size
+        self.data: bytearray = bytearray()
+
+    def write(self, chunk: bytes) -> None:
+        """Append a chunk to the buffer.
+
+        Parameters
+        ----------
+        chunk : bytes
+            The next chunk of the image.
+
+        Raises
+        ------
+        ImageTooLargeError
+            As soon as the running total exceeds `max_size`.
+
+        """
+        end = len(self.data) + len(chunk)
+        if end > self.max_size:
+            raise ImageTooLargeError(self.max_size, end)
+        self.data += chunk
+
+
+class _MultipartImage:
+    """Streaming extraction of the `image` field of a multipart body."""
+
+    def __init__(self, boundary: bytes, max_size: int) -> None:
+        """Initialize the parser.
+
+        Parameters
+        ----------
+        boundary : bytes
+            The boundary of the multipart body.
+        max_size : int
+            The maximum allowed image size in bytes.
+
+        """
+        self.image: _LimitedBuffer = _LimitedBuffer(max_size)
+        self.found: bool = False
+        self._header_field: bytearray = bytearray()
+        self._header_value: bytearray = bytearray()
+        self._in_image: bool = False
+        self._parser: MultipartParser = MultipartParser(
+            boundary,
+            {
+                "on_part_begin": self._on_part_begin,
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_part_data": self._on_part_data,
+            },
+        )
+
+    def write(self, chunk: bytes) -> None:
+        """Parse the next chunk of the body.
+
+        Parameters
+        ----------
+        chunk : bytes
+            The next chunk of the body.
+
+        """
+        _ = self._parser.write(chunk)
+
+    def finalize(self) -> None:
+        """Finish parsing once the body is complete."""
+        self._parser.finalize()
+
+    def _on_part_begin(self) -> None:
+        """Reset the state of the part."""
+        self._in_image = False
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        """Accumulate the name of a part header."""
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        """Accumulate the value of a part header."""
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        """Select the part holding the first `image` field."""
+        if self._header_field.lower() == b"content-disposition":
+            _, options = parse_options_header(bytes(self._header_value))
+            self._in_image = options.get(b"name") == _FIELD and not self.found
+            self.found = self.found or self._in_image
+        self._header_field.clear()
+        self._header_value.clear()
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        """Keep the data of the image part."""
+        if self._in_image:
+            self.image.write(data[start:end])
+
+
+async def read_upload(
+    content_type: str, content_length: str | None, stream: AsyncIterator[bytes], max_size: int = MAX_UPLOAD_SIZE
+) -> memoryview:
+    """Read an uploaded image from a streamed request body.
+
+    Parameters
+    ----------
+    content_type : str
+        The `Content-Type` of the request.
+    content_length : str | None
+        The `Content-Length` of the request, used to reject raw uploads that advertise an
+        oversized body before reading them.
+    stream : AsyncIterator[bytes]
+        The chunks of the request body.
+    max_size : int
+        The maximum allowed image size in bytes.
+
+    Returns
+    -------
+    memoryview
+        A read-only view of the raw image content.
+
+    Raises
+    ------
+    ImageTooLargeError
+        As soon as the image exceeds `max_size`.
+    InvalidUploadError
+        If the content type is not supported, or a multipart body has no `image` field
+        or is malformed.
+
+    """
+    media_type, options = parse_options_header(content_type)
+    if media_type == b"multipart/form-data":
+        boundary = options.get(b"boundary")
+        if not boundary:
+            msg = "the multipart body has no boundary"
+            raise InvalidUploadError(msg)
+
+        multipart = _MultipartImage(boundary, max_size)
+        try:
+            async for chunk in stream:
+                multipart.write(chunk)
+            multipart.finalize()
+        except ImageTooLargeError:
+            raise
+        except Exception as e:
+            msg = "the multipart body is malformed"
+            raise InvalidUploadError(msg) from e
+        if not multipart.found:
+            msg = "the multipart body has no image field"
+            raise InvalidUploadError(msg)
+        return memoryview(multipart.image.data).toreadonly()
+
+    if media_type != b"application/octet-stream" and not media_type.startswith(b"image/"):
+        msg = "send the image as application/octet-stream, image/* or multipart/form-data"
+        raise InvalidUploadError(msg)
+
+    if content_length is not None and content_length.isdigit() and int(content_length) > max_size:
+        raise ImageTooLargeError(max_size, int(content_length))
+
+    image = _LimitedBuffer(max_size)
+    async for chunk in stream:
+        image.write(chunk)
+    return memoryview(image.data).toreadonly()
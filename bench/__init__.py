@@ -0,0 +1,8 @@
+"""Offline benchmark suite for DietLogApp.
+
+This package drives the API under load without network access. It provides a fake
+Anthropic Messages API that streams tokens at a configurable rate and latency, a fake image
+host serving generated JPEG and PNG files with an optional slow drip, and a load generator
+replaying a JSONL file of requests at a fixed rate or concurrency. Run it with
+`python -m bench.run`.
+"""
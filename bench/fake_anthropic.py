@@ -0,0 +1,195 @@
+"""Local stand-in for the Anthropic Messages API.
+
+This module provides the `FakeAnthropic` class, which builds a FastAPI application serving
+`POST /v1/messages` with the same wire format as the real API: a JSON message for regular
+calls and the `message_start` ... `message_stop` event sequence for streamed calls. Latency
+and token rate are configurable, and every response carries generous rate-limit headers so
+that the admission scheduler adapts to them as it would in production.
+"""
+
+import asyncio
+import json
+from collections.abc import AsyncIterator
+from typing import Any
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+_DESCRIPTION = (
+    "The plate holds grilled chicken breast, a portion of white rice and steamed broccoli. "
+    "The chicken appears lightly seasoned, the rice is plain and the broccoli is bright green. "
+    "The portion looks moderate, served on a round white plate."
+)
+_FEEDBACK = (
+    "<nutritional_breakdown> The meal combines lean protein, refined carbohydrates and fiber-rich vegetables. "
+    "</nutritional_breakdown> <reasoning> Balanced macronutrients and a moderate portion. </reasoning> "
+    "<score> 7 </score> <feedback> Swap the white rice for brown rice and add a source of healthy fat. </feedback>"
+)
+_FEEDBACK_WORDS = _FEEDBACK.split()
+_RATE_LIMIT_HEADERS = {
+    "anthropic-ratelimit-requests-limit": "100000",
+    "anthropic-ratelimit-requests-remaining": "99999",
+    "anthropic-ratelimit-tokens-limit": "100000000",
+    "anthropic-ratelimit-tokens-remaining": "99999999",
+}
+
+
+class FakeAnthropic:
+    """Configurable fake of the Anthropic Messages API.
+
+    Attributes
+    ----------
+    first_token_latency : float
+        The number of seconds before the first token of a streamed response.
+    tokens_per_second : float
+        The rate at which streamed tokens are sent.
+    output_tokens : int
+        The number of tokens of every streamed response.
+    description_latency : float
+        The number of seconds taken by a non-streamed call.
+    requests : int
+        The number of calls served.
+
+    """
+
+    def __init__(
+        self, first_token_latency: float, tokens_per_second: float, output_tokens: int, description_latency: float
+    ) -> None:
+        """Initialize the fake.
+
+        Parameters
+        ----------
+        first_token_latency : float
+            The number of seconds before the first token of a streamed response.
+        tokens_per_second : float
+            The rate at which streamed tokens are sent.
+        output_tokens : int
+            The number of tokens of every streamed response.
+        description_latency : float
+            The number of seconds taken by a non-streamed call.
+
+        """
+        self.first_token_latency: float = first_token_latency
+        self.tokens_per_second: float = tokens_per_second
+        self.output_tokens: int = output_tokens
+        self.description_latency: float = description_latency
+        self.requests: int = 0
+
+    def app(self) -> FastAPI:
+        """Build the ASGI application serving the fake API.
+
+        Returns
+        -------
+        FastAPI
+            The application, to be served by uvicorn.
+
+        """
+        app = FastAPI()
+
+        @app.post("/v1/messages")
+        async def messages(request: Request) -> Response:
+            body = await request.body()
+            payload: dict[str, Any] = json.loads(body)
+            self.requests += 1
+            input_tokens = len(body) // 4
+            if payload.get("stream"):
+                return StreamingResponse(
+                    self._stream(payload["model"], input_tokens),
+                    media_type="text/event-stream",
+                    headers=_RATE_LIMIT_HEADERS,
+                )
+
+            await asyncio.sleep(self.description_latency)
+            message = self._message(payload["model"], input_tokens, _DESCRIPTION, len(_DESCRIPTION) // 4)
+            return JSONResponse(message, headers=_RATE_LIMIT_HEADERS)
+
+        return app
+
+    @staticmethod
+    def _message(model: str, input_tokens: int, text: str, output_tokens: int) -> dict[str, Any]:
+        """Build a message object.
+
+        Parameters
+        ----------
+        model : str
+            The model requested by the client.
+        input_tokens : int
+            The estimated number of input tokens.
+        text : str
+            The text of the message.
+        output_tokens : int
+            The number of output tokens.
+
+        Returns
+        -------
+        dict[str, Any]
+            The message, as returned by the Messages API.
+
+        """
+        return {
+            "id": "msg_bench",
+            "type": "message",
+            "role": "assistant",
+            "model": model,
+            "content": [{"type": "text", "text": text}] if text else [],
+            "stop_reason": "end_turn" if text else None,
+            "stop_sequence": None,
+            "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens},
+        }
+
+    async def _stream(self, model: str, input_tokens: int) -> AsyncIterator[str]:
+        """Stream a message as server-sent events, pacing the tokens.
+
+        Parameters
+        ----------
+        model : str
+            The model requested by the client.
+        input_tokens : int
+            The estimated number of input tokens.
+
+        Yields
+        ------
+        str
+            The framed events of the streamed message.
+
+        """
+        yield self._event("message_start", {"message": self._message(model, input_tokens, "", 1)})
+        yield self._event("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}})
+        await asyncio.sleep(self.first_token_latency)
+
+        interval = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0
+        for position in range(self.output_tokens):
+            word = _FEEDBACK_WORDS[position % len(_FEEDBACK_WORDS)]
+            delta = {"index": 0, "delta": {"type": "text_delta", "text": f"{word} "}}
+            yield self._event("content_block_delta", delta)
+            if interval:
+                await asyncio.sleep(interval)
+
+        yield self._event("content_block_stop", {"index": 0})
+        yield self._event(
+            "message_delta",
+            {
+                "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                "usage": {"output_tokens": self.output_tokens},
+            },
+        )
+        yield self._event("message_stop", {})
+
+    @staticmethod
+    def _event(event: str, data: dict[str, Any]) -> str:
+        """Frame one event of a streamed message.
+
+        Parameters
+        ----------
+        event : str
+            The type of the event.
+        data : dict[str, Any]
+            The fields of the event, besides its type.
+
+        Returns
+        -------
+        str
+            The framed event.
+
+        """
+        return f"event: {event}\ndata: {json.dumps({'type': event, **data})}\n\n"
@@ -0,0 +1,113 @@
+"""Local stand-in for image hosts.
+
+This module provides the `FakeImageHost` class, which builds a FastAPI application serving
+generated images at `GET /images/{width}x{height}.{format}`. Images are rendered once with
+noise, so their size is close to that of real photos, and then served from memory. The
+`drip` query parameter sends the body at that many bytes per second to reproduce slow hosts.
+"""
+
+import asyncio
+from collections.abc import AsyncIterator
+from io import BytesIO
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import Response, StreamingResponse
+from PIL import Image
+
+_FORMATS = {"jpg": ("JPEG", "image/jpeg"), "jpeg": ("JPEG", "image/jpeg"), "png": ("PNG", "image/png")}
+_MAX_EDGE = 8192
+_DRIP_INTERVAL = 0.05
+
+
+class FakeImageHost:
+    """Fake image host serving generated images.
+
+    Attributes
+    ----------
+    requests : int
+        The number of images served.
+
+    """
+
+    def __init__(self) -> None:
+        """Initialize the host with an empty image cache."""
+        self.requests: int = 0
+        self._images: dict[tuple[int, int, str], bytes] = {}
+
+    def render(self, width: int, height: int, extension: str) -> bytes:
+        """Return a generated image, rendering it on first use.
+
+        Parameters
+        ----------
+        width : int
+            The width of the image in pixels.
+        height : int
+            The height of the image in pixels.
+        extension : str
+            The file extension selecting the format: "jpg", "jpeg" or "png".
+
+        Returns
+        -------
+        bytes
+            The encoded image.
+
+        """
+        key = (width, height, extension)
+        image = self._images.get(key)
+        if image is None:
+            pil_format, _ = _FORMATS[extension]
+            noise = Image.effect_noise((width, height), 64).convert("RGB")
+            buffer = BytesIO()
+            noise.save(buffer, pil_format)
+            image = self._images[key] = buffer.getvalue()
+        return image
+
+    def app(self) -> FastAPI:
+        """Build the ASGI application serving the images.
+
+        Returns
+        -------
+        FastAPI
+            The application, to be served by uvicorn.
+
+        """
+        app = FastAPI()
+
+        @app.get("/images/{width}x{height}.{extension}")
+        async def image(width: int, height: int, extension: str, drip: int = 0) -> Response:
+            if extension not in _FORMATS or not (0 < width <= _MAX_EDGE and 0 < height <= _MAX_EDGE):
+                raise HTTPException(status_code=404)
+
+            self.requests += 1
+            content = await asyncio.to_thread(self.render, width, height, extension)
+            _, media_type = _FORMATS[extension]
+            headers = {"Cache-Control": "no-store"}
+            if drip <= 0:
+                return Response(content, media_type=media_type, headers=headers)
+
+            headers["Content-Length"] = str(len(content))
+            return StreamingResponse(self._drip(content, drip), media_type=media_type, headers=headers)
+
+        return app
+
+    @staticmethod
+    async def _drip(content: bytes, bytes_per_second: int) -> AsyncIterator[bytes]:
+        """Send a body slowly.
+
+        Parameters
+        ----------
+        content : bytes
+            The body.
+        bytes_per_second : int
+            The rate at which the body is sent.
+
+        Yields
+        ------
+        bytes
+            The chunks of the body.
+
+        """
+        chunk_size = max(1, int(bytes_per_second * _DRIP_INTERVAL))
+        for start in range(0, len(content), chunk_size):
+            yield content[start : start + chunk_size]
+            await asyncio.sleep(_DRIP_INTERVAL)
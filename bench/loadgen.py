@@ -0,0 +1,327 @@
+"""Load generator for `/diet/process`.
+
+This module provides the `LoadGenerator` class, which replays requests from a JSONL file
+against a running DietLogApp, either open-loop at a fixed number of requests per second or
+closed-loop with a fixed number of concurrent clients, and the `Report` class summarizing
+the throughput and latency percentiles of the run.
+
+Every line of the replay file is a JSON object with the `url` of an image and an optional
+`mode` ("two_phase" or "fused"). The placeholder `{images}` in URLs is replaced by the
+base URL of the image host, so the same file works with the local fake host on any port.
+"""
+
+import asyncio
+import json
+import math
+import time
+from collections import Counter
+from itertools import cycle
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+
+class Sample:
+    """The outcome of one request.
+
+    Attributes
+    ----------
+    status : int
+        The HTTP status code, or 0 if the request failed before a response.
+    ttfb : float
+        The number of seconds until the first byte of the body.
+    first_delta : float | None
+        The number of seconds until the first "delta" event, or None if there was none.
+    total : float
+        The number of seconds until the end of the body.
+    size : int
+        The number of bytes of the body.
+    error : bool
+        Whether the request failed, returned an error status or ended with an "error" event.
+
+    """
+
+    def __init__(  # noqa: PLR0913 - one field per measurement
+        self, status: int, ttfb: float, first_delta: float | None, total: float, size: int, *, error: bool
+    ) -> None:
+        """Initialize the sample.
+
+        Parameters
+        ----------
+        status : int
+            The HTTP status code, or 0 if the request failed before a response.
+        ttfb : float
+            The number of seconds until the first byte of the body.
+        first_delta : float | None
+            The number of seconds until the first "delta" event, or None if there was none.
+        total : float
+            The number of seconds until the end of the body.
+        size : int
+            The number of bytes of the body.
+        error : bool
+            Whether the request failed, returned an error status or ended with an "error" event.
+
+        """
+        self.status: int = status
+        self.ttfb: float = ttfb
+        self.first_delta: float | None = first_delta
+        self.total: float = total
+        self.size: int = size
+        self.error: bool = error
+
+
+def _percentile(values: list[float], q: float) -> float | None:
+    """Compute a percentile with the nearest-rank method.
+
+    Parameters
+    ----------
+    values : list[float]
+        The sorted values.
+    q : float
+        The percentile, between 0 and 100.
+
+    Returns
+    -------
+    float | None
+        The percentile, or None if there are no values.
+
+    """
+    if not values:
+        return None
+    return values[max(0, math.ceil(q / 100 * len(values)) - 1)]
+
+
+class Report:
+    """Summary of a load test.
+
+    Attributes
+    ----------
+    samples : list[Sample]
+        The outcome of every request.
+    elapsed : float
+        The wall-clock duration of the run in seconds.
+    peak_rss : int | None
+        The peak resident set size of the server in bytes, if known.
+    extra : dict[str, Any]
+        Additional fields appended to the summary, such as counters of the fake services.
+
+    """
+
+    def __init__(self, samples: list[Sample], elapsed: float, peak_rss: int | None = None) -> None:
+        """Initialize the report.
+
+        Parameters
+        ----------
+        samples : list[Sample]
+            The outcome of every request.
+        elapsed : float
+            The wall-clock duration of the run in seconds.
+        peak_rss : int | None
+            The peak resident set size of the server in bytes, if known.
+
+        """
+        self.samples: list[Sample] = samples
+        self.elapsed: float = elapsed
+        self.peak_rss: int | None = peak_rss
+        self.extra: dict[str, Any] = {}
+
+    def summary(self) -> dict[str, Any]:
+        """Compute the throughput and latency percentiles of the run.
+
+        Returns
+        -------
+        dict[str, Any]
+            The request counts, throughput, p50/p95/p99 of the time to first byte, the time
+            to first delta and the total latency in milliseconds, the peak RSS and `extra`.
+
+        """
+        ok = [sample for sample in self.samples if not sample.error]
+        latencies = {
+            "ttfb": sorted(sample.ttfb for sample in ok),
+            "first_delta": sorted(sample.first_delta for sample in ok if sample.first_delta is not None),
+            "total": sorted(sample.total for sample in ok),
+        }
+        summary: dict[str, Any] = {
+            "requests": len(self.samples),
+            "errors": len(self.samples) - len(ok),
+            "statuses": dict(Counter(sample.status for sample in self.samples)),
+            "elapsed_s": round(self.elapsed, 3),
+            "throughput_rps": round(len(ok) / self.elapsed, 3) if self.elapsed > 0 else 0,
+            "bytes": sum(sample.size for sample in self.samples),
+        }
+        for name, values in latencies.items():
+            for q in (50, 95, 99):
+                value = _percentile(values, q)
+                summary[f"{name}_p{q}_ms"] = round(value * 1000, 1) if value is not None else None
+        summary["peak_rss_bytes"] = self.peak_rss
+        summary.update(self.extra)
+        return summary
+
+    def render(self) -> str:
+        """Render the summary as aligned text.
+
+        Returns
+        -------
+        str
+            One line per summary field, with the values aligned.
+
+        """
+        summary = self.summary()
+        width = max(len(name) for name in summary)
+        return "\n".join(f"{name.ljust(width)}  {value}" for name, value in summary.items()) + "\n"
+
+
+def load_replay(path: Path, images: str) -> list[dict[str, Any]]:
+    """Read the requests of a replay file.
+
+    Parameters
+    ----------
+    path : Path
+        The JSONL file, one request body per line. Blank lines are ignored.
+    images : str
+        The base URL of the image host, substituted for `{images}` in URLs.
+
+    Returns
+    -------
+    list[dict[str, Any]]
+        The request bodies.
+
+    Raises
+    ------
+    ValueError
+        If the file contains no request.
+
+    """
+    bodies: list[dict[str, Any]] = []
+    for line in path.read_text().splitlines():
+        if line.strip():
+            body = json.loads(line)
+            body["url"] = body["url"].replace("{images}", images)
+            bodies.append(body)
+    if not bodies:
+        msg = f"Replay file {path} contains no request"
+        raise ValueError(msg)
+    return bodies
+
+
+class LoadGenerator:
+    """Replays requests against `/diet/process`.
+
+    Attributes
+    ----------
+    base_url : str
+        The base URL of the DietLogApp server.
+    bodies : list[dict[str, Any]]
+        The request bodies, replayed in order and cycled as needed.
+    timeout : float
+        The number of seconds after which a request is abandoned.
+
+    """
+
+    def __init__(self, base_url: str, bodies: list[dict[str, Any]], timeout: float = 120) -> None:
+        """Initialize the generator.
+
+        Parameters
+        ----------
+        base_url : str
+            The base URL of the DietLogApp server.
+        bodies : list[dict[str, Any]]
+            The request bodies, replayed in order and cycled as needed.
+        timeout : float
+            The number of seconds after which a request is abandoned.
+
+        """
+        self.base_url: str = base_url
+        self.bodies: list[dict[str, Any]] = bodies
+        self.timeout: float = timeout
+
+    async def run(self, *, requests: int, rps: float | None = None, concurrency: int | None = None) -> Report:
+        """Send requests at a fixed rate or with a fixed number of concurrent clients.
+
+        Parameters
+        ----------
+        requests : int
+            The number of requests to send.
+        rps : float | None
+            The number of requests started per second, regardless of completions.
+        concurrency : int | None
+            The number of clients sending their next request as soon as the previous one completes.
+
+        Returns
+        -------
+        Report
+            The outcome of every request.
+
+        Raises
+        ------
+        ValueError
+            If neither or both of `rps` and `concurrency` are given.
+
+        """
+        if (rps is None) == (concurrency is None):
+            msg = "Exactly one of rps and concurrency must be given"
+            raise ValueError(msg)
+
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        bodies = cycle(self.bodies)
+        samples: list[Sample] = []
+        async with httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=self.timeout) as client:
+            started = time.perf_counter()
+            if rps is not None:
+                tasks: list[asyncio.Task[Sample]] = []
+                for index in range(requests):
+                    delay = started + index / rps - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    tasks.append(asyncio.ensure_future(self._send(client, next(bodies))))
+                samples = list(await asyncio.gather(*tasks))
+            else:
+                remaining = iter(range(requests))
+
+                async def worker() -> None:
+                    for _ in remaining:
+                        samples.append(await self._send(client, next(bodies)))
+
+                await asyncio.gather(*(worker() for _ in range(concurrency or 1)))
+            elapsed = time.perf_counter() - started
+        return Report(samples, elapsed)
+
+    @staticmethod
+    async def _send(client: httpx.AsyncClient, body: dict[str, Any]) -> Sample:
+        """Send one request and time its response.
+
+        Parameters
+        ----------
+        client : httpx.AsyncClient
+            The client connected to the server.
+        body : dict[str, Any]
+            The request body.
+
+        Returns
+        -------
+        Sample
+            The outcome of the request.
+
+        """
+        started = time.perf_counter()
+        ttfb: float | None = None
+        first_delta: float | None = None
+        size = 0
+        failed = False
+        try:
+            async with client.stream("POST", "/diet/process", json=body) as response:
+                async for chunk in response.aiter_bytes():
+                    now = time.perf_counter() - started
+                    if ttfb is None:
+                        ttfb = now
+                    if first_delta is None and b"event: delta" in chunk:
+                        first_delta = now
+                    failed = failed or b"event: error" in chunk
+                    size += len(chunk)
+                status = response.status_code
+        except httpx.HTTPError:
+            status = 0
+        total = time.perf_counter() - started
+        error = failed or not 200 <= status < 300  # noqa: PLR2004 - the success status range
+        return Sample(status, ttfb if ttfb is not None else total, first_delta, total, size, error=error)
@@ -0,0 +1,203 @@
+"""Run an offline benchmark of DietLogApp.
+
+This module starts the fake Anthropic API and the fake image host in-process, launches
+DietLogApp in a uvicorn subprocess pointed at them, replays a JSONL file of requests with
+the load generator, and prints a report including the peak RSS of the server. No network
+access is needed.
+
+Examples
+--------
+    python -m bench.run --concurrency 16 --requests 200
+    python -m bench.run --rps 20 --requests 600 --tokens-per-second 80 --json
+
+Environment variables starting with `DIETLOG_` are passed to the server, so the same
+benchmark can compare pipeline modes, cache settings or scheduler limits.
+
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+from bench.fake_anthropic import FakeAnthropic
+from bench.fake_images import FakeImageHost
+from bench.loadgen import LoadGenerator, load_replay
+
+_HOST = "127.0.0.1"
+_DEFAULT_REPLAY = Path(__file__).parent / "requests.jsonl"
+_STARTUP_TIMEOUT = 30.0
+
+
+def _free_port() -> int:
+    """Find a free TCP port on the loopback interface.
+
+    Returns
+    -------
+    int
+        A port that was free when the function returned.
+
+    """
+    with socket.socket() as sock:
+        sock.bind((_HOST, 0))
+        return sock.getsockname()[1]
+
+
+def _peak_rss(pid: int) -> int | None:
+    """Read the peak resident set size of a process.
+
+    Parameters
+    ----------
+    pid : int
+        The process id.
+
+    Returns
+    -------
+    int | None
+        The peak RSS in bytes, or None where `/proc` is not available.
+
+    """
+    try:
+        status = Path(f"/proc/{pid}/status").read_text()
+    except OSError:
+        return None
+    for line in status.splitlines():
+        if line.startswith("VmHWM:"):
+            return int(line.split()[1]) * 1024
+    return None
+
+
+async def _serve(app: FastAPI, port: int) -> tuple[uvicorn.Server, asyncio.Task[None]]:
+    """Serve an application in the current event loop.
+
+    Parameters
+    ----------
+    app : FastAPI
+        The application.
+    port : int
+        The port to listen on.
+
+    Returns
+    -------
+    tuple[uvicorn.Server, asyncio.Task[None]]
+        The running server, and the task serving it. Set `should_exit` on the server, then
+        await the task, to stop it.
+
+    """
+    server = uvicorn.Server(uvicorn.Config(app, host=_HOST, port=port, log_level="warning", lifespan="off"))
+    task = asyncio.ensure_future(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.01)
+    return server, task
+
+
+async def _wait_ready(base_url: str, process: asyncio.subprocess.Process) -> None:
+    """Wait until the server answers on its metrics endpoint.
+
+    Parameters
+    ----------
+    base_url : str
+        The base URL of the server.
+    process : asyncio.subprocess.Process
+        The server process.
+
+    Raises
+    ------
+    RuntimeError
+        If the server exits or does not answer in time.
+
+    """
+    deadline = time.monotonic() + _STARTUP_TIMEOUT
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if process.returncode is not None:
+                msg = f"DietLogApp exited with status {process.returncode} during startup"
+                raise RuntimeError(msg)
+            try:
+                if (await client.get("/metrics")).status_code == httpx.codes.OK:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    msg = f"DietLogApp did not start within {_STARTUP_TIMEOUT} seconds"
+    raise RuntimeError(msg)
+
+
+def _parse_args() -> argparse.Namespace:
+    """Parse the command line.
+
+    Returns
+    -------
+    argparse.Namespace
+        The benchmark options.
+
+    """
+    parser = argparse.ArgumentParser(description="Offline load test of DietLogApp.")
+    load = parser.add_mutually_exclusive_group(required=True)
+    load.add_argument("--rps", type=float, help="requests started per second (open loop)")
+    load.add_argument("--concurrency", type=int, help="concurrent clients (closed loop)")
+    parser.add_argument("--requests", type=int, default=100, help="number of requests to send")
+    parser.add_argument("--replay", type=Path, default=_DEFAULT_REPLAY, help="JSONL file of request bodies")
+    parser.add_argument("--first-token-latency", type=float, default=0.4, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=60, help="streamed tokens per second")
+    parser.add_argument("--output-tokens", type=int, default=300, help="tokens per streamed response")
+    parser.add_argument("--description-latency", type=float, default=1.5, help="seconds per description call")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser.parse_args()
+
+
+async def _main(args: argparse.Namespace) -> None:
+    """Run the benchmark and print its report.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        The benchmark options.
+
+    """
+    anthropic = FakeAnthropic(
+        args.first_token_latency, args.tokens_per_second, args.output_tokens, args.description_latency
+    )
+    images = FakeImageHost()
+    anthropic_port, images_port, app_port = _free_port(), _free_port(), _free_port()
+    fakes = [await _serve(anthropic.app(), anthropic_port), await _serve(images.app(), images_port)]
+
+    env = {
+        **os.environ,
+        "ANTHROPIC_BASE_URL": f"http://{_HOST}:{anthropic_port}",
+        "ANTHROPIC_API_KEY": os.environ.get("ANTHROPIC_API_KEY", "bench"),
+    }
+    command = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", _HOST, "--port", str(app_port)]
+    process = await asyncio.create_subprocess_exec(*command, "--log-level", "warning", env=env)
+    try:
+        base_url = f"http://{_HOST}:{app_port}"
+        await _wait_ready(base_url, process)
+        bodies = load_replay(args.replay, f"http://{_HOST}:{images_port}")
+        report = await LoadGenerator(base_url, bodies).run(
+            requests=args.requests, rps=args.rps, concurrency=args.concurrency
+        )
+        report.peak_rss = _peak_rss(process.pid)
+    finally:
+        process.terminate()
+        _ = await process.wait()
+        for server, _task in fakes:
+            server.should_exit = True
+        _ = await asyncio.gather(*(task for _server, task in fakes))
+
+    report.extra = {"llm_calls": anthropic.requests, "image_downloads": images.requests}
+    output = json.dumps(report.summary(), indent=2) + "\n" if args.json else report.render()
+    _ = sys.stdout.write(output)
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(_parse_args()))